@@ -0,0 +1,33 @@
+"""Times each installed JSON decoder backend on a representative payload
+of every API.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_decoders [repeat]
+"""
+import json
+import sys
+import timeit
+
+from choochoo.decoders import available, get_decoder
+
+from .payloads import PER_API
+
+
+def main(repeat=20):
+    backends = [name for name in available() if name != 'raw']
+    print('%-16s %9s  %s' % ('API', 'KiB', '  '.join('%10s' % name
+                                                    for name in backends)))
+    for api, payload in PER_API.items():
+        raw = json.dumps(payload()).encode()
+        timings = []
+        for name in backends:
+            decode = get_decoder(name)
+            seconds = min(timeit.repeat(lambda: decode(raw), number=1,
+                                        repeat=repeat))
+            timings.append('%8.2fms' % (seconds * 1000))
+        print('%-16s %9.1f  %s' % (api, len(raw) / 1024, '  '.join(timings)))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
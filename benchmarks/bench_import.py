@@ -0,0 +1,80 @@
+"""Measures choochoo's cold import time with `python -X importtime`.
+
+Each scenario runs in fresh interpreters; the self times of every module
+imported after interpreter startup are summed, and the median over the
+runs is reported. With --budget-ms, exits with status 1 if a scenario is
+slower, so it can run as a regression check:
+
+    python -m benchmarks.bench_import [--runs 15] [--budget-ms 20]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    'import choochoo': 'import choochoo',
+    'one wrapper': "import choochoo; choochoo.FaSta(token='x')",
+    'all wrappers': 'from choochoo import Fahrplan, BahnPark, Cargo, FaSta, '
+                    'Flinkster, Reisezentren, Betriebsstellen',
+    'first request setup': "import choochoo; api = choochoo.FaSta("
+                           "token='x'); api.transport; api.decoder",
+}
+# Modules that should only be imported once a request is made.
+HEAVY = ('requests', 'urllib3', 'orjson', 'ujson', 'json', 'asyncio',
+         'aiohttp', 'concurrent.futures', 'configparser')
+
+
+def importtime(statement):
+    """Returns the summed self time in µs and the names of the modules
+    imported by statement in a fresh interpreter.
+
+    :param statement: str
+    :return: tuple of int and list of str
+    """
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             statement], capture_output=True, text=True,
+                            check=True).stderr
+    total, modules, started = 0, [], False
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        if not self_time.strip().isdigit():
+            continue  # header
+        if not started:
+            # Skip what the interpreter imports on startup, up to site.
+            started = name == ' site'
+            continue
+        total += int(self_time)
+        modules.append(name.strip())
+    return total, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='fail if a scenario takes longer')
+    args = parser.parse_args(argv)
+
+    failed = False
+    print('%-20s %10s  %s' % ('scenario', 'median ms', 'heavy imports'))
+    for name, statement in SCENARIOS.items():
+        times, modules = [], []
+        for _ in range(args.runs):
+            total, modules = importtime(statement)
+            times.append(total / 1000)
+        median = statistics.median(times)
+        heavy = [m for m in HEAVY if m in modules]
+        print('%-20s %10.2f  %s' % (name, median, ', '.join(heavy) or '-'))
+        if args.budget_ms is not None and median > args.budget_ms and \
+                name != 'first request setup':
+            failed = True
+    if failed:
+        print('Import time exceeds the budget of %.1f ms!' % args.budget_ms)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
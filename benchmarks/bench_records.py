@@ -0,0 +1,49 @@
+"""Compares memory per board and filter speed of dict boards and
+BoardEntry records.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_records [entries_per_board] [boards]
+"""
+import json
+import sys
+import timeit
+import tracemalloc
+
+from choochoo.records import to_board
+
+from .payloads import board
+
+
+def allocated(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main(entries=1500, boards=20):
+    raws = [json.dumps(board(entries, seed=seed)).encode()
+            for seed in range(boards)]
+    dicts, dict_size = allocated(lambda: [json.loads(raw) for raw in raws])
+    records, record_size = allocated(
+        lambda: [to_board(json.loads(raw)) for raw in raws])
+    print('%d boards of %d entries' % (boards, entries))
+    print('dicts:   %8.1f KiB per board' % (dict_size / boards / 1024))
+    print('records: %8.1f KiB per board' % (record_size / boards / 1024))
+
+    dict_filter = min(timeit.repeat(
+        lambda: [e for b in dicts for e in b
+                 if e['type'] == 'ICE' and e['track'] == '7'],
+        number=10, repeat=5))
+    record_filter = min(timeit.repeat(
+        lambda: [e for b in records for e in b
+                 if e.type == 'ICE' and e.track == '7'],
+        number=10, repeat=5))
+    print('filter on dicts:   %.2fms' % (dict_filter * 100))
+    print('filter on records: %.2fms' % (record_filter * 100))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,54 @@
+"""Compares time-to-first-item and peak memory of BahnPark.spaces() and
+BahnPark.stream_spaces() on a large payload served by a local stub.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_stream [n_spaces]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from choochoo import BahnPark
+
+from . import payloads
+from .stub import StubHandler, StubServer
+
+
+def spaces_handler(n):
+    class SpacesHandler(StubHandler):
+        body = json.dumps(payloads.spaces(n)).encode()
+
+    return SpacesHandler
+
+
+def measure(fetch):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in fetch():
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, first, total, peak
+
+
+def main(n=100000):
+    with StubServer(spaces_handler(n)) as server:
+        api = BahnPark(token='benchmark')
+        api.address = server.address
+        for name, fetch in (('spaces()', lambda: api.spaces()['items']),
+                            ('stream_spaces()', api.stream_spaces)):
+            count, first, total, peak = measure(fetch)
+            print('%-16s %d items, first after %.3fs, all after %.3fs, '
+                  'peak memory %.1f MiB'
+                  % (name, count, first, total, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,164 @@
+"""Throughput, latency percentiles and peak memory of typical workloads
+against the local stand-in server, with sequential, threaded and asyncio
+clients.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_suite [-n 200] [--workers 16] [--latency 0.02]
+
+Peak memory is traced with tracemalloc in a separate, shorter pass, as
+tracing slows down the client; it covers the client's Python allocations
+only.
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from choochoo import BahnPark, FaSta, Fahrplan
+from choochoo.bulk import fan_out
+from choochoo.retry import RetryPolicy
+from choochoo.transport import Transport
+
+from .standin import StandInServer
+
+try:
+    from choochoo.aio import (AsyncBahnPark, AsyncClient, AsyncFaSta,
+                              AsyncFahrplan, aiohttp)
+except ImportError:
+    aiohttp = None
+if aiohttp is None:
+    AsyncBahnPark = AsyncClient = AsyncFaSta = AsyncFahrplan = None
+
+# name: (sync wrapper, async wrapper or None without aiohttp, call)
+WORKLOADS = {
+    'board': (Fahrplan, AsyncFahrplan,
+              lambda api: api.departures('8011160', date='2017-05-24')),
+    'spaces': (BahnPark, AsyncBahnPark, lambda api: api.spaces()),
+    'facilities': (FaSta, AsyncFaSta, lambda api: api.facilities()),
+}
+
+
+def percentile(latencies, p):
+    ordered = sorted(latencies)
+    if not ordered:
+        return float('nan')
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def timed(call):
+    start = time.perf_counter()
+    try:
+        call()
+        error = None
+    except Exception as e:
+        error = e
+    return time.perf_counter() - start, error
+
+
+def run_sequential(make_api, call, n, workers):
+    api = make_api()
+    return [timed(lambda: call(api)) for _ in range(n)]
+
+
+def run_threaded(make_api, call, n, workers):
+    api = make_api()
+    return [result.value for result in fan_out(
+        lambda _: timed(lambda: call(api)), range(n), workers=workers)]
+
+
+def run_async(make_api, call, n, workers):
+    async def main():
+        async with AsyncClient(max_concurrency=workers) as client:
+            api = make_api(client)
+            semaphore = asyncio.Semaphore(workers)
+
+            async def one():
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        await call(api)
+                        error = None
+                    except Exception as e:
+                        error = e
+                    return time.perf_counter() - start, error
+
+            return await asyncio.gather(*(one() for _ in range(n)))
+
+    return asyncio.run(main())
+
+
+MODES = {'sequential': run_sequential, 'threaded': run_threaded,
+         'async': run_async}
+
+
+def measure(run, make_api, call, n, workers):
+    run(make_api, call, min(n, workers), workers)  # warm up
+    start = time.perf_counter()
+    results = run(make_api, call, n, workers)
+    wall = time.perf_counter() - start
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, error in results if error is not None)
+
+    tracemalloc.start()
+    run(make_api, call, max(min(n // 4, 50), min(n, workers)), workers)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'throughput': n / wall, 'p50': percentile(latencies, 50),
+            'p99': percentile(latencies, 99), 'peak': peak,
+            'errors': errors}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', type=int, default=200,
+                        help='requests per workload and mode')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds the stand-in waits per request')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--retry', action='store_true',
+                        help='give the sync wrappers a RetryPolicy')
+    parser.add_argument('--workloads', nargs='+', default=list(WORKLOADS),
+                        choices=list(WORKLOADS))
+    parser.add_argument('--modes', nargs='+', default=list(MODES),
+                        choices=list(MODES))
+    args = parser.parse_args(argv)
+
+    print('%-11s %-11s %9s %9s %9s %10s %7s' % (
+        'workload', 'mode', 'req/s', 'p50 ms', 'p99 ms', 'peak KiB',
+        'errors'))
+    with StandInServer(latency=args.latency, jitter=args.jitter,
+                       error_rate=args.error_rate) as server, \
+            Transport(pool_maxsize=args.workers) as transport:
+        for name in args.workloads:
+            wrapper, async_wrapper, call = WORKLOADS[name]
+            for mode in args.modes:
+                if mode == 'async':
+                    if async_wrapper is None:
+                        print('%-11s %-11s skipped, requires aiohttp'
+                              % (name, mode))
+                        continue
+
+                    def make_api(client, cls=async_wrapper):
+                        api = cls(token='benchmark', client=client)
+                        server.mount(api)
+                        return api
+                else:
+                    def make_api(cls=wrapper):
+                        api = cls(token='benchmark', transport=transport,
+                                  retry=RetryPolicy(backoff=0.01)
+                                  if args.retry else None)
+                        server.mount(api)
+                        return api
+                result = measure(MODES[mode], make_api, call, args.n,
+                                 args.workers)
+                print('%-11s %-11s %9.1f %9.2f %9.2f %10.0f %7d' % (
+                    name, mode, result['throughput'], result['p50'] * 1000,
+                    result['p99'] * 1000, result['peak'] / 1024,
+                    result['errors']))
+
+
+if __name__ == '__main__':
+    main()
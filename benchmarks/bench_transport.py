@@ -0,0 +1,46 @@
+"""Compares requests/sec of per-call connections and the pooled Transport.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_transport [n_requests]
+"""
+import sys
+import time
+
+import requests
+
+from choochoo import Fahrplan
+from choochoo.transport import Transport
+
+from .stub import StubServer
+
+
+class PerCallTransport:
+    """Reproduces the old behaviour: one module-level requests.request()
+    call, and thus one fresh connection, per API call."""
+
+    def request(self, verb, url, **req_kwargs):
+        return requests.request(verb, url, **req_kwargs)
+
+
+def run(transport, address, n):
+    api = Fahrplan(token='benchmark', transport=transport)
+    api.address = address + 'freeplan/v1/'
+    start = time.perf_counter()
+    for _ in range(n):
+        api.departures('8011160', date='2017-01-01')
+    return n / (time.perf_counter() - start)
+
+
+def main(n=2000):
+    with StubServer() as server:
+        before = run(PerCallTransport(), server.address, n)
+        with Transport() as transport:
+            after = run(transport, server.address, n)
+    print('per-call connections: %8.1f req/s' % before)
+    print('pooled keep-alive:    %8.1f req/s' % after)
+    print('speed-up:             %8.2fx' % (after / before))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,183 @@
+"""Deterministic stand-in payloads for the DB OpenData APIs.
+
+The payloads are synthetic, modelled on the documented response shapes of
+each API and sized like full responses, so benchmarks can run without an
+access token or network.
+"""
+import random
+
+STATION_NAMES = ('Berlin Hbf', 'Hamburg Hbf', 'München Hbf', 'Köln Hbf',
+                 'Frankfurt(Main)Hbf', 'Stuttgart Hbf', 'Düsseldorf Hbf',
+                 'Dortmund Hbf', 'Essen Hbf', 'Leipzig Hbf', 'Bremen Hbf',
+                 'Dresden Hbf', 'Hannover Hbf', 'Nürnberg Hbf', 'Bonn Hbf')
+TRAIN_TYPES = ('ICE', 'IC', 'EC', 'RE', 'RB', 'S')
+
+
+def _station(rng, i):
+    return '%s %d' % (rng.choice(STATION_NAMES), i)
+
+
+def location(n=50, seed=0):
+    rng = random.Random(seed)
+    return [{'name': _station(rng, i), 'lon': 6 + rng.random() * 9,
+             'lat': 47.5 + rng.random() * 7, 'id': 8000000 + i}
+            for i in range(n)]
+
+
+def board(n=1000, seed=0, arrivals=False):
+    rng = random.Random(seed)
+    entries = []
+    for i in range(n):
+        train = rng.choice(TRAIN_TYPES)
+        entry = {'name': '%s %d' % (train, rng.randint(1, 9999)),
+                 'type': train, 'boardId': 8011160, 'stopId': 8011160,
+                 'stopName': 'Berlin Hbf',
+                 'dateTime': '2017-05-24T%02d:%02d' % (i * 24 // n,
+                                                       rng.randint(0, 59)),
+                 'track': str(rng.randint(1, 16)),
+                 'detailsId': '%d%%2F%d%%2F%d%%2F%d%%2F80%%3fstation_evaId%%3D'
+                              '8011160' % (rng.randint(10 ** 5, 10 ** 6),
+                                           rng.randint(10 ** 5, 10 ** 6),
+                                           rng.randint(10 ** 5, 10 ** 6),
+                                           rng.randint(10 ** 5, 10 ** 6))}
+        if arrivals:
+            entry['origin'] = _station(rng, i)
+        entries.append(entry)
+    return entries
+
+
+def journey_details(n=20, seed=0):
+    rng = random.Random(seed)
+    return [{'stopId': 8000000 + i, 'stopName': _station(rng, i),
+             'lat': 47.5 + rng.random() * 7, 'lon': 6 + rng.random() * 9,
+             'arrTime': '%02d:%02d' % (8 + i // 2, rng.randint(0, 59)),
+             'depTime': '%02d:%02d' % (8 + i // 2, rng.randint(0, 59)),
+             'train': 'ICE 1001', 'type': 'ICE', 'operator': 'DPN',
+             'notes': []} for i in range(n)]
+
+
+def spaces(n=2000, seed=0):
+    rng = random.Random(seed)
+    items = [{'id': 100000 + i, 'title': 'P%d %s' % (i % 5, _station(rng, i)),
+              'station': {'id': i, 'name': _station(rng, i)},
+              'geoLocation': {'latitude': 47.5 + rng.random() * 7,
+                              'longitude': 6 + rng.random() * 9},
+              'numberParkingPlaces': rng.randint(20, 1500),
+              'numberHandicapedPlaces': rng.randint(0, 20),
+              'spaceType': rng.choice(('Parkhaus', 'Parkplatz', 'Tiefgarage')),
+              'tariffPrices': [{'duration': '1hour', 'price': 1.5},
+                               {'duration': '1day', 'price': 12.0},
+                               {'duration': '1week', 'price': 60.0}],
+              'isMonthVendingMachine': rng.random() < 0.5,
+              'openingHours': '24 Stunden, 7 Tage'} for i in range(n)]
+    return {'count': n, 'items': items}
+
+
+def occupancies(n=2000, seed=0):
+    rng = random.Random(seed)
+    allocations = []
+    for i in range(n):
+        category = rng.randint(1, 4)
+        allocations.append({
+            'space': {'id': 100000 + i, 'title': _station(rng, i),
+                      'station': {'id': i, 'name': _station(rng, i)}},
+            'allocation': {'validData': True,
+                           'timestamp': '2017-05-24T12:00:00',
+                           'timeSegment': '2017-05-24T11:55:00',
+                           'category': category,
+                           'text': ('> 10', '> 30', '> 50', 'frei')[
+                               category - 1]}})
+    return {'allocations': allocations}
+
+
+def prognoses(space_id=100000, n=96, seed=0):
+    rng = random.Random(seed)
+    return {'space': {'id': space_id},
+            'prognoses': [{'timeSegment': '2017-05-24T%02d:%02d:00'
+                                          % (i // 4, i % 4 * 15),
+                           'category': rng.randint(1, 4)}
+                          for i in range(n)]}
+
+
+def facilities(n=3000, seed=0):
+    rng = random.Random(seed)
+    return [{'equipmentnumber': 10000000 + i,
+             'type': rng.choice(('ELEVATOR', 'ESCALATOR')),
+             'description': 'zu Gleis %d/%d' % (2 * i % 20 + 1,
+                                                 2 * i % 20 + 2),
+             'geocoordX': 6 + rng.random() * 9,
+             'geocoordY': 47.5 + rng.random() * 7,
+             'state': rng.choice(('ACTIVE', 'ACTIVE', 'ACTIVE', 'INACTIVE')),
+             'stateExplanation': 'available',
+             'stationnumber': rng.randint(1, 7000)} for i in range(n)]
+
+
+def delays(n=500, seed=0):
+    rng = random.Random(seed)
+    return [{'stationId': 80000000 + i, 'stationName': _station(rng, i),
+             'lat': 47.5 + rng.random() * 7, 'long': 6 + rng.random() * 9,
+             'date': '2017-05-24', 'trains': rng.randint(1, 200),
+             'delayedTrains': rng.randint(0, 50),
+             'averageDelay': round(rng.random() * 60, 2)} for i in range(n)]
+
+
+def areas(n=500, seed=0):
+    rng = random.Random(seed)
+    items = [{'uid': '%040X' % rng.getrandbits(160), 'name': _station(rng, i),
+              'type': 'station',
+              'geometry': {'position': {
+                  'type': 'Point',
+                  'coordinates': [6 + rng.random() * 9,
+                                  47.5 + rng.random() * 7]}},
+              'provider': {'href': '/providers/1'}} for i in range(n)]
+    return {'offset': 0, 'limit': n, 'size': n, 'items': items}
+
+
+def booking_proposals(n=50, seed=0, lat=52.5, lon=13.4):
+    rng = random.Random(seed)
+    items = [{'rentalObject': {
+                  'uid': '%040X' % rng.getrandbits(160),
+                  'name': 'Fahrzeug %d' % i, 'fuelLevel': rng.randint(0, 100),
+                  'position': {'type': 'Point',
+                               'coordinates': [lon + rng.uniform(-0.01, 0.01),
+                                               lat + rng.uniform(-0.01, 0.01)
+                                               ]}},
+              'area': {'uid': '%040X' % rng.getrandbits(160)},
+              'price': {'currency': 'EUR', 'amount': rng.randint(100, 900)}}
+             for i in range(n)]
+    return {'offset': 0, 'limit': n, 'size': n, 'items': items}
+
+
+def reisezentren(n=400, seed=0):
+    rng = random.Random(seed)
+    return [{'id': 500000 + i, 'name': 'Reisezentrum %s' % _station(rng, i),
+             'address': 'Bahnhofsplatz %d' % (i % 20 + 1),
+             'postCode': '%05d' % rng.randint(1000, 99999),
+             'city': rng.choice(STATION_NAMES).split()[0],
+             'lat': 47.5 + rng.random() * 7, 'lon': 6 + rng.random() * 9,
+             'openingTimes': {'mon-fri': '06:00-21:00',
+                              'sat': '07:00-20:00', 'sun': '08:00-20:00'}}
+            for i in range(n)]
+
+
+def betriebsstellen(n=15000, seed=0):
+    rng = random.Random(seed)
+    entries = []
+    for i in range(n):
+        name = _station(rng, i)
+        entries.append({'abbrev': 'A%04X' % i, 'name': name,
+                        'short': name[:12], 'type': rng.choice(('Bf', 'Hp',
+                                                                'Abzw')),
+                        'status': None, 'locationCode': 'DE%05d' % i,
+                        'UIC': '80', 'RB': rng.randint(1, 7),
+                        'validFrom': '2017-01-01', 'validTill': None,
+                        'netKey': str(rng.randint(10, 99)),
+                        'isBorderStation': False, 'isShipping': False,
+                        'isPassenger': rng.random() < 0.6})
+    return entries
+
+
+# One representative large response per API.
+PER_API = {'Fahrplan': board, 'BahnPark': spaces, 'Cargo': delays,
+           'FaSta': facilities, 'Flinkster': areas,
+           'Reisezentren': reisezentren, 'Betriebsstellen': betriebsstellen}
@@ -0,0 +1,157 @@
+"""Local stand-in for all seven DB OpenData APIs.
+
+Replays the synthetic payloads of .payloads under the same paths the
+wrappers request, with optional latency and error injection. Point a
+wrapper at it by replacing the API host in its address:
+
+    with StandInServer(latency=0.02, error_rate=0.01) as server:
+        api = BahnPark(token='benchmark')
+        server.mount(api)
+        api.spaces()
+
+Query parameters are ignored; every path of a template gets the same body.
+"""
+import json
+import multiprocessing
+import random
+import sys
+import threading
+import time
+
+from choochoo.base import match_template
+
+from . import payloads
+from .stub import StubHandler, StubServer
+
+ROUTES = (
+    ('freeplan/v1/location/{name}', payloads.location),
+    ('freeplan/v1/departureBoard/{id}', payloads.board),
+    ('freeplan/v1/arrivalBoard/{id}',
+     lambda: payloads.board(arrivals=True)),
+    ('freeplan/v1/journeyDetails/{id}', payloads.journey_details),
+    ('bahnpark/v1/spaces', payloads.spaces),
+    ('bahnpark/v1/spaces/pit', lambda: payloads.spaces(200)),
+    ('bahnpark/v1/spaces/occupancies', payloads.occupancies),
+    ('bahnpark/v1/spaces/{id}', lambda: payloads.spaces(1)['items'][0]),
+    ('bahnpark/v1/spaces/{id}/occupancies',
+     lambda: payloads.occupancies(1)['allocations'][0]),
+    ('bahnpark/v1/spaces/{id}/prognoses', payloads.prognoses),
+    ('bahnpark/v1/stations',
+     lambda: [space['station'] for space in payloads.spaces(500)['items']]),
+    ('bahnpark/v1/stations/pit',
+     lambda: [space['station'] for space in payloads.spaces(50)['items']]),
+    ('bahnpark/v1/stations/{id}',
+     lambda: payloads.spaces(1)['items'][0]['station']),
+    ('cargo/v1/delays', payloads.delays),
+    ('cargo/v1/delays/{id}', lambda: payloads.delays(1)),
+    ('cargo/v1/delays/loc/{lat}/{long}', lambda: payloads.delays(5)),
+    ('fasta/v1/facilities', payloads.facilities),
+    ('fasta/v1/facilities/{id}', lambda: payloads.facilities(1)[0]),
+    ('fasta/v1/disruptions',
+     lambda: [facility for facility in payloads.facilities()
+              if facility['state'] == 'INACTIVE']),
+    ('fasta/v1/disruptions/{id}', lambda: payloads.facilities(1)[0]),
+    ('fasta/v1/stations/{id}',
+     lambda: {'stationnumber': 1, 'name': 'Berlin Hbf',
+              'facilities': payloads.facilities(20)}),
+    ('flinkster-api-ng/v1/areas', payloads.areas),
+    ('flinkster-api-ng/v1/areas/{id}',
+     lambda: payloads.areas(1)['items'][0]),
+    ('flinkster-api-ng/v1/bookingproposals', payloads.booking_proposals),
+    ('reisezentren/v1/reisezentren', payloads.reisezentren),
+    ('reisezentren/v1/reisezentren/{id}',
+     lambda: payloads.reisezentren(1)[0]),
+    ('reisezentren/v1/reisezentren/loc/{lat}/{lon}',
+     lambda: payloads.reisezentren(1)[0]),
+    ('betriebsstellen/v1/betriebsstellen', payloads.betriebsstellen),
+    ('betriebsstellen/v1/betriebsstellen/{abbrev}',
+     lambda: payloads.betriebsstellen(1)[0]),
+)
+
+
+class StandInHandler(StubHandler):
+    """Serves ROUTES; bodies are encoded once per route on first use.
+
+    Class attributes configure the behaviour: `latency` seconds plus up to
+    `jitter` more are waited before each answer, and a share `error_rate`
+    of requests is answered with `error_status` instead.
+    """
+
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    error_status = 503
+    _bodies = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def body_of(cls, path):
+        path = path.split('?')[0].lstrip('/')
+        for template, payload in ROUTES:
+            if match_template(template, path):
+                with cls._lock:
+                    if template not in cls._bodies:
+                        cls._bodies[template] = json.dumps(payload()).encode()
+                    return cls._bodies[template]
+        return None
+
+    def answer(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status in (429, 503):
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        if self.error_rate and random.random() < self.error_rate:
+            return self.answer(self.error_status, b'{"error": "injected"}')
+        body = self.body_of(self.path)
+        if body is None:
+            return self.answer(404, b'{"error": "unknown endpoint"}')
+        self.answer(200, body)
+
+
+class StandInServer(StubServer):
+    """Runs the stand-in, by default in a forked process so it neither
+    competes with the measured client for the GIL nor shows up in its
+    memory traces.
+
+    :param latency: float, seconds waited before each answer
+    :param jitter: float, max. seconds randomly added to latency
+    :param error_rate: float, share of requests answered with an error
+    :param error_status: int, status code of injected errors
+    :param process: bool, serve from a separate process; falls back to a
+        thread where fork isn't available
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_status=503, process=True, host='127.0.0.1', port=0):
+        handler = type('ConfiguredStandInHandler', (StandInHandler,),
+                       {'latency': latency, 'jitter': jitter,
+                        'error_rate': error_rate,
+                        'error_status': error_status})
+        super(StandInServer, self).__init__(handler, host, port)
+        self.process = process and sys.platform != 'win32' and \
+            'fork' in multiprocessing.get_all_start_methods()
+        if self.process:
+            self.thread = multiprocessing.get_context('fork').Process(
+                target=self.httpd.serve_forever, daemon=True)
+
+    def mount(self, api):
+        """Points a wrapper at the stand-in instead of the live API.
+
+        :param api: choochoo.base.Interface
+        """
+        api.address = api.address.replace('https://api.deutschebahn.com/',
+                                          self.address)
+
+    def __exit__(self, *exc_info):
+        if not self.process:
+            return super(StandInServer, self).__exit__(*exc_info)
+        self.thread.terminate()
+        self.thread.join()
+        self.httpd.server_close()
@@ -0,0 +1,51 @@
+"""Minimal local HTTP stand-in for api.deutschebahn.com.
+
+Answers every GET with a small JSON body over HTTP/1.1, so clients can keep
+connections alive between requests.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    body = json.dumps([{'name': 'ICE 1000', 'type': 'ICE'}]).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Runs a StubHandler server on a background thread.
+
+    Use as a context manager; `address` is the base URL to assign to a
+    wrapper's `address` attribute.
+    """
+
+    def __init__(self, handler=StubHandler, host='127.0.0.1', port=0):
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever,
+                                       daemon=True)
+
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://%s:%s/' % (host, port)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,7 +1,26 @@
-from .fahrplan import Fahrplan
-from .bahnpark import BahnPark
-from .cargo import Cargo
-from .fasta import FaSta
-from .flinkster import Flinkster
-from .reisezentren import Reisezentren
-from .betriebsstellen import Betriebsstellen
\ No newline at end of file
+"""Wrappers for Deutsche Bahn's OpenData APIs.
+
+The wrapper classes are imported on first access, so importing the package
+only loads the modules of the APIs actually used.
+"""
+import importlib
+
+_WRAPPERS = {'Fahrplan': '.fahrplan', 'BahnPark': '.bahnpark',
+             'Cargo': '.cargo', 'FaSta': '.fasta', 'Flinkster': '.flinkster',
+             'Reisezentren': '.reisezentren',
+             'Betriebsstellen': '.betriebsstellen'}
+
+__all__ = list(_WRAPPERS)
+
+
+def __getattr__(name):
+    if name not in _WRAPPERS:
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name))
+    value = getattr(importlib.import_module(_WRAPPERS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
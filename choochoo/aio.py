@@ -0,0 +1,344 @@
+"""Asyncio counterparts of the API wrappers.
+
+Each Async* class reuses the endpoint building and parameter validation of
+its blocking counterpart; only request() is replaced by a coroutine, so
+every endpoint method returns an awaitable:
+
+    async with AsyncClient(max_concurrency=200) as client:
+        api = AsyncFahrplan(config='config.ini', client=client)
+        board = await api.departures('8011160')
+
+Invalid arguments still raise ValueError when the method is called, before
+anything is awaited. Requires aiohttp.
+"""
+import asyncio
+import threading
+import time
+
+from .bahnpark import BahnPark
+from .betriebsstellen import Betriebsstellen
+from .bulk import Result, async_fan_out
+from .cargo import Cargo
+from .fahrplan import Fahrplan
+from .fasta import FaSta
+from .flinkster import Flinkster
+from .paging import async_paginate
+from .records import to_board
+from .reisezentren import Reisezentren
+from .stream import ItemParser
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncClient:
+    """Shared aiohttp connection pool with a concurrency limiter.
+
+    The underlying aiohttp.ClientSession is created lazily inside the
+    running event loop. If the client is used from a different loop later
+    on, the old session is closed and a new one created; using the client
+    from two loops at the same time raises RuntimeError.
+
+    :param limit: int, max. number of open connections in total
+    :param limit_per_host: int, max. number of open connections per host,
+        0 means no per-host limit
+    :param max_concurrency: int, max. number of requests in flight
+    :param timeout: float, total timeout per request in seconds
+    """
+
+    def __init__(self, limit=100, limit_per_host=0, max_concurrency=100,
+                 timeout=None):
+        if aiohttp is None:
+            raise ImportError("choochoo's async wrappers require aiohttp!")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._session = None
+        self._limiter = None
+        self._loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._loop is not loop:
+            if self._loop.is_running():
+                raise RuntimeError("AsyncClient is in use by another event "
+                                   "loop!")
+            session, self._session = self._session, None
+            if self._loop.is_closed():
+                await session.close()
+            else:
+                # An open loop's connections can only be closed by itself.
+                await loop.run_in_executor(None, self._loop.run_until_complete,
+                                           session.close())
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=timeout)
+            self._limiter = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._session
+
+    async def request(self, verb, url, **req_kwargs):
+        """Sends a request and returns its body once the status is checked.
+
+        :param verb: str
+        :param url: str
+        :param req_kwargs: kwargs accepted by aiohttp.ClientSession.request()
+        :return: bytes
+        :raises: aiohttp.ClientResponseError for 4xx and 5xx responses
+        """
+        session = await self._bind()
+        async with self._limiter:
+            async with session.request(verb, url, **req_kwargs) as resp:
+                body = await resp.read()
+                resp.raise_for_status()
+                return body
+
+    async def stream(self, verb, url, chunk_size=65536, **req_kwargs):
+        """Yields the body of a response in chunks as it downloads.
+
+        :param verb: str
+        :param url: str
+        :param chunk_size: int
+        :param req_kwargs: kwargs accepted by aiohttp.ClientSession.request()
+        :return: async generator of bytes
+        :raises: aiohttp.ClientResponseError for 4xx and 5xx responses
+        """
+        session = await self._bind()
+        async with self._limiter:
+            async with session.request(verb, url, **req_kwargs) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.content.iter_chunked(chunk_size):
+                    yield chunk
+
+    async def close(self):
+        """Closes the underlying session and its connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def default_client():
+    """Returns the process-wide AsyncClient shared by all async wrappers
+    that weren't given one explicitly.
+
+    :return: AsyncClient
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = AsyncClient()
+        return _default_client
+
+
+async def _ready(value):
+    # Keeps results that need no request awaitable like the API calls.
+    return value
+
+
+class AsyncInterface:
+    """Mixin replacing an Interface subclass' request() with a coroutine.
+
+    Must precede the wrapper class in the bases of the async class.
+
+    The TTL cache, rate limiter and metrics work as in the sync wrappers.
+    http_cache and retry build on requests' responses and exceptions and
+    are rejected with a TypeError.
+    """
+
+    def __init__(self, *args, client=None, **kwargs):
+        for name in ('http_cache', 'retry'):
+            if kwargs.get(name) is not None:
+                raise TypeError("Async wrappers don't support %s!" % name)
+        super(AsyncInterface, self).__init__(*args, **kwargs)
+        self.client = client if client else default_client()
+
+    async def request(self, endpoint, verb=None, **req_kwargs):
+        """Returns Data from the endpoint as python object.
+
+        :param endpoint: str
+        :param verb: str
+        :param req_kwargs: kwargs accepted by aiohttp.ClientSession.request()
+        :return: dict or list
+        """
+        req_kwargs['headers'] = self.headers()
+        verb = 'GET' if not verb else verb
+        url = self.generate_url(endpoint)
+        ttl = None
+        if self.cache is not None and verb == 'GET':
+            ttl = self.cache_ttl(endpoint)
+        if ttl:
+            # Failed requests raise, so only successful bodies are cached.
+            body = await self.cache.get_or_load_async(
+                self._cache_key(url, req_kwargs.get('params')), ttl,
+                lambda: self._fetch(verb, url, req_kwargs))
+        else:
+            body = await self._fetch(verb, url, req_kwargs)
+        if self.metrics is None:
+            return self.decoder(body)
+        start = time.perf_counter()
+        data = self.decoder(body)
+        self.metrics.observe(type(self).__name__, self.template(url),
+                             'decode_seconds', time.perf_counter() - start)
+        return data
+
+    async def _fetch(self, verb, url, req_kwargs):
+        await self._throttle()
+        if self.metrics is None:
+            return await self.client.request(verb, url, **req_kwargs)
+        # aiohttp exposes neither TTFB nor retries here; the status is only
+        # known for errors, successful requests are counted as 200.
+        wrapper, template = type(self).__name__, self.template(url)
+        start = time.perf_counter()
+        try:
+            body = await self.client.request(verb, url, **req_kwargs)
+        except Exception as e:
+            self.metrics.request(wrapper, template,
+                                 getattr(e, 'status', type(e).__name__),
+                                 time.perf_counter() - start)
+            raise
+        self.metrics.request(wrapper, template, 200,
+                             time.perf_counter() - start, size=len(body))
+        return body
+
+    async def stream(self, endpoint, key=None, chunk_size=65536,
+                     **req_kwargs):
+        """Async counterpart of Interface.stream().
+
+        :return: async generator
+        """
+        req_kwargs['headers'] = self.headers()
+        url = self.generate_url(endpoint)
+        await self._throttle()
+        parser = ItemParser(key)
+        chunks = self.client.stream('GET', url, chunk_size, **req_kwargs)
+        try:
+            async for chunk in chunks:
+                for item in parser.feed(chunk):
+                    yield item
+                if parser.done:
+                    return
+            for item in parser.close():
+                yield item
+        finally:
+            await chunks.aclose()
+
+    def _pages(self, fetch, page_size, prefetch, max_items):
+        return async_paginate(fetch, page_size, prefetch=prefetch,
+                              max_items=max_items)
+
+    async def _throttle(self):
+        if self.rate_limiter is not None:
+            wait = self.rate_limiter.reserve(self.token)
+            if wait:
+                await asyncio.sleep(wait)
+
+
+class AsyncBahnPark(AsyncInterface, BahnPark):
+    """Asyncio counterpart of BahnPark.
+
+    bulk_prognoses() returns an awaitable.
+    """
+
+    async def _bulk_prognoses(self, space_ids, slot, workers, how):
+        from .prognoses import space_ids as ids_of, to_matrix
+        if space_ids is None:
+            space_ids = ids_of(await self.spaces())
+        results = [result async for result in async_fan_out(
+            lambda space_id: self.occupancies(str(space_id), prognoses=True),
+            space_ids, workers=workers)]
+        return to_matrix(results, space_ids, slot, how)
+
+
+class AsyncBetriebsstellen(AsyncInterface, Betriebsstellen):
+    """Asyncio counterpart of Betriebsstellen."""
+
+    def betriebsstellen(self, station_name, is_abbreviation=False,
+                        index=None):
+        result = super(AsyncBetriebsstellen, self).betriebsstellen(
+            station_name, is_abbreviation=is_abbreviation, index=index)
+        if index is None:
+            return result
+        return _ready(result)
+
+
+class AsyncCargo(AsyncInterface, Cargo):
+    """Asyncio counterpart of Cargo.
+
+    bulk_delays() returns an awaitable.
+    """
+
+    async def _bulk_cells(self, coordinates, cells, workers,
+                          endpoint_kwargs):
+        results = {}
+        async for result in async_fan_out(
+                lambda cell: self.delays(by_lat_long=cell, **endpoint_kwargs),
+                set(cells), workers=workers):
+            results[result.key] = result
+        return [Result(coordinate, results[cell].value, results[cell].error)
+                for coordinate, cell in zip(coordinates, cells)]
+
+
+class AsyncFahrplan(AsyncInterface, Fahrplan):
+    """Asyncio counterpart of Fahrplan.
+
+    bulk_departures() and bulk_arrivals() return async generators.
+    """
+
+    async def _board(self, endpoint, date, typed):
+        board = await self.request(endpoint, params={'date': date})
+        return to_board(board) if typed else board
+
+    def _bulk_boards(self, board, keys, workers, typed):
+        return async_fan_out(lambda key: board(*key, typed=typed), keys,
+                             workers=workers)
+
+
+class AsyncFaSta(AsyncInterface, FaSta):
+    """Asyncio counterpart of FaSta."""
+
+
+class AsyncFlinkster(AsyncInterface, Flinkster):
+    """Asyncio counterpart of Flinkster.
+
+    sweep_booking_proposals() returns an async generator.
+    """
+
+    async def _sweep(self, tiles, bbox, limit, max_depth, workers,
+                     endpoint_kwargs):
+        seen = set()
+        depth = 0
+        while tiles:
+            split = []
+            results = async_fan_out(lambda tile: self.booking_proposals(
+                **self._tile_params(tile, limit, endpoint_kwargs)),
+                tiles, workers=workers)
+            async for result in results:
+                if result.error is not None:
+                    raise result.error
+                items = self._proposal_items(result.value)
+                if len(items) >= limit and depth < max_depth:
+                    split.extend(self._split(result.key))
+                for item in self._new_proposals(items, bbox, seen):
+                    yield item
+            tiles = split
+            depth += 1
+
+
+class AsyncReisezentren(AsyncInterface, Reisezentren):
+    """Asyncio counterpart of Reisezentren."""
@@ -1,4 +1,5 @@
 from .base import Interface
+from .bulk import fan_out
 
 
 class BahnPark(Interface):
@@ -8,9 +9,19 @@ class BahnPark(Interface):
         https://developer.deutschebahn.com/store/apis/info?name=BahnPark&version=v1&provider=DBOpenData
     """
 
-    def __init__(self, token=None, key=None, secret=None, config=None):
+    accept = 'application/json;charset=utf-8'
+    templates = ('spaces', 'spaces/pit', 'spaces/occupancies', 'spaces/{id}',
+                 'spaces/{id}/occupancies', 'spaces/{id}/prognoses',
+                 'stations', 'stations/pit', 'stations/{id}')
+
+    cache_ttls = {'stations': 3600,
+                  'stations/pit': 3600,
+                  'stations/{id}': 3600}
+
+    def __init__(self, token=None, key=None, secret=None, config=None,
+                 **kwargs):
         super(BahnPark, self).__init__(key=key, secret=secret, token=token,
-                                       config=config)
+                                       config=config, **kwargs)
         self.address += 'bahnpark/v1/'
 
     def request(self, endpoint, verb=None, **req_kwargs):
@@ -18,19 +29,18 @@ class BahnPark(Interface):
 
         Querys API using a super() call to Interface.request(), checks the 
         HTTP status code and returns the response's json data 
-        as a python object.
+        as a python object, decoded by the wrapper's decoder.
 
         :param endpoint: str
         :param verb: str
         :param req_kwargs: kwargs accepted by requests.Request() 
         :return: Dict or list
         """
-        req_kwargs['headers'] = {'Authorization': 'Bearer ' + self.token,
-                                 'Accept': 'application/json;charset=utf-8'}
+        req_kwargs['headers'] = self.headers()
         resp = super(BahnPark, self).request(endpoint, verb=verb,
                                              **req_kwargs)
         resp.raise_for_status()
-        return resp.json()
+        return self.decode(resp)
 
     def spaces(self, by_id=None, by_name=None, **endpoint_kwargs):
         """Get available parking spaces at given location.
@@ -55,6 +65,14 @@ class BahnPark(Interface):
         else:
             return self.request('spaces', params=endpoint_kwargs)
 
+    def stream_spaces(self, **endpoint_kwargs):
+        """Yields all parking spaces one by one while they download.
+
+        :param endpoint_kwargs: optional parameters of the endpoint
+        :return: generator of dicts
+        """
+        return self.stream('spaces', key='items', params=endpoint_kwargs)
+
     def pit_parking(self, **endpoint_kwargs):
         """Retrieves a list of locations for pit parking services.
 
@@ -87,6 +105,34 @@ class BahnPark(Interface):
 
         return self.request(endpoint)
 
+    def bulk_prognoses(self, space_ids=None, slot=900, workers=8,
+                       how='max'):
+        """Fetches the prognoses of many spaces concurrently as a matrix of
+        spaces and time slots (requires numpy).
+
+        :param space_ids: iterable of space IDs; all spaces if None
+        :param slot: int, seconds per time slot
+        :param workers: int, max. number of concurrent requests
+        :param how: str, combines prognoses sharing a slot, one of 'max',
+            'min' and 'mean'; see choochoo.prognoses.to_matrix()
+        :return: choochoo.prognoses.PrognosisMatrix
+        """
+        from .prognoses import check
+        if slot <= 0:
+            raise ValueError("slot must be positive!")
+        check(how)
+        if space_ids is not None:
+            space_ids = list(dict.fromkeys(space_ids))
+        return self._bulk_prognoses(space_ids, slot, workers, how)
+
+    def _bulk_prognoses(self, space_ids, slot, workers, how):
+        from .prognoses import space_ids as ids_of, to_matrix
+        if space_ids is None:
+            space_ids = ids_of(self.spaces())
+        return to_matrix(fan_out(
+            lambda space_id: self.occupancies(str(space_id), prognoses=True),
+            space_ids, workers=workers), space_ids, slot, how)
+
     def stations(self, by_id=None, pit=False):
         """Query managing station data available at BahnPark.
         
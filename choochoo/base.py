@@ -1,16 +1,82 @@
-import requests
-import configparser
+import functools
+import re
+import time
+
+from . import decoders
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_template(template):
+    pattern = re.sub(r'\\{\w+\\}', '[^/]+', re.escape(template))
+    return re.compile(pattern)
+
+
+def match_template(template, endpoint):
+    """Checks whether endpoint is an instance of the endpoint template.
+
+    Placeholders in curly braces match exactly one path segment, e.g.
+    'spaces/{id}/occupancies' matches 'spaces/100035/occupancies'.
+
+    :param template: str
+    :param endpoint: str
+    :return: bool
+    """
+    return _compile_template(template).fullmatch(endpoint) is not None
+
 
 class Interface:
-    def __init__(self, *, key, secret, token, config=None):
+    accept = 'application/json'
+    # Maps endpoint templates to the seconds their responses may be cached.
+    cache_ttls = {}
+    # Templates of the wrapper's endpoints, most specific first; metrics
+    # are recorded per template.
+    templates = ()
+
+    def __init__(self, *, key, secret, token, config=None, transport=None,
+                 cache=None, http_cache=None, rate_limiter=None, retry=None,
+                 decoder='auto', metrics=None):
         self.key = key
         self.secret = secret
         self.token = token
         self.address = 'https://api.deutschebahn.com/'
+        self.transport = transport
+        self.cache = cache
+        self.http_cache = http_cache
+        self.rate_limiter = rate_limiter
+        self.retry = retry
+        self.decoder = decoder
+        self.metrics = metrics
         if config:
             self.load_config(config)
 
+    # The transport and decoder are only set up when first used, so that
+    # merely importing and instantiating a wrapper doesn't import requests
+    # or a JSON backend.
+    @property
+    def transport(self):
+        if self._transport is None:
+            from .transport import default_transport
+            self._transport = default_transport()
+        return self._transport
+
+    @transport.setter
+    def transport(self, transport):
+        self._transport = transport
+
+    @property
+    def decoder(self):
+        if self._decoder is None:
+            self._decoder = decoders.get_decoder(self._decoder_name)
+        return self._decoder
+
+    @decoder.setter
+    def decoder(self, name):
+        decoders.check(name)
+        self._decoder_name = name
+        self._decoder = name if callable(name) else None
+
     def load_config(self, path):
+        import configparser
         parser = configparser.ConfigParser()
         parser.read(path)
         try:
@@ -28,10 +94,148 @@ class Interface:
         except KeyError:
             print("No access token found in config!")
 
+    def headers(self):
+        return {'Authorization': 'Bearer ' + self.token, 'Accept': self.accept}
+
+    def decode(self, resp):
+        """Decodes a response's body with the wrapper's decoder.
+
+        :param resp: requests.Response()
+        :return: dict or list, or bytes for the 'raw' decoder
+        """
+        if self.metrics is None:
+            return self.decoder(resp.content)
+        content = resp.content
+        start = time.perf_counter()
+        data = self.decoder(content)
+        self.metrics.observe(type(self).__name__,
+                             self.template((resp.url or '').split('?')[0]),
+                             'decode_seconds', time.perf_counter() - start)
+        return data
+
     def generate_url(self, endpoint):
         return self.address + endpoint
 
+    def template(self, endpoint_or_url):
+        """Returns the first of the wrapper's templates matching endpoint,
+        or 'other' if none does.
+
+        :param endpoint_or_url: str, endpoint or full URL without query
+        :return: str
+        """
+        if endpoint_or_url.startswith(self.address):
+            endpoint_or_url = endpoint_or_url[len(self.address):]
+        for template in self.templates:
+            if match_template(template, endpoint_or_url):
+                return template
+        return 'other'
+
+    def cache_ttl(self, endpoint):
+        """Returns the TTL of the first template in cache_ttls matching
+        endpoint, or None if its responses shouldn't be cached.
+
+        :param endpoint: str
+        :return: float or None
+        """
+        for template, ttl in self.cache_ttls.items():
+            if match_template(template, endpoint):
+                return ttl
+        return None
+
     def request(self, endpoint, verb=None, **req_kwargs):
         verb = 'GET' if not verb else verb
         url = self.generate_url(endpoint)
-        return requests.request(verb, url, **req_kwargs)
\ No newline at end of file
+        ttl = None
+        if (self.cache is not None and verb == 'GET' and
+                not req_kwargs.get('stream')):
+            ttl = self.cache_ttl(endpoint)
+        if not ttl:
+            return self._send(verb, url, **req_kwargs)
+
+        return self.cache.get_or_load(
+            self._cache_key(url, req_kwargs.get('params')), ttl,
+            lambda: self._send(verb, url, **req_kwargs),
+            cacheable=lambda resp: resp.ok)
+
+    def _cache_key(self, url, params):
+        params = params or {}
+        return (self.token, url,
+                tuple(sorted((k, str(v)) for k, v in params.items())))
+
+    def stream(self, endpoint, key=None, chunk_size=65536, **req_kwargs):
+        """Yields the items of a JSON array endpoint while it downloads.
+
+        Items are decoded one by one as chunks of the body arrive, so the
+        first item is available early and memory use doesn't grow with
+        the length of the array. Responses aren't cached.
+
+        :param endpoint: str
+        :param key: str, key of the array if the endpoint returns an object
+        :param chunk_size: int, bytes read from the network at a time
+        :param req_kwargs: kwargs accepted by requests.Request()
+        :return: generator
+        """
+        from .stream import iter_items
+        req_kwargs['headers'] = self.headers()
+        resp = Interface.request(self, endpoint, stream=True, **req_kwargs)
+        with resp:
+            resp.raise_for_status()
+            yield from iter_items(resp.iter_content(chunk_size), key=key)
+
+    def _pages(self, fetch, page_size, prefetch, max_items):
+        from .paging import paginate
+        return paginate(fetch, page_size, prefetch=prefetch,
+                        max_items=max_items)
+
+    def _send(self, verb, url, **req_kwargs):
+        if self.metrics is not None:
+            return self._measure(verb, url, req_kwargs)
+        return self._dispatch(verb, url, req_kwargs)
+
+    def _dispatch(self, verb, url, req_kwargs, attempts=None):
+        if self.retry is None:
+            return self._attempt(verb, url, **req_kwargs)
+
+        def send(remaining):
+            if attempts is not None:
+                attempts.append(remaining)
+            kwargs = dict(req_kwargs)
+            timeout = kwargs.get('timeout')
+            if remaining is not None and (timeout is None or (
+                    not isinstance(timeout, tuple) and timeout > remaining)):
+                kwargs['timeout'] = max(remaining, 0.001)
+            return self._attempt(verb, url, **kwargs)
+
+        return self.retry.call(send, verb=verb)
+
+    def _measure(self, verb, url, req_kwargs):
+        wrapper, template = type(self).__name__, self.template(url)
+        attempts = []
+        start = time.perf_counter()
+        try:
+            resp = self._dispatch(verb, url, req_kwargs, attempts)
+        except Exception as e:
+            self.metrics.request(wrapper, template, type(e).__name__,
+                                 time.perf_counter() - start,
+                                 retries=max(len(attempts) - 1, 0))
+            raise
+        if req_kwargs.get('stream'):
+            # Reading the body here would defeat streaming.
+            size = resp.headers.get('Content-Length')
+            size = int(size) if size and size.isdigit() else None
+        else:
+            size = len(resp.content)
+        self.metrics.request(wrapper, template, resp.status_code,
+                             time.perf_counter() - start,
+                             ttfb=resp.elapsed.total_seconds(), size=size,
+                             retries=max(len(attempts) - 1, 0),
+                             revalidated=getattr(resp, 'from_cache', False))
+        return resp
+
+    def _attempt(self, verb, url, **req_kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self.token)
+        if self.http_cache is not None:
+            return self.http_cache.request(self.transport, verb, url,
+                                           token=self.token, **req_kwargs)
+        return self.transport.request(verb, url, **req_kwargs)
@@ -8,9 +8,16 @@ class Betriebsstellen(Interface):
         https://developer.deutschebahn.com/store/apis/info?name=BahnPark&version=v1&provider=DBOpenData
     """
 
-    def __init__(self, token=None, key=None, secret=None, config=None):
+    templates = ('betriebsstellen', 'betriebsstellen/{abbrev}')
+
+    cache_ttls = {'betriebsstellen': 24 * 3600,
+                  'betriebsstellen/{abbrev}': 24 * 3600}
+
+    def __init__(self, token=None, key=None, secret=None, config=None,
+                 **kwargs):
         super(Betriebsstellen, self).__init__(key=key, secret=secret,
-                                              token=token, config=config)
+                                              token=token, config=config,
+                                              **kwargs)
         self.address += 'betriebsstellen/v1/'
 
     def request(self, endpoint, verb=None, **req_kwargs):
@@ -18,27 +25,34 @@ class Betriebsstellen(Interface):
 
         Querys API using a super() call to Interface.request(), checks the 
         HTTP status code and returns the response's json data 
-        as a python object.
+        as a python object, decoded by the wrapper's decoder.
 
         :param endpoint: str
         :param verb: str
         :param req_kwargs: kwargs accepted by requests.Request() 
         :return: Dict or list
         """
-        req_kwargs['headers'] = {'Authorization': 'Bearer ' + self.token,
-                                 'Accept': 'application/json'}
+        req_kwargs['headers'] = self.headers()
         resp = super(Betriebsstellen, self).request(endpoint, verb=verb,
                                                     **req_kwargs)
         resp.raise_for_status()
-        return resp.json()
+        return self.decode(resp)
 
-    def betriebsstellen(self, station_name, is_abbreviation=False):
+    def betriebsstellen(self, station_name, is_abbreviation=False,
+                        index=None):
         """Returns data on a operation station.
         
         :param station_name: 
         :param is_abbreviation: 
+        :param index: choochoo.index.BetriebsstellenIndex, answer from this
+            local index instead of the API; unknown abbreviations then
+            return None
         :return: 
         """
+        if index is not None:
+            if is_abbreviation:
+                return index.lookup(station_name)
+            return index.search(station_name)
         endpoint = 'betriebsstellen'
         if is_abbreviation:
             endpoint += '/' + station_name
@@ -0,0 +1,84 @@
+"""Bounded concurrent fan-out of API calls over many keys."""
+from collections import namedtuple
+
+Result = namedtuple('Result', ('key', 'value', 'error'))
+Result.__doc__ = """Outcome of one call made by fan_out().
+
+`value` holds the call's return value, `error` the exception it raised;
+the other one is None.
+"""
+
+
+def fan_out(func, keys, workers=8):
+    """Calls func(key) for each key on a thread pool.
+
+    At most `workers` calls are in flight at any time, and keys are pulled
+    from the iterable lazily, so it may be a generator of any length.
+    Results are yielded as they complete, not in input order. An exception
+    raised by one call is reported in its Result and doesn't stop the rest.
+
+    :param func: callable taking a single key
+    :param keys: iterable of keys
+    :param workers: int, max. number of concurrent calls
+    :return: generator of Result
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    if workers < 1:
+        raise ValueError("workers must be at least 1!")
+    keys = iter(keys)
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            while True:
+                for key in keys:
+                    pending[executor.submit(func, key)] = key
+                    if len(pending) >= workers:
+                        break
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = pending.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        yield Result(key, future.result(), None)
+                    else:
+                        yield Result(key, None, error)
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def async_fan_out(func, keys, workers=8):
+    """Asyncio counterpart of fan_out(); awaits func(key) for each key.
+
+    :param func: coroutine function taking a single key
+    :param keys: iterable of keys
+    :param workers: int, max. number of concurrent calls
+    :return: async generator of Result
+    """
+    import asyncio
+    if workers < 1:
+        raise ValueError("workers must be at least 1!")
+    keys = iter(keys)
+    pending = {}
+    try:
+        while True:
+            for key in keys:
+                pending[asyncio.ensure_future(func(key))] = key
+                if len(pending) >= workers:
+                    break
+            if not pending:
+                return
+            done, _ = await asyncio.wait(pending,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                key = pending.pop(task)
+                error = task.exception()
+                if error is None:
+                    yield Result(key, task.result(), None)
+                else:
+                    yield Result(key, None, error)
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class _Call:
+    """A load in flight, awaited by concurrent requests for the same key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class TTLCache:
+    """Thread-safe in-memory cache with per-entry TTLs and LRU eviction.
+
+    Concurrent misses on the same key are collapsed: the first caller
+    loads the value, the others block until it's available and share it.
+
+    :param maxsize: int, max. number of entries kept
+    """
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1!")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._calls = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _fresh(self, key):
+        # Must be called with the lock held; returns (hit, value).
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self._entries[key]
+        return False, None
+
+    def get_or_load(self, key, ttl, loader, cacheable=None):
+        """Returns the cached value for key, or loads and caches it.
+
+        :param key: hashable
+        :param ttl: float, seconds a loaded value stays valid
+        :param loader: callable returning the value
+        :param cacheable: callable deciding whether a loaded value may be
+            stored; by default all values are
+        :return: the cached or loaded value
+        """
+        with self._lock:
+            hit, value = self._fresh(key)
+            if hit:
+                return value
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                self.misses += 1
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.wait()
+
+        try:
+            call.value = loader()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and (cacheable is None or
+                                           cacheable(call.value)):
+                    self._set(key, ttl, call.value)
+            call.done.set()
+        return call.value
+
+    async def get_or_load_async(self, key, ttl, loader, cacheable=None):
+        """Asyncio counterpart of get_or_load(); awaits loader().
+
+        Concurrent misses on the same key within one event loop await a
+        single load.
+
+        :param key: hashable
+        :param ttl: float, seconds a loaded value stays valid
+        :param loader: coroutine function returning the value
+        :param cacheable: callable deciding whether a loaded value may be
+            stored; by default all values are
+        :return: the cached or loaded value
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            hit, value = self._fresh(key)
+            if hit:
+                return value
+            future = self._futures.get((loop, key))
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = self._futures[(loop, key)] = loop.create_future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return await asyncio.shield(future)
+
+        stored = False
+        try:
+            value = await loader()
+            stored = cacheable is None or cacheable(value)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved, even if no one else waits
+            raise
+        finally:
+            with self._lock:
+                del self._futures[(loop, key)]
+                if stored:
+                    self._set(key, ttl, value)
+        future.set_result(value)
+        return value
+
+    def _set(self, key, ttl, value):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drops all cached entries; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns the cache's counters.
+
+        :return: dict
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'coalesced': self.coalesced,
+                    'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+class HTTPCache:
+    """Persistent SQLite store of response bodies and their validators.
+
+    Cached GET requests are revalidated with If-None-Match and
+    If-Modified-Since; a 304 answer is turned back into a full response
+    from the stored body, so unchanged payloads aren't downloaded again.
+    Responses without an ETag or Last-Modified header aren't stored.
+
+    The database runs in WAL mode with one connection per thread, so
+    several threads and processes on one host can share a file.
+
+    :param path: str, path of the SQLite database file
+    :param timeout: float, seconds to wait for another writer's lock
+    """
+
+    _dropped_headers = ('content-encoding', 'content-length',
+                        'transfer-encoding', 'connection')
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self.revalidated = 0
+        self.stored = 0
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS responses ('
+                         'key TEXT PRIMARY KEY, url TEXT, status INTEGER, '
+                         'headers TEXT, body BLOB, etag TEXT, '
+                         'last_modified TEXT, stored REAL)')
+
+    def _connection(self):
+        conn, pid = getattr(self._local, 'conn', (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = (conn, os.getpid())
+        return conn
+
+    @staticmethod
+    def key(url, params=None, token=None):
+        """Returns the cache key of a request.
+
+        :param url: str
+        :param params: dict, query parameters
+        :param token: str, access token the request is sent with
+        :return: str
+        """
+        params = sorted((k, str(v)) for k, v in (params or {}).items())
+        raw = json.dumps([token, url, params])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def request(self, transport, verb, url, token=None, **req_kwargs):
+        """Sends a request via transport, revalidating a stored response.
+
+        :param transport: choochoo.transport.Transport
+        :param verb: str
+        :param url: str
+        :param token: str, access token; part of the cache key
+        :param req_kwargs: kwargs accepted by requests.Session.request()
+        :return: requests.Response()
+        """
+        if verb != 'GET' or req_kwargs.get('stream'):
+            return transport.request(verb, url, **req_kwargs)
+
+        key = self.key(url, req_kwargs.get('params'), token)
+        row = self._connection().execute(
+            'SELECT url, status, headers, body, etag, last_modified '
+            'FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            headers = dict(req_kwargs.get('headers') or {})
+            if row[4]:
+                headers['If-None-Match'] = row[4]
+            if row[5]:
+                headers['If-Modified-Since'] = row[5]
+            req_kwargs['headers'] = headers
+
+        resp = transport.request(verb, url, **req_kwargs)
+        if resp.status_code == 304 and row is not None:
+            self.revalidated += 1
+            return self._rebuild(row, resp)
+        if resp.ok and ('ETag' in resp.headers or
+                        'Last-Modified' in resp.headers):
+            self._store(key, resp)
+        return resp
+
+    def _rebuild(self, row, not_modified):
+        url, status, headers, body, etag, last_modified = row
+        resp = requests.Response()
+        resp.status_code = status
+        resp.reason = 'OK'
+        resp.url = url
+        resp.headers = CaseInsensitiveDict(json.loads(headers))
+        resp.headers.update((k, v) for k, v in not_modified.headers.items()
+                            if k.lower() not in self._dropped_headers)
+        resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+        resp._content = body
+        resp.request = not_modified.request
+        resp.elapsed = not_modified.elapsed
+        resp.from_cache = True
+        return resp
+
+    def _store(self, key, resp):
+        headers = {k: v for k, v in resp.headers.items()
+                   if k.lower() not in self._dropped_headers}
+        with self._connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO responses VALUES '
+                         '(?, ?, ?, ?, ?, ?, ?, ?)',
+                         (key, resp.url, resp.status_code, json.dumps(headers),
+                          resp.content, resp.headers.get('ETag'),
+                          resp.headers.get('Last-Modified'), time.time()))
+        self.stored += 1
+
+    def prune(self, max_age):
+        """Deletes responses stored more than max_age seconds ago.
+
+        :param max_age: float
+        :return: int, number of deleted responses
+        """
+        with self._connection() as conn:
+            cursor = conn.execute('DELETE FROM responses WHERE stored < ?',
+                                  (time.time() - max_age,))
+        return cursor.rowcount
+
+    def clear(self):
+        """Deletes all stored responses."""
+        with self._connection() as conn:
+            conn.execute('DELETE FROM responses')
@@ -1,4 +1,25 @@
 from .base import Interface
+from .bulk import Result, fan_out
+
+
+def snap(lat, long, grid):
+    """Snaps coordinates to the nearest point of a grid.
+
+    The result is rounded to the grid's decimal places, so all
+    coordinates of a cell produce the same URL.
+
+    :param lat: float
+    :param long: float
+    :param grid: float, cell size in degrees
+    :return: tuple of 2 floats
+    """
+    import decimal
+    if grid <= 0:
+        raise ValueError("grid must be positive!")
+    places = max(0, -decimal.Decimal(str(grid)).normalize().as_tuple()
+                 .exponent)
+    return (round(round(lat / grid) * grid, places),
+            round(round(long / grid) * grid, places))
 
 
 class Cargo(Interface):
@@ -8,9 +29,14 @@ class Cargo(Interface):
         https://developer.deutschebahn.com/store/apis/info?name=Fahrplan&version=v1&provider=DBOpenData
     """
 
-    def __init__(self, token=None, key=None, secret=None, config=None):
+    templates = ('delays', 'delays/{id}', 'delays/loc/{lat}/{long}')
+
+    cache_ttls = {'delays/loc/{lat}/{long}': 3600}
+
+    def __init__(self, token=None, key=None, secret=None, config=None,
+                 **kwargs):
         super(Cargo, self).__init__(key=key, secret=secret, token=token,
-                                       config=config)
+                                       config=config, **kwargs)
         self.address += 'cargo/v1/'
 
     def request(self, endpoint, verb=None, **req_kwargs):
@@ -18,18 +44,17 @@ class Cargo(Interface):
 
         Querys API using a super() call to Interface.request(), checks the 
         HTTP status code and returns the response's json data 
-        as a python object.
+        as a python object, decoded by the wrapper's decoder.
 
         :param endpoint: str
         :param verb: str
         :param req_kwargs: kwargs accepted by requests.Request() 
         :return: Dict or list
         """
-        req_kwargs['headers'] = {'Authorization': 'Bearer ' + self.token,
-                                 'Accept': 'application/json'}
+        req_kwargs['headers'] = self.headers()
         resp = super(Cargo, self).request(endpoint, verb=verb, **req_kwargs)
         resp.raise_for_status()
-        return resp.json()
+        return self.decode(resp)
 
     def delays(self, by_name=None, by_id=None, by_lat_long=None,
                **endpoint_kwargs):
@@ -62,3 +87,30 @@ class Cargo(Interface):
             lat, long = by_lat_long
             endpoint += '/loc/' + str(lat) + '/' + str(long)
         return self.request(endpoint, params=endpoint_kwargs)
+
+    def bulk_delays(self, coordinates, grid=0.01, workers=8,
+                    **endpoint_kwargs):
+        """Fetches delays near many coordinates with few requests.
+
+        Coordinates are snapped to a grid of `grid` degrees (0.01 is about
+        1.1 km north-south), each distinct cell is requested only once,
+        concurrently, and its result is handed to every coordinate in it.
+        Snapped cells also share entries of the wrapper's response cache.
+
+        :param coordinates: iterable of (lat, long) tuples
+        :param grid: float, cell size in degrees
+        :param workers: int, max. number of concurrent requests
+        :param endpoint_kwargs: endpoint parameters as describe in the API docs
+        :return: list of choochoo.bulk.Result(key, value, error), in input
+            order, keyed by the original coordinates
+        """
+        coordinates = list(coordinates)
+        cells = [snap(lat, long, grid) for lat, long in coordinates]
+        return self._bulk_cells(coordinates, cells, workers, endpoint_kwargs)
+
+    def _bulk_cells(self, coordinates, cells, workers, endpoint_kwargs):
+        results = {result.key: result for result in fan_out(
+            lambda cell: self.delays(by_lat_long=cell, **endpoint_kwargs),
+            set(cells), workers=workers)}
+        return [Result(coordinate, results[cell].value, results[cell].error)
+                for coordinate, cell in zip(coordinates, cells)]
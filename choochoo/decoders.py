@@ -0,0 +1,76 @@
+"""JSON decoder backends for API responses.
+
+Decoders are callables taking the raw response body as bytes. Available by
+name are 'json' (the standard library), 'orjson' and 'ujson' if they're
+installed, and 'raw', which returns the body undecoded for callers that
+parse it themselves. 'auto' picks the fastest installed backend.
+"""
+def _json():
+    import json
+    return json.loads
+
+
+def _orjson():
+    import orjson
+    return orjson.loads
+
+
+def _ujson():
+    import ujson
+    return ujson.loads
+
+
+def _raw():
+    return bytes
+
+
+BACKENDS = {'orjson': _orjson, 'ujson': _ujson, 'json': _json, 'raw': _raw}
+# Order in which 'auto' tries the backends.
+PREFERENCE = ('orjson', 'ujson', 'json')
+
+
+def get_decoder(name='auto'):
+    """Returns the decoder of the given name, or name itself if it's
+    already a callable.
+
+    :param name: str or callable
+    :return: callable
+    :raises: ImportError if the named backend isn't installed
+    """
+    if callable(name):
+        return name
+    if name is None or name == 'auto':
+        for candidate in PREFERENCE:
+            try:
+                return BACKENDS[candidate]()
+            except ImportError:
+                continue
+    check(name)
+    return BACKENDS[name]()
+
+
+def check(name):
+    """Raises ValueError unless get_decoder() knows name, without
+    importing the backend.
+
+    :param name: str or callable
+    """
+    if not (callable(name) or name is None or name == 'auto' or
+            name in BACKENDS):
+        raise ValueError("Decoder must be 'auto' or one of %s!"
+                         % ', '.join(sorted(BACKENDS)))
+
+
+def available():
+    """Returns the names of all backends that are installed.
+
+    :return: list of str
+    """
+    names = []
+    for name, load in BACKENDS.items():
+        try:
+            load()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
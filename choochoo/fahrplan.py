@@ -2,6 +2,8 @@ import datetime
 from urllib.parse import quote
 
 from .base import Interface
+from .bulk import fan_out
+from .records import to_board
 
 
 class Fahrplan(Interface):
@@ -10,9 +12,14 @@ class Fahrplan(Interface):
     Documentation at: 
         https://developer.deutschebahn.com/store/apis/info?name=Fahrplan&version=v1&provider=DBOpenData
     """
-    def __init__(self, token=None, key=None, secret=None, config=None):
+
+    templates = ('location/{name}', 'arrivalBoard/{id}', 'departureBoard/{id}',
+                 'journeyDetails/{id}')
+
+    def __init__(self, token=None, key=None, secret=None, config=None,
+                 **kwargs):
         super(Fahrplan, self).__init__(key=key, secret=secret, token=token,
-                                           config=config)
+                                           config=config, **kwargs)
         self.address += 'freeplan/v1/'
 
     def request(self, endpoint, verb=None, **req_kwargs):
@@ -20,18 +27,17 @@ class Fahrplan(Interface):
         
         Querys API using a super() call to Interface.request(), checks the 
         HTTP status code and returns the response's json data 
-        as a python object.
+        as a python object, decoded by the wrapper's decoder.
         
         :param endpoint: str
         :param verb: str
         :param req_kwargs: kwargs accepted by requests.Request() 
         :return: Dict or list
         """
-        req_kwargs['headers'] = {'Authorization': 'Bearer '+self.token,
-                                 'Accept': 'application/json'}
+        req_kwargs['headers'] = self.headers()
         resp = super(Fahrplan, self).request(endpoint, verb=verb, **req_kwargs)
         resp.raise_for_status()
-        return resp.json()
+        return self.decode(resp)
 
     def location(self, location_name):
         """Get locations that match the given string
@@ -41,27 +47,65 @@ class Fahrplan(Interface):
         """
         return self.request('location/%s' % location_name)
 
-    def arrivals(self, location_id, date=None):
+    def arrivals(self, location_id, date=None, typed=False):
         """Returns arrivals of given location and date.
         
         :param location_id: str
         :param date: date as string in format YYYY-MM-DD
+        :param typed: bool, return a list of choochoo.records.BoardEntry
+            instead of dicts
         :return: requests.Response()
         """
         date = datetime.datetime.today().strftime('%Y-%m-%d') if not date else date
-        return self.request('arrivalBoard/%s' % location_id,
-                            params={'date': date})
+        return self._board('arrivalBoard/%s' % location_id, date, typed)
 
-    def departures(self, location_id, date=None):
+    def departures(self, location_id, date=None, typed=False):
         """Returns departures of given location and date.
 
         :param location_id: str
         :param date: date as string in format YYYY-MM-DD
+        :param typed: bool, return a list of choochoo.records.BoardEntry
+            instead of dicts
         :return: requests.Response()
         """
         date = datetime.datetime.today().strftime('%Y-%m-%d') if not date else date
-        return self.request('departureBoard/%s' % location_id,
-                            params={'date': date})
+        return self._board('departureBoard/%s' % location_id, date, typed)
+
+    def _board(self, endpoint, date, typed):
+        board = self.request(endpoint, params={'date': date})
+        return to_board(board) if typed else board
+
+    def bulk_departures(self, keys, workers=8, typed=False):
+        """Fetches departure boards for many stations and dates concurrently.
+
+        Results are yielded as they complete, each tagged with its key;
+        a failed board is reported in its result's `error` attribute
+        instead of aborting the batch. For throughput to scale with
+        `workers`, the wrapper's transport should keep at least as many
+        connections per host alive.
+
+        :param keys: iterable of (location_id, date) tuples, date may be None
+        :param workers: int, max. number of concurrent requests
+        :param typed: bool, return boards as lists of BoardEntry
+        :return: generator of choochoo.bulk.Result(key, value, error)
+        """
+        return self._bulk_boards(self.departures, keys, workers, typed)
+
+    def bulk_arrivals(self, keys, workers=8, typed=False):
+        """Fetches arrival boards for many stations and dates concurrently.
+
+        See bulk_departures() for details.
+
+        :param keys: iterable of (location_id, date) tuples, date may be None
+        :param workers: int, max. number of concurrent requests
+        :param typed: bool, return boards as lists of BoardEntry
+        :return: generator of choochoo.bulk.Result(key, value, error)
+        """
+        return self._bulk_boards(self.arrivals, keys, workers, typed)
+
+    def _bulk_boards(self, board, keys, workers, typed):
+        return fan_out(lambda key: board(*key, typed=typed), keys,
+                       workers=workers)
 
     def journey_details(self, journey_id):
         """Returns details for given journey's id.
@@ -8,9 +8,13 @@ class FaSta(Interface):
         https://developer.deutschebahn.com/store/apis/info?name=FaSta-Station_Facilities_Status&version=v1&provider=DBOpenData
     """
 
-    def __init__(self, token=None, key=None, secret=None, config=None):
+    templates = ('stations/{id}', 'disruptions', 'disruptions/{id}',
+                 'facilities', 'facilities/{id}')
+
+    def __init__(self, token=None, key=None, secret=None, config=None,
+                 **kwargs):
         super(FaSta, self).__init__(key=key, secret=secret, token=token,
-                                    config=config)
+                                    config=config, **kwargs)
         self.address += 'fasta/v1/'
 
     def request(self, endpoint, verb=None, **req_kwargs):
@@ -18,18 +22,17 @@ class FaSta(Interface):
 
         Querys API using a super() call to Interface.request(), checks the 
         HTTP status code and returns the response's json data 
-        as a python object.
+        as a python object, decoded by the wrapper's decoder.
 
         :param endpoint: str
         :param verb: str
         :param req_kwargs: kwargs accepted by requests.Request() 
         :return: Dict or list
         """
-        req_kwargs['headers'] = {'Authorization': 'Bearer ' + self.token,
-                                 'Accept': 'application/json'}
+        req_kwargs['headers'] = self.headers()
         resp = super(FaSta, self).request(endpoint, verb=verb, **req_kwargs)
         resp.raise_for_status()
-        return resp.json()
+        return self.decode(resp)
 
     def disruptions_by_station(self, station_number, **endpoint_kwargs):
         """Return infromation about discruptions at given station by id.
@@ -61,6 +64,22 @@ class FaSta(Interface):
         payload.update(endpoint_kwargs)
         return self.request('disruptions', params=payload)
 
+    def iter_disruptions(self, page_size=100, prefetch=2, max_items=None,
+                         **endpoint_kwargs):
+        """Yields all disruptions matching the parameters, paging
+        automatically and requesting the next `prefetch` pages ahead.
+
+        :param page_size: int, disruptions requested per page
+        :param prefetch: int, max. number of pages requested ahead
+        :param max_items: int, max. number of disruptions yielded
+        :param endpoint_kwargs: parameters as accepted by the API endpoint
+        :return: generator of dicts
+        """
+        return self._pages(lambda offset, limit: self.request(
+            'disruptions', params=dict(endpoint_kwargs, offset=offset,
+                                       limit=limit)),
+            page_size, prefetch, max_items)
+
     def disruption_details(self, disruption_num, **endpoint_kwargs):
         """Queries details about the specified disruption number.
         
@@ -71,6 +90,33 @@ class FaSta(Interface):
         return self.request('disruptions/%s' % disruption_num,
                             params=endpoint_kwargs)
 
+    def facilities(self, **endpoint_kwargs):
+        """Get details on all facilities matching the given parameters.
+
+        Unlike get_elevators() and get_escalators(), this doesn't filter by
+        type or state unless asked to, e.g. type='ELEVATOR,ESCALATOR'.
+
+        :param endpoint_kwargs: parameters as accepted by the API endpoint
+        :return: list
+        """
+        return self.request('facilities', params=endpoint_kwargs)
+
+    def iter_facilities(self, page_size=100, prefetch=2, max_items=None,
+                        **endpoint_kwargs):
+        """Yields all facilities matching the parameters, paging
+        automatically and requesting the next `prefetch` pages ahead.
+
+        :param page_size: int, facilities requested per page
+        :param prefetch: int, max. number of pages requested ahead
+        :param max_items: int, max. number of facilities yielded
+        :param endpoint_kwargs: parameters as accepted by the API endpoint
+        :return: generator of dicts
+        """
+        return self._pages(lambda offset, limit: self.request(
+            'facilities', params=dict(endpoint_kwargs, offset=offset,
+                                      limit=limit)),
+            page_size, prefetch, max_items)
+
     def get_elevators(self, active=False, **endpoint_kwargs):
         """Get details on elevators.
         
@@ -89,11 +135,36 @@ class FaSta(Interface):
         """
         return self._facilities('ESCALATOR', active, **endpoint_kwargs)
 
+    def stream_elevators(self, active=False, **endpoint_kwargs):
+        """Yields details on elevators one by one while they download.
+
+        :param active: bool, whether to return active or inactive elevators
+        :param endpoint_kwargs: parameters as accepted by the API endpoint
+        :return: generator of dicts
+        """
+        return self.stream('facilities', params=self._facility_params(
+            'ELEVATOR', active, endpoint_kwargs))
+
+    def stream_escalators(self, active=False, **endpoint_kwargs):
+        """Yields details on escalators one by one while they download.
+
+        :param active: bool, whether to return active or inactive escalators
+        :param endpoint_kwargs: parameters as accepted by the API endpoint
+        :return: generator of dicts
+        """
+        return self.stream('facilities', params=self._facility_params(
+            'ESCALATOR', active, endpoint_kwargs))
+
     def _facilities(self, fac_type, active, **endpoint_kwargs):
+        return self.request('facilities', params=self._facility_params(
+            fac_type, active, endpoint_kwargs))
+
+    @staticmethod
+    def _facility_params(fac_type, active, endpoint_kwargs):
         state = 'ACTIVE' if active else 'INACTIVE'
         payload = {'type': fac_type, 'state': state}
         payload.update(endpoint_kwargs)
-        return self.request('facilities', params=payload)
+        return payload
 
     def facility_state(self, equip_num, **endpoint_kwargs):
         """Returns information about the facility's state.
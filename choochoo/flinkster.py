@@ -1,4 +1,10 @@
+import math
+
 from .base import Interface
+from .bulk import fan_out
+
+# Metres per degree of latitude.
+METRES_PER_DEGREE = 111195
 
 
 class Flinkster(Interface):
@@ -8,9 +14,23 @@ class Flinkster(Interface):
         https://developer.deutschebahn.com/store/apis/info?name=Flinkster_API_NG&version=v1&provider=DBOpenData
     """
 
-    def __init__(self, token=None, key=None, secret=None, config=None):
+    templates = ('areas', 'areas/{id}', 'bookingproposals',
+                 'providernetworks/{network}',
+                 'providernetworks/{network}/categories',
+                 'providernetworks/{network}/categories/{id}',
+                 'providernetworks/{network}/prices',
+                 'providernetworks/{network}/rentalobjects/{id}',
+                 'providers/{id}')
+
+    cache_ttls = {'providernetworks/{network}': 24 * 3600,
+                  'providernetworks/{network}/categories': 24 * 3600,
+                  'providernetworks/{network}/categories/{id}': 24 * 3600,
+                  'providernetworks/{network}/prices': 3600}
+
+    def __init__(self, token=None, key=None, secret=None, config=None,
+                 **kwargs):
         super(Flinkster, self).__init__(key=key, secret=secret, token=token,
-                                        config=config)
+                                        config=config, **kwargs)
         self.address += 'flinkster-api-ng/v1/'
 
     def request(self, endpoint, verb=None, **req_kwargs):
@@ -18,18 +38,17 @@ class Flinkster(Interface):
 
         Querys API using a super() call to Interface.request(), checks the 
         HTTP status code and returns the response's json data 
-        as a python object.
+        as a python object, decoded by the wrapper's decoder.
 
         :param endpoint: str
         :param verb: str
         :param req_kwargs: kwargs accepted by requests.Request() 
         :return: dict or list
         """
-        req_kwargs['headers'] = {'Authorization': 'Bearer ' + self.token,
-                                 'Accept': 'application/json'}
+        req_kwargs['headers'] = self.headers()
         resp = super(Flinkster, self).request(endpoint, verb=verb, **req_kwargs)
         resp.raise_for_status()
-        return resp.json()
+        return self.decode(resp)
 
     @staticmethod
     def _get_provider_id(provider):
@@ -55,15 +74,47 @@ class Flinkster(Interface):
         if by_id:
             return self.request('areas/%s' % by_id, params=endpoint_kwargs)
         else:
-            if 'providernetwork' not in endpoint_kwargs and not provider_name:
-                raise ValueError('Must at least pass "providernetwork" as '
-                                 'endpoint kwarg if no id and name are given!')
-            elif provider_name:
-                endpoint_kwargs['providernetwork'] = self._get_provider_id(provider_name)
-            else:
-                pass
+            return self.request('areas', params=self._area_params(
+                provider_name, endpoint_kwargs))
+
+    def stream_areas(self, provider_name=None, **endpoint_kwargs):
+        """Yields areas matching the search one by one while they download.
+
+        Accepts the same search parameters as get_area().
+
+        :param provider_name: str, {car2go | call-a-bike | flinkster}
+        :param endpoint_kwargs: supported parameters for the API
+        :return: generator of dicts
+        """
+        return self.stream('areas', key='items', params=self._area_params(
+            provider_name, endpoint_kwargs))
 
-            return self.request('areas', params=endpoint_kwargs)
+    def iter_areas(self, provider_name=None, page_size=50, prefetch=2,
+                   max_items=None, **endpoint_kwargs):
+        """Yields all areas matching the search, paging automatically.
+
+        The next `prefetch` pages are requested while the current one is
+        consumed. Accepts the same search parameters as get_area().
+
+        :param provider_name: str, {car2go | call-a-bike | flinkster}
+        :param page_size: int, areas requested per page
+        :param prefetch: int, max. number of pages requested ahead
+        :param max_items: int, max. number of areas yielded
+        :param endpoint_kwargs: supported parameters for the API
+        :return: generator of dicts
+        """
+        params = self._area_params(provider_name, endpoint_kwargs)
+        return self._pages(lambda offset, limit: self.request(
+            'areas', params=dict(params, offset=offset, limit=limit)),
+            page_size, prefetch, max_items)
+
+    def _area_params(self, provider_name, endpoint_kwargs):
+        if 'providernetwork' not in endpoint_kwargs and not provider_name:
+            raise ValueError('Must at least pass "providernetwork" as '
+                             'endpoint kwarg if no id and name are given!')
+        elif provider_name:
+            endpoint_kwargs['providernetwork'] = self._get_provider_id(provider_name)
+        return endpoint_kwargs
 
     def booking_proposals(self, provider_name=None, **endpoint_kwargs):
         """Returns search query of bookin proposals.
@@ -71,14 +122,147 @@ class Flinkster(Interface):
         :param endpoint_kwargs: parameters as supported by endpoint
         :return: list, dict
         """
+        return self.request('bookingproposals', params=self._proposal_params(
+            provider_name, endpoint_kwargs))
+
+    def iter_booking_proposals(self, provider_name=None, page_size=50,
+                               prefetch=2, max_items=None, **endpoint_kwargs):
+        """Yields all booking proposals of a search, paging automatically.
+
+        The next `prefetch` pages are requested while the current one is
+        consumed.
+
+        :param provider_name: str, {car2go | call-a-bike | flinkster}
+        :param page_size: int, proposals requested per page
+        :param prefetch: int, max. number of pages requested ahead
+        :param max_items: int, max. number of proposals yielded
+        :param endpoint_kwargs: parameters as supported by endpoint
+        :return: generator of dicts
+        """
+        params = self._proposal_params(provider_name, endpoint_kwargs)
+        return self._pages(lambda offset, limit: self.request(
+            'bookingproposals', params=dict(params, offset=offset,
+                                            limit=limit)),
+            page_size, prefetch, max_items)
+
+    def _proposal_params(self, provider_name, endpoint_kwargs):
         if ((not all(k in endpoint_kwargs for k in ('lat', 'lon'))) or
                 ('providernetwork' not in endpoint_kwargs and provider_name is None)):
             raise ValueError("Must specify kwargs 'lat', 'lon' and either"
                              "'provider_name' or 'providernetwork'")
         elif provider_name:
             endpoint_kwargs['providernetwork'] = self._get_provider_id(provider_name)
+        return endpoint_kwargs
 
-        return self.request('bookingproposals', params=endpoint_kwargs)
+    def sweep_booking_proposals(self, bbox, provider_name=None, limit=50,
+                                max_radius=2000, max_depth=8, workers=8,
+                                **endpoint_kwargs):
+        """Yields all booking proposals within a bounding box, once each.
+
+        The box is tiled into cells whose circumscribed circle is at most
+        `max_radius` metres in radius, and each cell is queried with that
+        circle, concurrently. Cells returning `limit` proposals may have
+        more, so they're split into quarters and queried again, up to
+        `max_depth` times. Proposals are deduplicated by their rental
+        object's uid and yielded as soon as they're found.
+
+        :param bbox: tuple, (south, west, north, east) in degrees
+        :param provider_name: str, {car2go | call-a-bike | flinkster}
+        :param limit: int, max. proposals per request
+        :param max_radius: float, max. search radius in metres
+        :param max_depth: int, max. number of times a cell is split
+        :param workers: int, max. number of concurrent requests
+        :param endpoint_kwargs: parameters as supported by endpoint
+        :return: generator of dicts
+        :raises: the first error of a failed request
+        """
+        if 'providernetwork' not in endpoint_kwargs and provider_name is None:
+            raise ValueError("Must specify either 'provider_name' or "
+                             "'providernetwork'")
+        elif provider_name:
+            endpoint_kwargs['providernetwork'] = self._get_provider_id(
+                provider_name)
+        return self._sweep(self._initial_tiles(bbox, max_radius), bbox,
+                           limit, max_depth, workers, endpoint_kwargs)
+
+    def _sweep(self, tiles, bbox, limit, max_depth, workers, endpoint_kwargs):
+        seen = set()
+        depth = 0
+        while tiles:
+            split = []
+            results = fan_out(lambda tile: self.booking_proposals(
+                **self._tile_params(tile, limit, endpoint_kwargs)),
+                tiles, workers=workers)
+            for result in results:
+                if result.error is not None:
+                    raise result.error
+                items = self._proposal_items(result.value)
+                if len(items) >= limit and depth < max_depth:
+                    split.extend(self._split(result.key))
+                yield from self._new_proposals(items, bbox, seen)
+            tiles = split
+            depth += 1
+
+    @staticmethod
+    def _radius(tile):
+        south, west, north, east = tile
+        dy = (north - south) / 2 * METRES_PER_DEGREE
+        dx = (east - west) / 2 * METRES_PER_DEGREE * math.cos(
+            math.radians((north + south) / 2))
+        return math.hypot(dx, dy)
+
+    @staticmethod
+    def _split(tile):
+        south, west, north, east = tile
+        lat, lon = (south + north) / 2, (west + east) / 2
+        return [(south, west, lat, lon), (south, lon, lat, east),
+                (lat, west, north, lon), (lat, lon, north, east)]
+
+    @classmethod
+    def _initial_tiles(cls, bbox, max_radius):
+        south, west, north, east = bbox
+        if south >= north or west >= east:
+            raise ValueError("bbox must be (south, west, north, east)!")
+        tiles, done = [tuple(bbox)], []
+        while tiles:
+            tile = tiles.pop()
+            if cls._radius(tile) > max_radius:
+                tiles.extend(cls._split(tile))
+            else:
+                done.append(tile)
+        return done
+
+    @classmethod
+    def _tile_params(cls, tile, limit, endpoint_kwargs):
+        south, west, north, east = tile
+        params = dict(endpoint_kwargs)
+        params.update(lat=(south + north) / 2, lon=(west + east) / 2,
+                      radius=int(math.ceil(cls._radius(tile))), limit=limit)
+        return params
+
+    @staticmethod
+    def _proposal_items(data):
+        if isinstance(data, dict):
+            return data.get('items', [])
+        return data or []
+
+    @staticmethod
+    def _new_proposals(items, bbox, seen):
+        south, west, north, east = bbox
+        for item in items:
+            rental = item.get('rentalObject') or {}
+            try:
+                lon, lat = rental['position']['coordinates'][:2]
+                if not (south <= lat <= north and west <= lon <= east):
+                    continue
+            except (KeyError, TypeError, ValueError):
+                pass
+            uid = rental.get('uid')
+            if uid is not None:
+                if uid in seen:
+                    continue
+                seen.add(uid)
+            yield item
 
     def categories(self, provider, by_id=None, **endpoint_kwargs):
         """Returns available categories of specified network provider.
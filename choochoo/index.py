@@ -0,0 +1,168 @@
+"""Local index of Betriebsstellen for offline name and abbreviation lookups."""
+import bisect
+import json
+import os
+
+from .decoders import get_decoder
+
+
+class BetriebsstellenIndex:
+    """In-memory index of operating points, built from a full dump.
+
+    Abbreviations (RIL100 codes) are resolved through a hash map. Names
+    are kept sorted case-insensitively, so exact and prefix searches are
+    a binary search plus a scan of the matches. Substring searches look up
+    the trigrams of the search term in an inverted index, built on first
+    use, and only check the names containing all of them. Entries are
+    stored as rows of values and only turned into dicts when returned,
+    which keeps both memory and the on-disk format written by save()
+    small.
+
+    :param entries: iterable of dicts as returned by the API
+    """
+
+    version = 1
+
+    def __init__(self, entries=()):
+        entries = list(entries)
+        fields = []
+        for entry in entries:
+            fields.extend(k for k in entry if k not in fields)
+        rows = [[entry.get(field) for field in fields] for entry in entries]
+        name = fields.index('name') if 'name' in fields else None
+        rows.sort(key=lambda row: self._fold(row[name] if name is not None
+                                             else None))
+        self._load(fields, rows)
+
+    @staticmethod
+    def _fold(value):
+        return value.casefold() if isinstance(value, str) else ''
+
+    def _load(self, fields, rows):
+        # rows must be sorted by their folded name.
+        self.fields = fields
+        self._rows = rows
+        name = fields.index('name') if 'name' in fields else None
+        abbrev = fields.index('abbrev') if 'abbrev' in fields else None
+        self._names = [self._fold(row[name]) if name is not None else ''
+                       for row in rows]
+        self._abbrevs = {row[abbrev]: i for i, row in enumerate(rows)
+                         if abbrev is not None and row[abbrev] is not None}
+        self._grams = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _entry(self, i):
+        return dict(zip(self.fields, self._rows[i]))
+
+    @classmethod
+    def from_api(cls, api):
+        """Builds the index from the full list of operating points.
+
+        :param api: choochoo.Betriebsstellen
+        :return: BetriebsstellenIndex
+        """
+        return cls(api.request('betriebsstellen'))
+
+    def lookup(self, abbrev):
+        """Returns the operating point of an abbreviation.
+
+        :param abbrev: str, RIL100 abbreviation, e.g. 'FF'
+        :return: dict, or None if it's unknown
+        """
+        i = self._abbrevs.get(abbrev)
+        if i is None and isinstance(abbrev, str):
+            i = self._abbrevs.get(abbrev.upper())
+        return None if i is None else self._entry(i)
+
+    def prefix(self, prefix, limit=None):
+        """Returns the operating points whose name starts with prefix,
+        ignoring case, in alphabetical order.
+
+        :param prefix: str
+        :param limit: int, max. number of entries returned
+        :return: list of dict
+        """
+        prefix = self._fold(prefix)
+        start = bisect.bisect_left(self._names, prefix)
+        found = []
+        for i in range(start, len(self._names)):
+            if not self._names[i].startswith(prefix) or \
+                    limit is not None and len(found) >= limit:
+                break
+            found.append(self._entry(i))
+        return found
+
+    def find(self, name):
+        """Returns the operating points named name, ignoring case.
+
+        :param name: str
+        :return: list of dict
+        """
+        name = self._fold(name)
+        start = bisect.bisect_left(self._names, name)
+        end = bisect.bisect_right(self._names, name, start)
+        return [self._entry(i) for i in range(start, end)]
+
+    @staticmethod
+    def _trigrams(folded):
+        return {folded[i:i + 3] for i in range(len(folded) - 2)}
+
+    def search(self, name):
+        """Returns the operating points whose name contains name, ignoring
+        case, like the API's name search does.
+
+        :param name: str
+        :return: list of dict
+        """
+        name = self._fold(name)
+        if len(name) < 3:
+            candidates = range(len(self._names))
+        else:
+            if self._grams is None:
+                grams = {}
+                for i, folded in enumerate(self._names):
+                    for gram in self._trigrams(folded):
+                        grams.setdefault(gram, []).append(i)
+                self._grams = grams
+            postings = sorted((self._grams.get(gram, ())
+                               for gram in self._trigrams(name)), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            candidates = sorted(candidates)
+        return [self._entry(i) for i in candidates
+                if name in self._names[i]]
+
+    def save(self, path):
+        """Writes the index to a file atomically.
+
+        Rows are stored as JSON arrays in sorted order under a single
+        header of field names, so loading doesn't need to sort again.
+
+        :param path: str
+        """
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'fields': self.fields,
+                       'rows': self._rows}, f, ensure_ascii=False,
+                      separators=(',', ':'))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, decoder='auto'):
+        """Reads an index written by save().
+
+        :param path: str
+        :param decoder: str or callable, see choochoo.decoders
+        :return: BetriebsstellenIndex
+        :raises: ValueError if the file was written by an incompatible
+            version
+        """
+        with open(path, 'rb') as f:
+            data = get_decoder(decoder)(f.read())
+        if data.get('version') != cls.version:
+            raise ValueError("Unsupported index version %r!"
+                             % data.get('version'))
+        index = cls.__new__(cls)
+        index._load(data['fields'], data['rows'])
+        return index
@@ -0,0 +1,101 @@
+import copy
+import datetime
+import threading
+
+from .bulk import fan_out
+from .records import BoardEntry
+
+
+class JourneyResolver:
+    """Enriches Fahrplan boards with the stop lists of their journeys.
+
+    A journey appears on the board of every station it passes, so the
+    resolver collects the distinct detailsIds of all boards it's given,
+    fetches only those it hasn't seen yet (concurrently) and memoizes the
+    details until the day changes. Resolving a board thus costs one
+    request per new journey instead of one per entry.
+
+    :param api: choochoo.Fahrplan
+    :param workers: int, max. number of concurrent requests
+    """
+
+    def __init__(self, api, workers=8):
+        self.api = api
+        self.workers = workers
+        self.fetched = 0
+        self.reused = 0
+        self.errors = {}
+        self._details = {}
+        self._day = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _details_id(entry):
+        if isinstance(entry, BoardEntry):
+            return entry.details_id
+        return entry.get('detailsId')
+
+    @staticmethod
+    def _enrich(entry, stops):
+        if isinstance(entry, BoardEntry):
+            entry = copy.copy(entry)
+            entry.stops = stops
+            return entry
+        entry = dict(entry)
+        entry['stops'] = stops
+        return entry
+
+    def _known(self):
+        # Returns the memo, dropping it once the service day has changed.
+        today = datetime.date.today()
+        if self._day != today:
+            self._details = {}
+            self._day = today
+        return self._details
+
+    def resolve(self, boards):
+        """Returns copies of the boards with each entry's stop list added.
+
+        Entries get a 'stops' key (dict entries) or a `stops` attribute
+        (BoardEntry records). If a journey's details couldn't be fetched,
+        its entries get None, and the error is kept in `errors` by
+        detailsId until the next call.
+
+        :param boards: iterable of boards, i.e. lists of entries
+        :return: list of boards
+        """
+        boards = [list(board) for board in boards]
+        with self._lock:
+            known = self._known()
+            wanted = {self._details_id(entry) for board in boards
+                      for entry in board} - {None}
+            missing = [details_id for details_id in wanted
+                       if details_id not in known]
+            self.reused += len(wanted) - len(missing)
+
+        errors = {}
+        for result in fan_out(self.api.journey_details, missing,
+                              workers=self.workers):
+            if result.error is not None:
+                errors[result.key] = result.error
+            else:
+                with self._lock:
+                    known[result.key] = result.value
+        with self._lock:
+            self.fetched += len(missing) - len(errors)
+            self.errors = errors
+        return [[self._enrich(entry, known.get(self._details_id(entry)))
+                 for entry in board] for board in boards]
+
+    def resolve_board(self, board):
+        """Shortcut for resolving a single board.
+
+        :param board: list of entries
+        :return: list of entries
+        """
+        return self.resolve([board])[0]
+
+    def clear(self):
+        """Forgets all memoized journey details."""
+        with self._lock:
+            self._details = {}
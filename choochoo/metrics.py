@@ -0,0 +1,205 @@
+"""Registry of per-endpoint request metrics, exportable for Prometheus."""
+import bisect
+import threading
+
+# Upper bounds of the histogram buckets, in seconds and bytes.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1024, 10240, 102400, 1048576, 10485760)
+
+
+class Histogram:
+    """Counts observations into buckets by upper bound.
+
+    :param buckets: sorted tuple of upper bounds
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Returns (upper bound, count of observations <= bound) pairs,
+        ending with float('inf').
+
+        :return: list of tuples
+        """
+        pairs, total = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Collects request metrics per wrapper class and endpoint template.
+
+    Pass an instance as `metrics` to any wrapper; wrappers sharing one
+    registry are told apart by their class name. Recorded are histograms
+    of the total time of a request including retries (request_seconds),
+    the time until its headers arrived (ttfb_seconds), the size of its
+    body (response_bytes) and the time spent decoding it
+    (decode_seconds), as well as counters of requests by status
+    (requests_total), of retries (retries_total) and of responses
+    revalidated with an HTTPCache (revalidated_total). Requests that raised
+    before a response arrived are counted under the exception's name.
+    Revalidated responses count 0 response bytes, as their body came from
+    the cache, and the time until the 304's headers arrived as TTFB.
+
+    :param latency_buckets: tuple of upper bounds in seconds
+    :param size_buckets: tuple of upper bounds in bytes
+    """
+
+    histograms = ('request_seconds', 'ttfb_seconds', 'response_bytes',
+                  'decode_seconds')
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS,
+                 size_buckets=SIZE_BUCKETS):
+        self.latency_buckets = tuple(sorted(latency_buckets))
+        self.size_buckets = tuple(sorted(size_buckets))
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, wrapper, template, name, value):
+        """Adds a value to one of the histograms.
+
+        :param wrapper: str, name of the wrapper class
+        :param template: str, endpoint template
+        :param name: str, one of `histograms`
+        :param value: float
+        """
+        key = (name, wrapper, template)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(
+                    self.size_buckets if name == 'response_bytes'
+                    else self.latency_buckets)
+            histogram.observe(value)
+
+    def count(self, wrapper, template, name, status=None, n=1):
+        """Increments a counter.
+
+        :param wrapper: str, name of the wrapper class
+        :param template: str, endpoint template
+        :param name: str
+        :param status: status code or error name, for requests_total
+        :param n: int
+        """
+        key = (name, wrapper, template, status)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def request(self, wrapper, template, status, seconds, ttfb=None,
+                size=None, retries=0, revalidated=False):
+        """Records a finished request.
+
+        :param wrapper: str, name of the wrapper class
+        :param template: str, endpoint template
+        :param status: int status code, or str name of the error raised
+        :param seconds: float, total time including retries
+        :param ttfb: float, seconds until the response headers arrived
+        :param size: int, body size in bytes
+        :param retries: int
+        :param revalidated: bool, the body was served from an HTTPCache
+            after a 304; its size is recorded as 0 bytes transferred
+        """
+        self.count(wrapper, template, 'requests_total', status)
+        self.observe(wrapper, template, 'request_seconds', seconds)
+        if ttfb is not None:
+            self.observe(wrapper, template, 'ttfb_seconds', ttfb)
+        if revalidated:
+            self.count(wrapper, template, 'revalidated_total')
+            size = 0
+        if size is not None:
+            self.observe(wrapper, template, 'response_bytes', size)
+        if retries:
+            self.count(wrapper, template, 'retries_total', n=retries)
+
+    def as_dict(self):
+        """Returns all metrics as nested dicts, by wrapper, template and
+        metric name. Histograms are dicts of count, sum and cumulative
+        bucket counts, requests_total a dict by status.
+
+        :return: dict
+        """
+        result = {}
+        with self._lock:
+            for (name, wrapper, template), histogram in \
+                    self._histograms.items():
+                result.setdefault(wrapper, {}).setdefault(template, {})[
+                    name] = {'count': histogram.count, 'sum': histogram.sum,
+                             'buckets': dict(histogram.cumulative())}
+            for (name, wrapper, template, status), n in \
+                    self._counters.items():
+                metrics = result.setdefault(wrapper, {}).setdefault(
+                    template, {})
+                if name == 'requests_total':
+                    metrics.setdefault(name, {})[status] = n
+                else:
+                    metrics[name] = n
+        return result
+
+    def prometheus(self, prefix='choochoo'):
+        """Returns all metrics in Prometheus' text exposition format.
+
+        :param prefix: str, prepended to the metric names
+        :return: str
+        """
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items(),
+                              key=lambda item: tuple(map(str, item[0])))
+        current = None
+        for (name, wrapper, template), histogram in histograms:
+            metric = '%s_%s' % (prefix, name)
+            if name != current:
+                lines.append('# TYPE %s histogram' % metric)
+                current = name
+            labels = 'wrapper="%s",endpoint="%s"' % (_escape(wrapper),
+                                                     _escape(template))
+            for bound, count in histogram.cumulative():
+                lines.append('%s_bucket{%s,le="%s"} %d'
+                             % (metric, labels, _number(bound), count))
+            lines.append('%s_sum{%s} %s' % (metric, labels,
+                                            _number(histogram.sum)))
+            lines.append('%s_count{%s} %d' % (metric, labels,
+                                              histogram.count))
+        for (name, wrapper, template, status), n in counters:
+            metric = '%s_%s' % (prefix, name)
+            if name != current:
+                lines.append('# TYPE %s counter' % metric)
+                current = name
+            labels = 'wrapper="%s",endpoint="%s"' % (_escape(wrapper),
+                                                     _escape(template))
+            if status is not None:
+                labels += ',status="%s"' % _escape(status)
+            lines.append('%s{%s} %d' % (metric, labels, n))
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def clear(self):
+        """Drops all recorded metrics."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
@@ -0,0 +1,168 @@
+"""Iteration over offset/limit paged endpoints with page prefetching."""
+from collections import deque
+
+
+def page_items(page):
+    """Returns the items of a page, which is either a list or a dict with
+    an 'items' list.
+
+    :param page: list or dict
+    :return: list
+    """
+    if isinstance(page, dict):
+        return page.get('items') or []
+    return page or []
+
+
+def page_limit(page):
+    """Returns the page size a page reports it was served with, if any.
+
+    :param page: list or dict
+    :return: int or None
+    """
+    limit = page.get('limit') if isinstance(page, dict) else None
+    return limit if isinstance(limit, int) and limit > 0 else None
+
+
+class _Cursor:
+    """Offsets to request and when to stop, shared by both paginators.
+
+    Pages are requested `page_size` apart until a page shows that the
+    server serves fewer items per page, either by the limit it reports or
+    by a short page without one. The stride then shrinks to what was
+    served, and pages requested ahead with the old stride are discarded.
+    Iteration ends on an empty page, on a page shorter than its reported
+    limit, or after max_items.
+    """
+
+    def __init__(self, page_size, prefetch, max_items, start):
+        self.page_size = page_size
+        self.stride = page_size
+        self.prefetch = prefetch
+        self.next = start
+        self.end = None if max_items is None else start + max_items
+        self.remaining = max_items
+
+    def due(self, pending):
+        """Returns the offsets to request so that `prefetch` pages are in
+        flight besides the current one.
+
+        :param pending: int, number of pages in flight
+        :return: list of int
+        """
+        offsets = []
+        while (pending + len(offsets) < self.prefetch + 1 and
+               (self.end is None or self.next < self.end)):
+            offsets.append(self.next)
+            self.next += self.stride
+        return offsets
+
+    def items(self, page):
+        items = page_items(page)
+        if self.remaining is not None:
+            items = items[:self.remaining]
+            self.remaining -= len(items)
+        return items
+
+    def advance(self, offset, page, count):
+        """Decides how to go on after a page of `count` items was consumed.
+
+        :return: tuple of bools, (done, discard pages in flight)
+        """
+        limit = page_limit(page)
+        if not count or self.remaining == 0 or (limit is not None and
+                                                count < limit):
+            return True, False
+        served = limit if limit is not None else count
+        if served < self.stride:
+            self.stride = served
+            self.next = offset + served
+            return False, True
+        return False, False
+
+
+def paginate(fetch, page_size, prefetch=2, max_items=None, start=0):
+    """Yields the items of all pages, fetching ahead on a thread pool.
+
+    While the caller consumes a page, the following `prefetch` pages are
+    already requested. Requests made for pages after the last one are
+    cancelled or their results discarded.
+
+    :param fetch: callable taking offset and limit, returning a page
+    :param page_size: int, items requested per page
+    :param prefetch: int, max. number of pages requested ahead
+    :param max_items: int, max. number of items yielded in total
+    :param start: int, offset of the first item
+    :return: generator
+    """
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1!")
+    if prefetch < 0:
+        raise ValueError("prefetch must not be negative!")
+    return _paginate(fetch, page_size, prefetch, max_items, start)
+
+
+def _paginate(fetch, page_size, prefetch, max_items, start):
+    from concurrent.futures import ThreadPoolExecutor
+    cursor = _Cursor(page_size, prefetch, max_items, start)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=prefetch + 1) as executor:
+        try:
+            while True:
+                for offset in cursor.due(len(pending)):
+                    pending.append((offset, executor.submit(fetch, offset,
+                                                            page_size)))
+                if not pending:
+                    return
+                offset, future = pending.popleft()
+                page = future.result()
+                items = cursor.items(page)
+                yield from items
+                done, discard = cursor.advance(offset, page, len(items))
+                if done:
+                    return
+                if discard:
+                    while pending:
+                        pending.popleft()[1].cancel()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def async_paginate(fetch, page_size, prefetch=2, max_items=None, start=0):
+    """Asyncio counterpart of paginate(); awaits fetch(offset, limit).
+
+    :return: async generator
+    """
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1!")
+    if prefetch < 0:
+        raise ValueError("prefetch must not be negative!")
+    return _async_paginate(fetch, page_size, prefetch, max_items, start)
+
+
+async def _async_paginate(fetch, page_size, prefetch, max_items, start):
+    import asyncio
+    cursor = _Cursor(page_size, prefetch, max_items, start)
+    pending = deque()
+    try:
+        while True:
+            for offset in cursor.due(len(pending)):
+                pending.append((offset, asyncio.ensure_future(
+                    fetch(offset, page_size))))
+            if not pending:
+                return
+            offset, task = pending.popleft()
+            page = await task
+            items = cursor.items(page)
+            for item in items:
+                yield item
+            done, discard = cursor.advance(offset, page, len(items))
+            if done:
+                return
+            if discard:
+                while pending:
+                    pending.popleft()[1].cancel()
+    finally:
+        for _, task in pending:
+            task.cancel()
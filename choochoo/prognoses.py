@@ -0,0 +1,126 @@
+"""Dense matrices of BahnPark prognoses across many spaces."""
+import calendar
+from collections import namedtuple
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PrognosisMatrix = namedtuple('PrognosisMatrix', ('values', 'spaces', 'times',
+                                                 'errors'))
+PrognosisMatrix.__doc__ = """Prognoses of many spaces on a common time grid.
+
+`values` is a float array of shape (len(spaces), len(times)) holding the
+prognosed occupancy category of each space and time slot, NaN where none
+was given. `spaces` holds the space IDs of the rows, `times` the start of
+each slot as datetime64 in UTC. `errors` maps the IDs of spaces whose
+prognoses couldn't be fetched to the exception raised; their rows are all
+NaN.
+"""
+
+
+def _items(data):
+    if isinstance(data, dict):
+        return data.get('prognoses', data.get('items', [])) or []
+    return data or []
+
+
+# how: cells are combined by
+AGGREGATES = ('max', 'min', 'mean')
+
+
+def check(how):
+    """Raises ValueError unless how names one of AGGREGATES.
+
+    :param how: str
+    """
+    if how not in AGGREGATES:
+        raise ValueError("Unknown aggregate %r! Must be one of %s."
+                         % (how, ', '.join(AGGREGATES)))
+
+
+def to_seconds(segment):
+    """Converts an ISO 8601 time segment to seconds since the epoch.
+
+    Segments with a UTC offset are converted to UTC; segments without are
+    taken to be in UTC already.
+
+    :param segment: str, e.g. '2017-05-24T11:45:00+02:00'
+    :return: int
+    """
+    if segment.endswith('Z'):
+        segment = segment[:-1] + '+00:00'
+    moment = datetime.fromisoformat(segment)
+    if moment.tzinfo is not None:
+        return int(moment.timestamp())
+    return calendar.timegm(moment.timetuple())
+
+
+def space_ids(spaces):
+    """Returns the IDs of spaces as returned by BahnPark.spaces().
+
+    :param spaces: dict or list
+    :return: list
+    """
+    if isinstance(spaces, dict):
+        spaces = spaces.get('items', [])
+    return [space['id'] for space in spaces if space.get('id') is not None]
+
+
+def to_matrix(results, spaces, slot=900, how='max'):
+    """Aligns the prognoses of many spaces on a common grid of time slots.
+
+    Each prognosis is put into the slot its timeSegment falls in, after
+    converting it to UTC; the grid runs from the earliest to the latest
+    slot of all spaces. Where a slot spans several prognoses of a space,
+    as when it is wider than their segments, they are combined by `how`:
+    'max' keeps the peak category, 'min' the lowest and 'mean' their
+    average.
+
+    :param results: iterable of choochoo.bulk.Result, keyed by space ID,
+        of BahnPark.occupancies(by_id, prognoses=True)
+    :param spaces: list of space IDs, in the order of the matrix rows
+    :param slot: int, seconds per time slot
+    :param how: str, one of AGGREGATES
+    :return: PrognosisMatrix
+    """
+    if numpy is None:
+        raise ImportError("Prognosis matrices require numpy!")
+    if slot <= 0:
+        raise ValueError("slot must be positive!")
+    check(how)
+    row_of = {space_id: row for row, space_id in enumerate(spaces)}
+    rows, seconds, values, errors = [], [], [], {}
+    for result in results:
+        if result.error is not None:
+            errors[result.key] = result.error
+            continue
+        for prognosis in _items(result.value):
+            segment = prognosis.get('timeSegment')
+            category = prognosis.get('category')
+            if segment and isinstance(category, (int, float)):
+                rows.append(row_of[result.key])
+                seconds.append(to_seconds(segment))
+                values.append(category)
+    slots = numpy.array(seconds, dtype='i8') // slot
+    first = int(slots.min()) if len(slots) else 0
+    width = int(slots.max()) - first + 1 if len(slots) else 0
+    cells = (numpy.array(rows, dtype='i8'), slots - first)
+    values = numpy.array(values, dtype=float)
+    matrix = numpy.full((len(spaces), width), numpy.nan)
+    if how == 'max':
+        numpy.fmax.at(matrix, cells, values)
+    elif how == 'min':
+        numpy.fmin.at(matrix, cells, values)
+    else:
+        sums = numpy.zeros_like(matrix)
+        counts = numpy.zeros_like(matrix)
+        numpy.add.at(sums, cells, values)
+        numpy.add.at(counts, cells, 1)
+        numpy.divide(sums, counts, out=matrix, where=counts > 0)
+    ids = numpy.array(spaces, dtype=None if all(
+        isinstance(s, int) for s in spaces) else object)
+    times = ((first + numpy.arange(width)) * slot).astype('datetime64[s]')
+    return PrognosisMatrix(matrix, ids, times, errors)
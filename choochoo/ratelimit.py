@@ -0,0 +1,190 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Requests reserve a token and are told how long to wait for it; the
+    fill level may go negative while reservations are pending, which
+    queues callers in arrival order.
+
+    :param rate: float, tokens added per second
+    :param capacity: float, max. number of tokens, i.e. the burst size;
+        defaults to rate
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive!")
+        self.rate = rate
+        self.capacity = capacity if capacity else rate
+        self._tokens = self.capacity
+        self._stamp = time.time()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens, stamp, n, now):
+        # Returns the new state and the seconds to wait for n tokens.
+        if stamp > now:
+            stamp = now
+        tokens = min(self.capacity, tokens + (now - stamp) * self.rate) - n
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        return tokens, now, wait
+
+    def reserve(self, n=1):
+        """Takes n tokens and returns the seconds to wait before using them.
+
+        :param n: float
+        :return: float
+        """
+        with self._lock:
+            self._tokens, self._stamp, wait = self._take(
+                self._tokens, self._stamp, n, time.time())
+        return wait
+
+    def acquire(self, n=1):
+        """Blocks until n tokens are available and takes them.
+
+        :param n: float
+        :return: float, seconds waited
+        """
+        wait = self.reserve(n)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def level(self):
+        """Returns the current number of tokens in the bucket.
+
+        :return: float
+        """
+        with self._lock:
+            now = time.time()
+            return min(self.capacity,
+                       self._tokens + (now - self._stamp) * self.rate)
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket whose state lives in a file, shared by all processes
+    using the same path. Access is serialized with flock(), so this
+    backend is only available on Unix.
+
+    :param path: str, path of the state file
+    :param rate: float, tokens added per second
+    :param capacity: float, max. number of tokens; defaults to rate
+    """
+
+    _state = struct.Struct('dd')
+
+    def __init__(self, path, rate, capacity=None):
+        import fcntl
+        self._fcntl = fcntl
+        super(FileTokenBucket, self).__init__(rate, capacity=capacity)
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        os.close(fd)
+
+    def _update(self, n):
+        with open(self.path, 'r+b') as f:
+            self._fcntl.flock(f, self._fcntl.LOCK_EX)
+            try:
+                raw = f.read(self._state.size)
+                now = time.time()
+                if len(raw) == self._state.size:
+                    tokens, stamp = self._state.unpack(raw)
+                else:
+                    tokens, stamp = self.capacity, now
+                tokens, stamp, wait = self._take(tokens, stamp, n, now)
+                if n:
+                    f.seek(0)
+                    f.write(self._state.pack(tokens, stamp))
+                    f.flush()
+            finally:
+                self._fcntl.flock(f, self._fcntl.LOCK_UN)
+        return tokens, wait
+
+    def reserve(self, n=1):
+        with self._lock:
+            return self._update(n)[1]
+
+    def level(self):
+        with self._lock:
+            return self._update(0)[0]
+
+
+class RateLimiter:
+    """Client-side rate limit shared by all wrappers using an access token.
+
+    Keeps one token bucket per access token. Pass the same instance to all
+    wrappers, and Interface.request() waits for a token before each
+    request it sends over the network.
+
+    The bucket starts full, so any `per` seconds may see up to
+    `capacity + rate` requests. The default burst is one second's worth
+    of requests, at least one; to stay strictly below a sliding-window
+    quota, pass `quota - capacity` as rate, e.g.
+    RateLimiter(99, per=60, capacity=1) for 100 requests per minute.
+
+    :param rate: float, number of requests allowed per `per` seconds
+    :param per: float, seconds
+    :param capacity: float, burst size; defaults to max(1, rate / per)
+    :param directory: str, if given, buckets are kept in files in this
+        directory and shared by all processes pointing to it
+    """
+
+    def __init__(self, rate, per=1.0, capacity=None, directory=None):
+        self.rate = rate / per
+        self.capacity = capacity if capacity else max(1, self.rate)
+        self.directory = directory
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key):
+        """Returns the bucket of the given access token.
+
+        :param key: str
+        :return: TokenBucket
+        """
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if self.directory:
+                    name = hashlib.sha256(str(key).encode()).hexdigest()
+                    path = os.path.join(self.directory, name + '.bucket')
+                    bucket = FileTokenBucket(path, self.rate, self.capacity)
+                else:
+                    bucket = TokenBucket(self.rate, self.capacity)
+                self._buckets[key] = bucket
+            return bucket
+
+    def reserve(self, key):
+        """Reserves a request for key; see TokenBucket.reserve().
+
+        :param key: str, access token
+        :return: float, seconds to wait before sending
+        """
+        return self.bucket(key).reserve()
+
+    def acquire(self, key):
+        """Blocks until a request for key may be sent.
+
+        :param key: str, access token
+        :return: float, seconds waited
+        """
+        return self.bucket(key).acquire()
+
+    def levels(self):
+        """Returns the current fill level of each token's bucket.
+
+        Buckets are keyed by a hash prefix of their token, so they can be
+        exported to dashboards as-is.
+
+        :return: dict
+        """
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {hashlib.sha256(str(key).encode()).hexdigest()[:12]:
+                bucket.level() for key, bucket in buckets.items()}
@@ -0,0 +1,196 @@
+"""Append-only, columnar archive of BahnPark occupancy snapshots."""
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+Occupancies = namedtuple('Occupancies', ('space', 'time', 'category',
+                                         'free'))
+Occupancies.__doc__ = """Columns of recorded occupancies, as numpy arrays.
+
+`space` holds the space IDs, `time` the snapshot times in seconds since the
+epoch. `category` is the occupancy class (0 if unknown), `free` the number
+of free places, or a lower bound of it, and -1 if unknown.
+"""
+
+# column: dtype; the row count is the shortest column's length.
+COLUMNS = (('space', 'u4'), ('time', 'i8'), ('category', 'u1'),
+           ('free', 'i4'))
+
+
+def _seconds(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+class OccupancyRecorder:
+    """Archives BahnPark.occupancies() snapshots in a directory of columns.
+
+    Every space's allocation in a snapshot becomes a row of four
+    fixed-width columns, each in its own file that is only ever appended
+    to: the space (as code into a dictionary of space IDs, kept in
+    spaces.json), the snapshot's time, the occupancy category and the
+    number of free places. read() memory-maps the columns, finds time
+    ranges by binary search, as snapshots must be recorded in time order,
+    and filters spaces on their codes, so only the rows asked for are
+    touched.
+
+    Rows written only partially when a process died are dropped when the
+    recorder is opened.
+
+    :param path: str, directory of the store; created if missing
+    :param api: choochoo.BahnPark, polled by record() if no snapshot is
+        given
+    """
+
+    version = 1
+
+    def __init__(self, path, api=None):
+        if numpy is None:
+            raise ImportError("OccupancyRecorder requires numpy!")
+        self.path = path
+        self.api = api
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self.space_ids = []
+        if os.path.exists(self._file('spaces.json')):
+            with open(self._file('spaces.json'), encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.version:
+                raise ValueError("Unsupported recorder version %r!"
+                                 % data.get('version'))
+            self.space_ids = data['spaces']
+        self._codes = {space_id: code
+                       for code, space_id in enumerate(self.space_ids)}
+        self.rows = min(self._size(name) // numpy.dtype(dtype).itemsize
+                        for name, dtype in COLUMNS)
+        for name, dtype in COLUMNS:
+            with open(self._file(name), 'ab') as f:
+                f.truncate(self.rows * numpy.dtype(dtype).itemsize)
+        self.last_time = int(self._column('time')[-1]) if self.rows else None
+
+    def __len__(self):
+        return self.rows
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _size(self, name):
+        try:
+            return os.path.getsize(self._file(name))
+        except FileNotFoundError:
+            return 0
+
+    def _column(self, name):
+        dtype = dict(COLUMNS)[name]
+        if not self.rows:
+            return numpy.empty(0, dtype=dtype)
+        return numpy.memmap(self._file(name), dtype=dtype, mode='r',
+                            shape=(self.rows,))
+
+    @staticmethod
+    def _allocations(snapshot):
+        if isinstance(snapshot, dict):
+            snapshot = snapshot.get('allocations', snapshot.get('items', []))
+        for item in snapshot:
+            space = item.get('space') or {}
+            space_id = space.get('id', item.get('id'))
+            if space_id is not None:
+                yield space_id, item.get('allocation') or {}
+
+    @staticmethod
+    def _free(allocation):
+        free = allocation.get('free')
+        if isinstance(free, int):
+            return free
+        # texts like '> 10' give a lower bound
+        match = re.search(r'\d+', str(allocation.get('text') or ''))
+        return int(match.group()) if match else -1
+
+    def _save_spaces(self):
+        tmp = self._file('spaces.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'spaces': self.space_ids}, f,
+                      separators=(',', ':'))
+        os.replace(tmp, self._file('spaces.json'))
+
+    def record(self, snapshot=None, timestamp=None):
+        """Appends a snapshot of occupancies.
+
+        :param snapshot: dict or list as returned by BahnPark.occupancies();
+            fetched from the recorder's api if None
+        :param timestamp: int, float or datetime, time of the snapshot;
+            now if None
+        :return: int, number of rows appended
+        :raises: ValueError if timestamp is older than the last snapshot
+        """
+        if snapshot is None:
+            snapshot = self.api.occupancies()
+        timestamp = _seconds(time.time() if timestamp is None else timestamp)
+        with self._lock:
+            if self.last_time is not None and timestamp < self.last_time:
+                raise ValueError("Snapshots must be recorded in time order!")
+            spaces, categories, free = [], [], []
+            known = len(self.space_ids)
+            for space_id, allocation in self._allocations(snapshot):
+                code = self._codes.get(space_id)
+                if code is None:
+                    code = self._codes[space_id] = len(self.space_ids)
+                    self.space_ids.append(space_id)
+                spaces.append(code)
+                category = allocation.get('category')
+                categories.append(category if isinstance(category, int)
+                                  else 0)
+                free.append(self._free(allocation))
+            if not spaces:
+                return 0
+            if len(self.space_ids) > known:
+                # Codes must be resolvable before rows referring to them.
+                self._save_spaces()
+            columns = {'space': spaces, 'time': [timestamp] * len(spaces),
+                       'category': categories, 'free': free}
+            for name, dtype in COLUMNS:
+                with open(self._file(name), 'ab') as f:
+                    f.write(numpy.asarray(columns[name], dtype=dtype)
+                            .tobytes())
+            self.rows += len(spaces)
+            self.last_time = timestamp
+            return len(spaces)
+
+    def read(self, start=None, end=None, spaces=None):
+        """Returns the recorded rows of a time range and set of spaces.
+
+        :param start: int, float or datetime, first snapshot time included
+        :param end: int, float or datetime, first snapshot time excluded
+        :param spaces: iterable of space IDs; all spaces if None
+        :return: Occupancies
+        """
+        with self._lock:
+            times = self._column('time')
+            first = 0 if start is None else int(numpy.searchsorted(
+                times, _seconds(start), side='left'))
+            last = len(times) if end is None else int(numpy.searchsorted(
+                times, _seconds(end), side='left'))
+            columns = {name: self._column(name)[first:last]
+                       for name, _ in COLUMNS}
+            space_ids = numpy.array(self.space_ids, dtype=None if all(
+                isinstance(s, int) for s in self.space_ids) else object)
+        if spaces is not None:
+            codes = [self._codes[s] for s in spaces if s in self._codes]
+            mask = numpy.isin(columns['space'], codes)
+            columns = {name: column[mask] for name, column in columns.items()}
+        return Occupancies(
+            space=space_ids[columns['space']] if len(space_ids)
+            else numpy.empty(0, dtype='i8'),
+            time=numpy.array(columns['time']),
+            category=numpy.array(columns['category']),
+            free=numpy.array(columns['free']))
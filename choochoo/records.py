@@ -0,0 +1,97 @@
+"""Compact typed records for Fahrplan departure and arrival boards."""
+import datetime
+import functools
+import sys
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_datetime(value):
+    """Parses a board's 'YYYY-MM-DDTHH:MM' timestamp.
+
+    Results are cached, so entries sharing a departure time share one
+    datetime object as well.
+
+    :param value: str
+    :return: datetime.datetime
+    """
+    return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M')
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class BoardEntry:
+    """A single departure or arrival of a Fahrplan board.
+
+    Uses __slots__ instead of a per-instance dict, interns the strings that
+    repeat across entries and boards (train names, types, stations,
+    tracks) and parses the timestamp into a datetime once.
+    """
+
+    __slots__ = ('name', 'type', 'board_id', 'stop_id', 'stop_name',
+                 'date_time', 'track', 'details_id', 'origin', 'direction',
+                 'stops')
+
+    _keys = (('name', 'name'), ('type', 'type'), ('boardId', 'board_id'),
+             ('stopId', 'stop_id'), ('stopName', 'stop_name'),
+             ('track', 'track'), ('detailsId', 'details_id'),
+             ('origin', 'origin'), ('direction', 'direction'))
+
+    def __init__(self, name=None, type=None, board_id=None, stop_id=None,
+                 stop_name=None, date_time=None, track=None, details_id=None,
+                 origin=None, direction=None, stops=None):
+        self.name = _intern(name)
+        self.type = _intern(type)
+        self.board_id = board_id
+        self.stop_id = stop_id
+        self.stop_name = _intern(stop_name)
+        self.date_time = date_time
+        self.track = _intern(track)
+        self.details_id = details_id
+        self.origin = _intern(origin)
+        self.direction = _intern(direction)
+        self.stops = stops
+
+    @classmethod
+    def from_dict(cls, entry):
+        """Creates a record from an entry of a board as returned by the API.
+
+        :param entry: dict
+        :return: BoardEntry
+        """
+        date_time = entry.get('dateTime')
+        return cls(date_time=parse_datetime(date_time) if date_time else None,
+                   **{attr: entry.get(key) for key, attr in cls._keys})
+
+    def as_dict(self):
+        """Returns the entry in the API's dict format.
+
+        :return: dict
+        """
+        entry = {key: getattr(self, attr) for key, attr in self._keys
+                 if getattr(self, attr) is not None}
+        if self.date_time is not None:
+            entry['dateTime'] = self.date_time.strftime('%Y-%m-%dT%H:%M')
+        if self.stops is not None:
+            entry['stops'] = self.stops
+        return entry
+
+    def __eq__(self, other):
+        if not isinstance(other, BoardEntry):
+            return NotImplemented
+        return all(getattr(self, attr) == getattr(other, attr)
+                   for attr in self.__slots__)
+
+    def __repr__(self):
+        return '<BoardEntry %s %s at %s>' % (self.name, self.stop_name,
+                                             self.date_time)
+
+
+def to_board(entries):
+    """Converts a board as returned by the API into a list of BoardEntry.
+
+    :param entries: list of dicts
+    :return: list of BoardEntry
+    """
+    return [BoardEntry.from_dict(entry) for entry in entries]
@@ -0,0 +1,287 @@
+"""Registry joining the identifiers one station has across the APIs."""
+import json
+import os
+import re
+import threading
+
+from .bulk import fan_out
+
+# Kinds of identifiers, and the APIs using them.
+KINDS = ('eva', 'station_number', 'abbrev', 'center_id')
+
+
+def normalize_name(name):
+    """Reduces a station name to lower-case letters and digits, so that
+    e.g. 'Frankfurt(Main)Hbf' and 'Frankfurt (Main) Hbf' compare equal.
+
+    :param name: str
+    :return: str
+    """
+    return re.sub(r'\W+', '', (name or '').casefold())
+
+
+class StationRegistry:
+    """Maps any identifier of a station to all its others.
+
+    A station's record holds its name and, as far as known, its EVA number
+    (Fahrplan location IDs), its station number (BahnPark station IDs and
+    FaSta station numbers), its RIL100 abbreviation (Betriebsstellen) and
+    the ID of its travel center (Reisezentren). Lookups by any of them are
+    dict lookups. The APIs share no identifiers, so records are joined on
+    normalized names; add() corrects or completes them by hand.
+
+    :param fahrplan: choochoo.Fahrplan, used by fetch()
+    :param bahnpark: choochoo.BahnPark, used by from_api() and fetch()
+    :param fasta: choochoo.FaSta, used by fetch()
+    :param reisezentren: choochoo.Reisezentren, used by from_api() and
+        fetch()
+    :param betriebsstellen: choochoo.Betriebsstellen, used by from_api()
+        and fetch()
+    """
+
+    version = 1
+
+    def __init__(self, fahrplan=None, bahnpark=None, fasta=None,
+                 reisezentren=None, betriebsstellen=None):
+        self.fahrplan = fahrplan
+        self.bahnpark = bahnpark
+        self.fasta = fasta
+        self.reisezentren = reisezentren
+        self.betriebsstellen = betriebsstellen
+        self.records = []
+        self._ids = {}
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, name=None, **ids):
+        """Adds a station, merging it into the record that shares one of
+        its identifiers or, failing that, its normalized name.
+
+        A record found by name whose identifiers differ from the given
+        ones is taken to be another station of the same name, and a new
+        record is added.
+
+        :param name: str
+        :param ids: identifiers by kind, see KINDS
+        :return: dict, the station's record
+        :raises: ValueError if the identifiers belong to different records,
+            or contradict the identifiers of the record they belong to
+        """
+        unknown = set(ids) - set(KINDS)
+        if unknown:
+            raise ValueError("Unknown kinds of identifiers: %s! Must be one "
+                             "of %s." % (', '.join(sorted(unknown)),
+                                         ', '.join(KINDS)))
+        ids = {kind: str(value) for kind, value in ids.items()
+               if value is not None and value != ''}
+        with self._lock:
+            record = None
+            for kind, value in ids.items():
+                found = self._ids.get((kind, value))
+                if found is not None and record is not None and \
+                        found is not record:
+                    raise ValueError("%s belong to different stations!"
+                                     % ', '.join(map(str, ids.values())))
+                record = found if found is not None else record
+            by_name = record is None and bool(normalize_name(name))
+            if by_name:
+                record = self._names.get(normalize_name(name))
+            clashes = ['%s %s != %s' % (kind, record[kind], value)
+                       for kind, value in ids.items()
+                       if record is not None and
+                       record.get(kind) not in (None, value)]
+            if clashes and by_name:
+                record = None
+            elif clashes:
+                raise ValueError("Conflicting identifiers for %s: %s!"
+                                 % (record.get('name'), ', '.join(clashes)))
+            if record is None:
+                record = {'name': name}
+                self.records.append(record)
+            elif record.get('name') is None:
+                record['name'] = name
+            for kind, value in ids.items():
+                if record.get(kind) is None:
+                    record[kind] = value
+                    self._ids[(kind, value)] = record
+            if normalize_name(record['name']):
+                self._names.setdefault(normalize_name(record['name']), record)
+            return record
+
+    def lookup(self, value, kind=None):
+        """Returns the record of the station with the given identifier.
+
+        :param value: str or int
+        :param kind: str, one of KINDS; all kinds are tried if None
+        :return: dict or None
+        """
+        value = str(value)
+        kinds = (kind,) if kind else KINDS
+        for kind in kinds:
+            record = self._ids.get((kind, value))
+            if record is not None:
+                return dict(record)
+        return None
+
+    def ids(self, value, kind=None):
+        """Returns all identifiers of the station with the given one.
+
+        :param value: str or int
+        :param kind: str, one of KINDS; all kinds are tried if None
+        :return: dict of identifiers by kind
+        :raises: KeyError if the station is unknown
+        """
+        record = self.lookup(value, kind)
+        if record is None:
+            raise KeyError(value)
+        return {kind: record[kind] for kind in KINDS if kind in record}
+
+    def build(self, betriebsstellen=(), stations=(), centers=(),
+              locations=()):
+        """Adds the stations of full dumps of the APIs.
+
+        :param betriebsstellen: list of dicts as returned by the
+            Betriebsstellen API
+        :param stations: list of dicts as returned by BahnPark.stations()
+        :param centers: list of dicts as returned by the Reisezentren API
+        :param locations: list of dicts as returned by Fahrplan.location(),
+            whose IDs are EVA numbers
+        """
+        for entry in self._items(betriebsstellen):
+            self.add(entry.get('name'), abbrev=entry.get('abbrev'))
+        for station in self._items(stations):
+            self.add(station.get('name'), station_number=station.get('id'))
+        for center in self._items(centers):
+            name = center.get('name') or ''
+            if name.startswith('Reisezentrum '):
+                name = name[len('Reisezentrum '):]
+            self.add(name, center_id=center.get('id'))
+        for location in self._items(locations):
+            self.add(location.get('name'), eva=location.get('id'))
+
+    @staticmethod
+    def _items(data):
+        if isinstance(data, dict):
+            return data.get('items', [])
+        return data or []
+
+    @classmethod
+    def from_api(cls, fahrplan=None, bahnpark=None, fasta=None,
+                 reisezentren=None, betriebsstellen=None):
+        """Creates a registry from full dumps of the given APIs.
+
+        :return: StationRegistry
+        """
+        registry = cls(fahrplan, bahnpark, fasta, reisezentren,
+                       betriebsstellen)
+        registry.build(
+            betriebsstellen.request('betriebsstellen')
+            if betriebsstellen else (),
+            bahnpark.stations() if bahnpark else (),
+            reisezentren.request('reisezentren') if reisezentren else ())
+        return registry
+
+    def save(self, path):
+        """Writes the records to a JSON file atomically.
+
+        :param path: str
+        """
+        with self._lock:
+            data = {'version': self.version, 'records': self.records}
+            tmp = path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Adds the records of a file written by save() as they are.
+
+        :param path: str
+        :raises: ValueError if the file was written by an incompatible
+            version
+        """
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != self.version:
+            raise ValueError("Unsupported registry version %r!"
+                             % data.get('version'))
+        with self._lock:
+            for record in data['records']:
+                self.records.append(record)
+                for kind in KINDS:
+                    if record.get(kind) is not None:
+                        self._ids.setdefault((kind, record[kind]), record)
+                if normalize_name(record.get('name')):
+                    self._names.setdefault(normalize_name(record['name']),
+                                           record)
+
+    # part: (wrapper attribute, kind of identifier, call)
+    _parts = {
+        'departures': ('fahrplan', 'eva',
+                       lambda api, key, date: api.departures(key, date)),
+        'arrivals': ('fahrplan', 'eva',
+                     lambda api, key, date: api.arrivals(key, date)),
+        'parking': ('bahnpark', 'station_number',
+                    lambda api, key, date: api.stations(by_id=key)),
+        'facilities': ('fasta', 'station_number',
+                       lambda api, key, date:
+                       api.disruptions_by_station(key)),
+        'travel_center': ('reisezentren', 'center_id',
+                          lambda api, key, date: api.reisezentren(
+                              by_center_id=key)),
+        'betriebsstelle': ('betriebsstellen', 'abbrev',
+                           lambda api, key, date: api.betriebsstellen(
+                               key, is_abbreviation=True)),
+    }
+
+    def fetch(self, value, *parts, kind=None, date=None, workers=4):
+        """Fetches data on one station from several APIs concurrently.
+
+        Only the endpoints of the requested parts are called: departures,
+        arrivals, parking, facilities, travel_center and betriebsstelle.
+        Parts whose identifier isn't known, or whose call failed, are None
+        in the result, and the reason is kept in its 'errors' dict.
+
+        :param value: str or int, any identifier of the station
+        :param parts: str, the parts to fetch
+        :param kind: str, kind of value, one of KINDS; guessed if None
+        :param date: str, date of departure and arrival boards
+        :param workers: int, max. number of concurrent requests
+        :return: dict of the station's record, the parts and errors
+        :raises: KeyError if the station is unknown
+        """
+        unknown = set(parts) - set(self._parts)
+        if unknown:
+            raise ValueError("Unknown parts: %s! Must be one of %s."
+                             % (', '.join(sorted(unknown)),
+                                ', '.join(self._parts)))
+        record = self.lookup(value, kind)
+        if record is None:
+            raise KeyError(value)
+        result = {'station': record, 'errors': {}}
+        calls = []
+        for part in parts:
+            attribute, id_kind, _ = self._parts[part]
+            result[part] = None
+            if getattr(self, attribute) is None:
+                result['errors'][part] = ValueError(
+                    "No %s wrapper given!" % attribute)
+            elif record.get(id_kind) is None:
+                result['errors'][part] = KeyError(
+                    "No %s known for this station!" % id_kind)
+            else:
+                calls.append(part)
+
+        def call(part):
+            attribute, id_kind, get = self._parts[part]
+            return get(getattr(self, attribute), record[id_kind], date)
+
+        for outcome in fan_out(call, calls, workers=workers):
+            if outcome.error is not None:
+                result['errors'][outcome.key] = outcome.error
+            else:
+                result[outcome.key] = outcome.value
+        return result
@@ -8,9 +8,17 @@ class Reisezentren(Interface):
         https://developer.deutschebahn.com/store/apis/info?name=Reisezentren&version=v1&provider=DBOpenData
     """
 
-    def __init__(self, token=None, key=None, secret=None, config=None):
+    templates = ('reisezentren', 'reisezentren/{id}',
+                 'reisezentren/loc/{lat}/{lon}')
+
+    cache_ttls = {'reisezentren': 24 * 3600,
+                  'reisezentren/{id}': 24 * 3600,
+                  'reisezentren/loc/{lat}/{lon}': 24 * 3600}
+
+    def __init__(self, token=None, key=None, secret=None, config=None,
+                 **kwargs):
         super(Reisezentren, self).__init__(key=key, secret=secret, token=token,
-                                        config=config)
+                                        config=config, **kwargs)
         self.address += 'reisezentren/v1/'
 
     def request(self, endpoint, verb=None, **req_kwargs):
@@ -18,18 +26,17 @@ class Reisezentren(Interface):
 
         Querys API using a super() call to Interface.request(), checks the 
         HTTP status code and returns the response's json data 
-        as a python object.
+        as a python object, decoded by the wrapper's decoder.
 
         :param endpoint: str
         :param verb: str
         :param req_kwargs: kwargs accepted by requests.Request() 
         :return: dict or list
         """
-        req_kwargs['headers'] = {'Authorization': 'Bearer ' + self.token,
-                                 'Accept': 'application/json'}
+        req_kwargs['headers'] = self.headers()
         resp = super(Reisezentren, self).request(endpoint, verb=verb, **req_kwargs)
         resp.raise_for_status()
-        return resp.json()
+        return self.decode(resp)
 
     def reisezentren(self, by_center_name=None, by_center_id=None,
                      by_lat_lon=None, **endpoint_kwargs):
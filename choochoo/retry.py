@@ -0,0 +1,154 @@
+import datetime
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+
+class RetryPolicy:
+    """Retries failed requests with exponential backoff and jitter.
+
+    A request is retried if it raised one of `exceptions` or was answered
+    with one of `statuses`, as long as attempts are left and the next try
+    would start before the deadline. The wait before retry n (counting
+    from 0) is drawn uniformly from [0, min(max_backoff, backoff * 2**n)],
+    or taken from the response's Retry-After header if present, but never
+    longer than max_backoff.
+
+    One policy may be shared by several wrappers; its counters then add up
+    across all of them.
+
+    :param attempts: int, max. number of attempts including the first one
+    :param statuses: iterable of HTTP status codes to retry
+    :param exceptions: tuple of exception classes to retry
+    :param verbs: iterable of HTTP verbs that may be retried
+    :param backoff: float, base of the exponential backoff in seconds
+    :param max_backoff: float, upper bound of a single wait in seconds,
+        Retry-After included
+    :param jitter: bool, randomize backoffs; if False, the upper bound
+        is used
+    :param respect_retry_after: bool, wait as long as the server's
+        Retry-After header asks, up to max_backoff
+    :param deadline: float, max. seconds a request may take in total,
+        including all retries and waits
+    """
+
+    def __init__(self, attempts=3, statuses=(429, 500, 502, 503, 504),
+                 exceptions=(requests.ConnectionError, requests.Timeout),
+                 verbs=('GET', 'HEAD', 'OPTIONS'), backoff=0.5,
+                 max_backoff=30, jitter=True, respect_retry_after=True,
+                 deadline=None):
+        if attempts < 1:
+            raise ValueError("attempts must be at least 1!")
+        self.attempts = attempts
+        self.statuses = frozenset(statuses)
+        self.exceptions = tuple(exceptions)
+        self.verbs = frozenset(verbs)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+        self.deadline = deadline
+        self.retries = 0
+        self.gave_up = 0
+        self.waited = 0.0
+        self.wasted = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def retry_after(resp):
+        """Returns the seconds a response's Retry-After header asks to wait.
+
+        :param resp: requests.Response()
+        :return: float or None
+        """
+        value = resp.headers.get('Retry-After') if resp is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return max(0.0, (date - now).total_seconds())
+
+    def delay(self, attempt, resp=None):
+        """Returns the seconds to wait before retrying a failed attempt.
+
+        :param attempt: int, number of the failed attempt, counting from 0
+        :param resp: requests.Response() of the failed attempt, if any
+        :return: float
+        """
+        if self.respect_retry_after:
+            retry_after = self.retry_after(resp)
+            if retry_after is not None:
+                return min(self.max_backoff, retry_after)
+        ceiling = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+    def call(self, send, verb='GET'):
+        """Calls send() until it succeeds or the policy gives up.
+
+        send is passed the seconds left until the deadline (None without
+        one) to use as its timeout.
+
+        :param send: callable returning a requests.Response()
+        :param verb: str, HTTP verb of the request
+        :return: requests.Response() of the last attempt
+        :raises: the last attempt's exception, if it raised one
+        """
+        if verb not in self.verbs:
+            return send(self.deadline)
+
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt_start = time.monotonic()
+            remaining = None
+            if self.deadline is not None:
+                remaining = self.deadline - (attempt_start - start)
+            resp = error = None
+            try:
+                resp = send(remaining)
+            except self.exceptions as e:
+                error = e
+            if error is None and resp.status_code not in self.statuses:
+                return resp
+
+            delay = self.delay(attempt, resp)
+            elapsed = time.monotonic() - start
+            out_of_time = (self.deadline is not None and
+                           elapsed + delay >= self.deadline)
+            if attempt + 1 >= self.attempts or out_of_time:
+                with self._lock:
+                    self.gave_up += 1
+                if error is not None:
+                    raise error
+                return resp
+
+            with self._lock:
+                self.retries += 1
+                self.waited += delay
+                self.wasted += time.monotonic() - attempt_start + delay
+            if resp is not None and resp.raw is not None:
+                resp.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        """Returns the policy's counters.
+
+        `waited` is the time spent sleeping between attempts, `wasted`
+        additionally includes the duration of the failed attempts.
+
+        :return: dict
+        """
+        with self._lock:
+            return {'retries': self.retries, 'gave_up': self.gave_up,
+                    'waited': self.waited, 'wasted': self.wasted}
@@ -0,0 +1,143 @@
+"""Autocomplete layer over Fahrplan location searches."""
+import threading
+from collections import OrderedDict
+
+
+class _Node:
+    __slots__ = ('children', 'result', 'complete')
+
+    def __init__(self):
+        self.children = {}
+        self.result = None
+        self.complete = False
+
+
+class LocationSearch:
+    """Caches Fahrplan.location() results in a prefix trie.
+
+    Typing "Ber", "Berl", "Berli" searches for ever longer prefixes. If a
+    cached result for a shorter prefix is complete, i.e. it has fewer
+    than `max_results` entries, the longer query is answered by filtering
+    that result locally for names containing the query. Anything else is
+    fetched from the API and cached. At most `maxsize` results are kept,
+    evicting the least recently used.
+
+    Filtering assumes the API's matches for a longer query are a subset
+    of its matches for any prefix of it; pass max_results=0 to always ask
+    the API and only cache exact queries.
+
+    :param api: choochoo.Fahrplan
+    :param maxsize: int, max. number of cached results
+    :param max_results: int, size of a result at which the API may have
+        left out matches
+    """
+
+    def __init__(self, api, maxsize=4096, max_results=50):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1!")
+        self.api = api
+        self.maxsize = maxsize
+        self.max_results = max_results
+        self.hits = 0
+        self.derived = 0
+        self.misses = 0
+        self.evictions = 0
+        self._root = _Node()
+        self._lru = OrderedDict()  # query -> path of nodes from the root
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lru)
+
+    @staticmethod
+    def _normalize(query):
+        return ' '.join(query.split()).casefold()
+
+    def _path(self, query, create=False):
+        # Returns the nodes from the root to query, as far as they exist.
+        path = [self._root]
+        for char in query:
+            node = path[-1].children.get(char)
+            if node is None:
+                if not create:
+                    break
+                node = path[-1].children[char] = _Node()
+            path.append(node)
+        return path
+
+    def _lookup(self, query):
+        path = self._path(query)
+        if len(path) == len(query) + 1 and path[-1].result is not None:
+            self.hits += 1
+            self._lru.move_to_end(query)
+            return path[-1].result
+        for depth in range(len(path) - 1, -1, -1):
+            node = path[depth]
+            if node.result is not None and node.complete:
+                self.derived += 1
+                self._lru.move_to_end(query[:depth])
+                result = [location for location in node.result
+                          if query in self._normalize(
+                              location.get('name') or '')]
+                self._store(query, result, True)
+                return result
+        return None
+
+    def _store(self, query, result, complete):
+        path = self._path(query, create=True)
+        if path[-1].result is None:
+            self._lru[query] = path
+        self._lru.move_to_end(query)
+        path[-1].result = result
+        path[-1].complete = complete
+        while len(self._lru) > self.maxsize:
+            self._evict(*self._lru.popitem(last=False))
+            self.evictions += 1
+
+    @staticmethod
+    def _evict(query, path):
+        path[-1].result = None
+        path[-1].complete = False
+        # Prune the branch up to the first node still in use.
+        for depth in range(len(query), 0, -1):
+            node = path[depth]
+            if node.result is not None or node.children:
+                break
+            del path[depth - 1].children[query[depth - 1]]
+
+    def location(self, query):
+        """Returns locations matching query, like Fahrplan.location().
+
+        :param query: str
+        :return: list of dict
+        """
+        key = self._normalize(query)
+        with self._lock:
+            result = self._lookup(key)
+            if result is not None:
+                return result
+            self.misses += 1
+        result = self.api.location(query.strip())
+        with self._lock:
+            self._store(key, result, len(result) < self.max_results)
+        return result
+
+    def stats(self):
+        """Returns the search's counters. `derived` counts queries answered
+        by filtering the result of a shorter prefix.
+
+        :return: dict
+        """
+        with self._lock:
+            lookups = self.hits + self.derived + self.misses
+            return {'hits': self.hits, 'derived': self.derived,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'hit_rate': (self.hits + self.derived) / lookups
+                    if lookups else 0.0,
+                    'size': len(self._lru), 'maxsize': self.maxsize}
+
+    def clear(self):
+        """Forgets all cached results."""
+        with self._lock:
+            self._root = _Node()
+            self._lru.clear()
@@ -0,0 +1,267 @@
+"""In-memory nearest-neighbour index of Reisezentren travel centers."""
+import heapq
+import math
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EARTH_RADIUS = 6371.0088
+
+
+def to_vector(lat, lon):
+    """Converts latitude and longitude in degrees to a point on the unit
+    sphere, where euclidean distance grows with great-circle distance.
+
+    :param lat: float
+    :param lon: float
+    :return: tuple of 3 floats
+    """
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon),
+            math.sin(lat))
+
+
+def chord_to_km(squared_chord):
+    """Converts a squared chord length on the unit sphere to kilometres
+    along the earth's surface.
+
+    :param squared_chord: float
+    :return: float
+    """
+    return 2 * EARTH_RADIUS * math.asin(min(1.0,
+                                            math.sqrt(squared_chord) / 2))
+
+
+class KDTree:
+    """Static 3-d tree over unit-sphere vectors.
+
+    Nodes are kept in flat lists, the tree itself never changes after it's
+    built; build a new one to update it.
+
+    :param vectors: list of 3-float tuples
+    """
+
+    def __init__(self, vectors):
+        self.vectors = list(vectors)
+        self._index = []
+        self._left = []
+        self._right = []
+        self.root = self._build(list(range(len(self.vectors))), 0)
+
+    def _build(self, indices, depth):
+        if not indices:
+            return -1
+        axis = depth % 3
+        indices.sort(key=lambda i: self.vectors[i][axis])
+        middle = len(indices) // 2
+        node = len(self._index)
+        self._index.append(indices[middle])
+        self._left.append(-1)
+        self._right.append(-1)
+        self._left[node] = self._build(indices[:middle], depth + 1)
+        self._right[node] = self._build(indices[middle + 1:], depth + 1)
+        return node
+
+    def query(self, vector, k=1):
+        """Returns the k nearest vectors as (squared distance, index) pairs,
+        nearest first.
+
+        :param vector: 3-float tuple
+        :param k: int
+        :return: list of tuples
+        """
+        if k < 1:
+            return []
+        heap = []  # max-heap of (-squared distance, index)
+        # Entries carry a lower bound of the squared distance to their
+        # subtree, checked against the k-th best when they're popped.
+        stack = [(self.root, 0, 0.0)]
+        while stack:
+            node, depth, bound = stack.pop()
+            if node == -1 or len(heap) == k and bound >= -heap[0][0]:
+                continue
+            index = self._index[node]
+            point = self.vectors[index]
+            distance = ((point[0] - vector[0]) ** 2 +
+                        (point[1] - vector[1]) ** 2 +
+                        (point[2] - vector[2]) ** 2)
+            if len(heap) < k:
+                heapq.heappush(heap, (-distance, index))
+            elif distance < -heap[0][0]:
+                heapq.heapreplace(heap, (-distance, index))
+            axis = depth % 3
+            offset = vector[axis] - point[axis]
+            near, far = ((self._left[node], self._right[node]) if offset < 0
+                         else (self._right[node], self._left[node]))
+            stack.append((far, depth + 1, max(bound, offset * offset)))
+            stack.append((near, depth + 1, bound))
+        return sorted((-d, i) for d, i in heap)
+
+
+class CenterIndex:
+    """Local index answering nearest travel center queries in memory.
+
+    Loads the full list of centers once from the Reisezentren API and
+    indexes them in a k-d tree on the unit sphere. Batch queries are
+    vectorized with numpy if it's installed. Once the index is older than
+    `ttl`, the next query starts a reload in a background thread and keeps
+    answering from the old index until the new one is swapped in. A failed
+    reload is retried after `retry_after` seconds, doubling with each
+    further failure up to the larger of `ttl` and `retry_after`.
+
+    :param api: choochoo.Reisezentren
+    :param ttl: float, seconds until the centers are reloaded
+    :param retry_after: float, seconds until a failed reload is retried
+    """
+
+    def __init__(self, api, ttl=24 * 3600, retry_after=60):
+        self.api = api
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.loaded = None
+        self.error = None
+        self.failures = 0
+        self._retry_at = None
+        self._state = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _coordinates(center):
+        try:
+            return float(center['lat']), float(center['lon'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _build(self, centers):
+        centers = [c for c in centers if self._coordinates(c) is not None]
+        vectors = [to_vector(*self._coordinates(c)) for c in centers]
+        array = numpy.array(vectors, dtype=float).reshape(-1, 3) if numpy \
+            else None
+        return centers, KDTree(vectors), array
+
+    def refresh(self):
+        """Reloads all centers from the API and rebuilds the index."""
+        state = self._build(self.api.request('reisezentren'))
+        with self._lock:
+            self._state = state
+            self.loaded = time.monotonic()
+            self.error = None
+            self.failures = 0
+            self._retry_at = None
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            # Keep serving the old index and back off, so that queries
+            # during an outage don't each start another request.
+            with self._lock:
+                self.error = e
+                self.failures += 1
+                self._retry_at = time.monotonic() + min(
+                    self.retry_after * 2 ** (self.failures - 1),
+                    max(self.ttl, self.retry_after))
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _current(self):
+        if self._state is None:
+            self.refresh()
+        elif time.monotonic() - self.loaded >= self.ttl:
+            with self._lock:
+                start = not self._refreshing and (
+                    self._retry_at is None or
+                    time.monotonic() >= self._retry_at)
+                self._refreshing = self._refreshing or start
+            if start:
+                threading.Thread(target=self._refresh_in_background,
+                                 daemon=True).start()
+        return self._state
+
+    @property
+    def centers(self):
+        """All indexed centers, in the order query() indices refer to.
+
+        :return: list of dict
+        """
+        return self._current()[0]
+
+    def k_nearest(self, lat, lon, k=1):
+        """Returns the k centers nearest to the given coordinates.
+
+        :param lat: float
+        :param lon: float
+        :param k: int
+        :return: list of (center, distance in km) tuples, nearest first
+        """
+        centers, tree, _ = self._current()
+        return [(centers[i], chord_to_km(d))
+                for d, i in tree.query(to_vector(lat, lon), k)]
+
+    def nearest(self, lat, lon):
+        """Returns the center nearest to the given coordinates.
+
+        :param lat: float
+        :param lon: float
+        :return: (center, distance in km) tuple, or None if no centers
+            are known
+        """
+        found = self.k_nearest(lat, lon, 1)
+        return found[0] if found else None
+
+    def query(self, coords, k=1, block=4096):
+        """Finds the k nearest centers of many coordinates at once.
+
+        With numpy, coordinates are processed in blocks of `block` rows
+        as a single matrix product against all centers each.
+
+        :param coords: sequence or (n, 2) array of latitude, longitude
+        :param k: int
+        :param block: int, rows per vectorized block
+        :return: (distances, indices) of shape (n, k), distances in km,
+            indices into `centers`; numpy arrays if numpy is installed,
+            lists of lists otherwise
+        """
+        centers, tree, array = self._current()
+        k = min(k, len(centers))
+        if numpy is None:
+            distances, indices = [], []
+            for lat, lon in coords:
+                found = tree.query(to_vector(lat, lon), k)
+                distances.append([chord_to_km(d) for d, _ in found])
+                indices.append([i for _, i in found])
+            return distances, indices
+
+        coords = numpy.radians(numpy.asarray(coords, dtype=float)
+                               .reshape(-1, 2))
+        distances = numpy.empty((len(coords), k))
+        indices = numpy.empty((len(coords), k), dtype=numpy.intp)
+        if not k:
+            return distances, indices
+        for start in range(0, len(coords), block):
+            lat, lon = coords[start:start + block].T
+            points = numpy.column_stack((numpy.cos(lat) * numpy.cos(lon),
+                                         numpy.cos(lat) * numpy.sin(lon),
+                                         numpy.sin(lat)))
+            # On the unit sphere, the nearest vectors have the largest
+            # dot products.
+            dots = points @ array.T
+            if k < len(centers):
+                nearest = numpy.argpartition(-dots, k - 1, axis=1)[:, :k]
+            else:
+                nearest = numpy.broadcast_to(numpy.arange(k), dots.shape)
+            chosen = numpy.take_along_axis(dots, nearest, axis=1)
+            order = numpy.argsort(-chosen, axis=1)
+            nearest = numpy.take_along_axis(nearest, order, axis=1)
+            chosen = numpy.clip(numpy.take_along_axis(chosen, order, axis=1),
+                                -1, 1)
+            end = start + len(points)
+            indices[start:end] = nearest
+            distances[start:end] = EARTH_RADIUS * numpy.arccos(chosen)
+        return distances, indices
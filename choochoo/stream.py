@@ -0,0 +1,168 @@
+"""Incremental decoding of large JSON arrays."""
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+
+
+class ItemParser:
+    """Push parser yielding the items of a JSON array as data arrives.
+
+    The array is either the document itself or, if the document is an
+    object, the value stored under `key` in it. Only the current item is
+    held in memory, so memory use stays flat no matter how long the array
+    is. Anything after the array's closing bracket is ignored.
+
+    :param key: str, key of the array if the document is an object
+    """
+
+    def __init__(self, key=None):
+        self.key = key
+        self.done = False
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._state = 'start'
+        # Scanner state while looking for `key` in an object.
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._awaiting_value = False
+
+    def feed(self, data):
+        """Parses the next chunk of the document.
+
+        :param data: bytes
+        :return: list of the items completed by this chunk
+        """
+        self._buf += self._text.decode(data)
+        return list(self._parse(final=False))
+
+    def close(self):
+        """Signals the end of the document.
+
+        :return: list of the remaining items
+        :raises: ValueError if the array is incomplete or malformed
+        """
+        self._buf += self._text.decode(b'', final=True)
+        items = list(self._parse(final=True))
+        if not self.done:
+            raise ValueError("JSON document ended before its array did!")
+        return items
+
+    def _parse(self, final):
+        if self._state == 'start':
+            self._skip_whitespace()
+            if self._pos == len(self._buf):
+                return
+            char = self._buf[self._pos]
+            if char == '[':
+                self._state = 'items'
+                self._pos += 1
+            elif char == '{' and self.key is not None:
+                self._state = 'object'
+            else:
+                raise ValueError("Expected a JSON array or an object with "
+                                 "key %r!" % self.key)
+        if self._state == 'object':
+            self._find_key()
+        if self._state == 'items':
+            yield from self._items(final)
+
+    def _skip_whitespace(self):
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+
+    def _find_key(self):
+        buf, pos = self._buf, self._pos
+        while pos < len(buf):
+            char = buf[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = json.loads(
+                            buf[self._string_start:pos + 1])
+            elif self._awaiting_value and char not in _WHITESPACE:
+                if char != '[':
+                    raise ValueError("Value of key %r isn't an array!"
+                                     % self.key)
+                self._state = 'items'
+                self._pos = pos + 1
+                return
+            elif char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    raise ValueError("Key %r not found in JSON object!"
+                                     % self.key)
+            elif char == ':' and self._depth == 1:
+                self._awaiting_value = self._last_string == self.key
+            pos += 1
+        self._pos = pos
+
+    def _items(self, final):
+        buf = self._buf
+        while True:
+            pos = self._pos
+            while pos < len(buf) and (buf[pos] in _WHITESPACE or
+                                      buf[pos] == ','):
+                pos += 1
+            self._pos = pos
+            if pos == len(buf):
+                break
+            if buf[pos] == ']':
+                self._state = 'done'
+                self.done = True
+                self._buf, self._pos = '', 0
+                return
+            try:
+                item, end = self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            # An item must be followed by a delimiter; a number ending at
+            # the end of the buffer may still continue in the next chunk.
+            if end == len(buf) or buf[end] not in _DELIMITERS:
+                if not final:
+                    break
+                if end < len(buf):
+                    raise ValueError("Malformed JSON array at char %d!"
+                                     % end)
+            self._pos = end
+            yield item
+        if self._pos > 65536:
+            self._buf = buf[self._pos:]
+            self._pos = 0
+
+
+def iter_items(chunks, key=None):
+    """Yields the items of a JSON array from an iterable of byte chunks.
+
+    Stops reading as soon as the array is complete.
+
+    :param chunks: iterable of bytes
+    :param key: str, key of the array if the document is an object
+    :return: generator
+    """
+    parser = ItemParser(key)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
+    yield from parser.close()
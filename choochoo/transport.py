@@ -0,0 +1,88 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Transport:
+    """Pooled keep-alive HTTP transport used by Interface.request().
+
+    Wraps a requests.Session whose adapter keeps up to `pool_maxsize`
+    connections per host open between calls, so consecutive requests skip
+    the TCP and TLS handshakes. Pass the same instance to several wrappers
+    (e.g. a Fahrplan and a FaSta using the same token) to share one pool.
+
+    :param pool_connections: int, number of per-host pools to keep
+    :param pool_maxsize: int, max. connections kept alive per host
+    :param pool_block: bool, block instead of opening extra connections
+        when a host's pool is exhausted
+    :param keep_alive: bool, if False, connections are closed after
+        each response
+    :param timeout: float or tuple, default timeout passed to requests
+
+    Pooled connections aren't shared with forked child processes; a
+    child opens its own on first use.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, timeout=None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.session = self._new_session()
+
+    def _new_session(self):
+        self._pid = os.getpid()
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def request(self, verb, url, **req_kwargs):
+        """Sends a request over the pooled session.
+
+        :param verb: str
+        :param url: str
+        :param req_kwargs: kwargs accepted by requests.Session.request()
+        :return: requests.Response()
+        """
+        if self._pid != os.getpid():
+            self.session = self._new_session()
+        if self.timeout is not None:
+            req_kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(verb, url, **req_kwargs)
+
+    def close(self):
+        """Closes all pooled connections."""
+        self.session.close()
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def default_transport():
+    """Returns the process-wide Transport shared by all wrappers that
+    weren't given one explicitly.
+
+    :return: Transport
+    """
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+        return _default_transport
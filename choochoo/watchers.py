@@ -0,0 +1,254 @@
+"""Change-only watchers over polled API snapshots."""
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+from .bulk import fan_out
+
+Change = namedtuple('Change', ('key', 'old', 'new', 'data'))
+Change.__doc__ = """A changed item of a polled snapshot.
+
+`old` and `new` are the item's compared state before and after the poll;
+`old` is None for new items, `new` is None for removed ones. `data` is the
+item as last returned by the API.
+"""
+
+Transition = namedtuple('Transition', ('cursor', 'equipment', 'old', 'new',
+                                       'timestamp', 'facility'))
+Transition.__doc__ = """A state change of a FaSta facility.
+
+`cursor` numbers transitions in the order they were seen, `timestamp` is
+the time of the poll that saw it (seconds since the epoch). `old` is None
+for facilities that newly appeared, `new` None for removed ones.
+"""
+
+
+class _Watcher:
+    """Base of watchers; runs poll() repeatedly, every self.interval."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def poll(self):
+        raise NotImplementedError
+
+    def watch(self):
+        """Polls until stop() is called, yielding each change.
+
+        Errors raised by a poll propagate to the caller.
+
+        :return: generator
+        """
+        try:
+            while not self._stop.is_set():
+                yield from self.poll()
+                self._stop.wait(self.interval)
+        finally:
+            self._stop.clear()
+
+    def stop(self):
+        """Ends a running watch() after its current poll."""
+        self._stop.set()
+
+
+class OccupancyWatcher(_Watcher):
+    """Polls BahnPark occupancies and yields only the spaces that changed.
+
+    The last snapshot is kept as a mapping of space ID to a small tuple of
+    the compared fields, so each poll costs one pass over the response and
+    downstream work scales with the number of changes. The poll interval
+    adapts: it halves after a poll with changes and grows by half after a
+    poll without, staying between min_interval and max_interval.
+
+    :param api: choochoo.BahnPark
+    :param interval: float, initial seconds between polls
+    :param min_interval: float
+    :param max_interval: float
+    :param prognoses: bool, also fetch and compare every known space's
+        prognoses on each poll, one request per space
+    :param workers: int, max. concurrent prognoses requests
+    """
+
+    def __init__(self, api, interval=60, min_interval=30, max_interval=600,
+                 prognoses=False, workers=8):
+        super(OccupancyWatcher, self).__init__(interval)
+        self.api = api
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.prognoses = prognoses
+        self.workers = workers
+        self.polls = 0
+        self.snapshot = {}
+
+    @staticmethod
+    def _allocations(data):
+        if isinstance(data, dict):
+            data = data.get('allocations', data.get('items', []))
+        for item in data:
+            space = item.get('space') or {}
+            space_id = space.get('id', item.get('id'))
+            if space_id is not None:
+                yield space_id, item
+
+    @staticmethod
+    def _state(item):
+        allocation = item.get('allocation') or {}
+        return (allocation.get('category'), allocation.get('text'),
+                allocation.get('validData'))
+
+    @staticmethod
+    def _prognoses_state(data):
+        if isinstance(data, dict):
+            data = data.get('prognoses', data.get('items', []))
+        return tuple((p.get('timeSegment'), p.get('category'),
+                      p.get('text')) for p in data or ())
+
+    def poll(self):
+        """Fetches occupancies once and returns what changed since the
+        previous poll. The first poll reports every space as new.
+
+        :return: list of Change
+        """
+        current = {}
+        data = {}
+        for space_id, item in self._allocations(self.api.occupancies()):
+            current[space_id] = (self._state(item),)
+            data[space_id] = item
+
+        if self.prognoses:
+            results = fan_out(
+                lambda space_id: self.api.occupancies(by_id=str(space_id),
+                                                      prognoses=True),
+                list(current), workers=self.workers)
+            for result in results:
+                previous = self.snapshot.get(result.key)
+                if result.error is not None:
+                    # Keep the last known prognoses of failed spaces.
+                    prognoses = previous[1] if previous and len(
+                        previous) > 1 else ()
+                else:
+                    prognoses = self._prognoses_state(result.value)
+                current[result.key] += (prognoses,)
+
+        changes = [Change(space_id, self.snapshot.get(space_id), state,
+                          data[space_id])
+                   for space_id, state in current.items()
+                   if self.snapshot.get(space_id) != state]
+        changes.extend(Change(space_id, state, None, None)
+                       for space_id, state in self.snapshot.items()
+                       if space_id not in current)
+        self.snapshot = current
+        self.polls += 1
+        self._adapt(bool(changes))
+        return changes
+
+    def _adapt(self, changed):
+        if changed:
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(self.max_interval, self.interval * 1.5)
+
+
+class FacilityFeed(_Watcher):
+    """Feed of FaSta elevator and escalator state transitions.
+
+    Polls the bulk facilities endpoint, keeps the last known state per
+    equipment number and emits a Transition whenever it changes, e.g.
+    from ACTIVE to INACTIVE. The first poll only records the initial
+    states. The last `history` transitions are kept, so consumers can
+    resume from the cursor of the last transition they processed with
+    events_since(); save() and restore() carry the feed over restarts.
+
+    :param api: choochoo.FaSta
+    :param types: iterable of facility types to follow
+    :param history: int, number of transitions kept
+    :param interval: float, seconds between polls in watch()
+    """
+
+    def __init__(self, api, types=('ELEVATOR', 'ESCALATOR'), history=10000,
+                 interval=60):
+        super(FacilityFeed, self).__init__(interval)
+        self.api = api
+        self.types = tuple(types)
+        self.cursor = 0
+        self.states = {}
+        self.history = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """Fetches all facilities once and returns the new transitions.
+
+        :return: list of Transition
+        """
+        facilities = self.api.facilities(type=','.join(self.types))
+        now = time.time()
+        current = {}
+        for facility in facilities:
+            number = facility.get('equipmentnumber')
+            if number is not None:
+                current[number] = facility
+
+        with self._lock:
+            changes = []
+            if self.states or self.cursor:
+                changes = [(number, self.states.get(number),
+                            facility.get('state'), facility)
+                           for number, facility in current.items()
+                           if self.states.get(number) != facility.get('state')]
+                changes.extend((number, state, None, None)
+                               for number, state in self.states.items()
+                               if number not in current)
+            transitions = []
+            for number, old, new, facility in changes:
+                self.cursor += 1
+                transitions.append(Transition(self.cursor, number, old, new,
+                                              now, facility))
+            self.history.extend(transitions)
+            self.states = {number: facility.get('state')
+                           for number, facility in current.items()}
+        return transitions
+
+    def events_since(self, cursor=0):
+        """Returns the kept transitions with a cursor greater than cursor.
+
+        :param cursor: int, cursor of the last transition processed
+        :return: list of Transition
+        :raises: ValueError if transitions after cursor were already
+            dropped from the history
+        """
+        with self._lock:
+            oldest = self.history[0].cursor if self.history else None
+            if oldest is not None and cursor + 1 < oldest:
+                raise ValueError("Transitions after cursor %d are no longer "
+                                 "in the feed's history!" % cursor)
+            return [t for t in self.history if t.cursor > cursor]
+
+    def save(self, path):
+        """Writes states, cursor and history to a JSON file atomically.
+
+        :param path: str
+        """
+        with self._lock:
+            state = {'cursor': self.cursor,
+                     'states': list(self.states.items()),
+                     'history': [list(t) for t in self.history]}
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    def restore(self, path):
+        """Loads states, cursor and history written by save().
+
+        :param path: str
+        """
+        with open(path) as f:
+            state = json.load(f)
+        with self._lock:
+            self.cursor = state['cursor']
+            self.states = dict((number, s) for number, s in state['states'])
+            self.history.clear()
+            self.history.extend(Transition(*t) for t in state['history'])
@@ -1,4 +1,4 @@
-from distutils.core import setup
+from setuptools import setup
 
 
 setup(name='ChooChoo', version='1.0.0', author='Nils Diefenbach',
@@ -6,6 +6,8 @@ setup(name='ChooChoo', version='1.0.0', author='Nils Diefenbach',
       url="https://github.com/nlsdfnbch/choochoo.git",
       packages=['choochoo'],
       install_requires=['requests'],
+      extras_require={'async': ['aiohttp'], 'numpy': ['numpy'],
+                      'orjson': ['orjson']},
       description="Python3-based API Wrapper for Deutsche Bahn's OpenData APIs",
       license='MIT',  classifiers=['Development Status :: 4 - Beta',
                                    'Intended Audience :: Developers'],
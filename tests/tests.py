@@ -1,7 +1,35 @@
+import asyncio
+import json
 import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
 from unittest import TestCase
 from choochoo import Fahrplan, BahnPark, Cargo, FaSta, Flinkster, Reisezentren, Betriebsstellen
-from requests import HTTPError
+from choochoo.transport import Transport
+from choochoo.bulk import fan_out
+from choochoo.cache import HTTPCache, TTLCache
+from choochoo.ratelimit import RateLimiter, TokenBucket
+from choochoo.retry import RetryPolicy
+from choochoo.stream import iter_items
+from choochoo.decoders import available, get_decoder
+from choochoo.records import BoardEntry, to_board
+from choochoo.journeys import JourneyResolver
+from choochoo.watchers import FacilityFeed, OccupancyWatcher
+from choochoo.spatial import CenterIndex
+from choochoo.index import BetriebsstellenIndex
+from choochoo.search import LocationSearch
+from choochoo.metrics import Metrics
+from choochoo.registry import StationRegistry
+from choochoo.cargo import snap
+from choochoo.paging import paginate
+from choochoo.recorder import OccupancyRecorder
+from choochoo.prognoses import to_matrix
+from choochoo.bulk import Result
+from choochoo.aio import AsyncClient, AsyncBahnPark, AsyncBetriebsstellen, AsyncCargo, AsyncFahrplan, AsyncFaSta, AsyncFlinkster
+from requests import ConnectionError, HTTPError, Response
 from datetime import datetime
 from urllib.parse import quote
 
@@ -433,4 +461,1251 @@ class ReisezentrenTests(TestCase):
             self.api.reisezentren(center_id, center_name)
 
         with self.assertRaises(ValueError):
-            self.api.reisezentren(center_id, center_name, lat_lon)
\ No newline at end of file
+            self.api.reisezentren(center_id, center_name, lat_lon)
+
+
+class TransportTests(TestCase):
+    def test_wrappers_share_default_transport(self):
+        fahrplan = Fahrplan(config='config.ini')
+        fasta = FaSta(config='config.ini')
+        self.assertIs(fahrplan.transport, fasta.transport)
+
+    def test_explicit_transport_is_shared_and_reused(self):
+        transport = Transport(pool_maxsize=4)
+        fahrplan = Fahrplan(config='config.ini', transport=transport)
+        fasta = FaSta(config='config.ini', transport=transport)
+        self.assertIs(fahrplan.transport, transport)
+        self.assertIs(fasta.transport, transport)
+        try:
+            fahrplan.location('BERLIN')
+            fasta.disrupted_elevators()
+        except HTTPError as e:
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))
+        transport.close()
+
+
+class AsyncTests(TestCase):
+    def test_async_wrappers_return_decoded_json(self):
+        async def fetch():
+            async with AsyncClient(max_concurrency=2) as client:
+                fahrplan = AsyncFahrplan(config='config.ini', client=client)
+                fasta = AsyncFaSta(config='config.ini', client=client)
+                return await asyncio.gather(fahrplan.departures('8011160'),
+                                            fasta.disrupted_elevators())
+        departures, elevators = asyncio.run(fetch())
+        self.assertIsInstance(departures, (list, dict))
+        self.assertIsInstance(elevators, (list, dict))
+
+    def test_async_wrappers_validate_before_awaiting(self):
+        api = AsyncBahnPark(config='config.ini', client=AsyncClient())
+        with self.assertRaises(ValueError):
+            api.occupancies(prognoses=True)
+
+    def test_client_closes_session_of_previous_loop(self):
+        client = AsyncClient()
+        idle_loop = asyncio.new_event_loop()
+        try:
+            first = idle_loop.run_until_complete(client._bind())
+            second = asyncio.run(client._bind())
+        finally:
+            idle_loop.close()
+        third = asyncio.run(client._bind())
+        self.assertTrue(first.closed)
+        self.assertTrue(second.closed)
+        self.assertFalse(third.closed)
+        asyncio.run(client.close())
+
+
+class BulkTests(TestCase):
+    def test_fan_out_reports_failures_per_key(self):
+        def halve(n):
+            if n % 2:
+                raise ValueError(n)
+            return n // 2
+
+        results = {r.key: r for r in fan_out(halve, range(10), workers=3)}
+        self.assertEqual(sorted(results), list(range(10)))
+        self.assertEqual(results[4].value, 2)
+        self.assertIsNone(results[4].error)
+        self.assertIsInstance(results[3].error, ValueError)
+
+    def test_bulk_departures_tags_boards_with_keys(self):
+        api = Fahrplan(config='config.ini')
+        date = datetime.today().strftime('%Y-%m-%d')
+        keys = [('8011160', date), ('8000105', date)]
+        results = list(api.bulk_departures(keys, workers=2))
+        self.assertEqual(sorted(r.key for r in results), sorted(keys))
+        for result in results:
+            if result.error:
+                self.fail('Board %s failed: %r' % (result.key, result.error))
+            self.assertIsInstance(result.value, (list, dict))
+
+
+class TTLCacheTests(TestCase):
+    def test_cache_evicts_least_recently_used_entry(self):
+        cache = TTLCache(maxsize=2)
+        cache.get_or_load('a', 60, lambda: 1)
+        cache.get_or_load('b', 60, lambda: 2)
+        cache.get_or_load('a', 60, lambda: None)
+        cache.get_or_load('c', 60, lambda: 3)
+        self.assertEqual(cache.get_or_load('a', 60, lambda: None), 1)
+        self.assertEqual(cache.get_or_load('b', 60, lambda: 4), 4)
+        self.assertEqual(cache.evictions, 2)
+
+    def test_cache_expires_entries_after_ttl(self):
+        cache = TTLCache()
+        cache.get_or_load('a', 0, lambda: 1)
+        self.assertEqual(cache.get_or_load('a', 60, lambda: 2), 2)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_cache_collapses_concurrent_misses(self):
+        cache = TTLCache()
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = fan_out(lambda key: cache.get_or_load(key, 60, load),
+                          ['a'] * 10, workers=10)
+        self.assertEqual([r.value for r in results], ['value'] * 10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.coalesced, 9)
+
+    def test_wrapper_caches_configured_endpoints_only(self):
+        api = Betriebsstellen(config='config.ini', cache=TTLCache())
+        self.assertEqual(api.cache_ttl('betriebsstellen/AAG'), 24 * 3600)
+        self.assertIsNone(BahnPark(config='config.ini').cache_ttl(
+            'spaces/100035/occupancies'))
+        first = api.betriebsstellen('AAG', is_abbreviation=True)
+        second = api.betriebsstellen('AAG', is_abbreviation=True)
+        self.assertEqual(first, second)
+        self.assertEqual(api.cache.hits, 1)
+
+
+class AsyncTTLCacheTests(TestCase):
+    class CountingClient:
+        def __init__(self):
+            self.urls = []
+
+        async def request(self, verb, url, **req_kwargs):
+            self.urls.append(url)
+            await asyncio.sleep(0.05)
+            return b'{"abbrev": "AAG"}'
+
+    def test_async_wrapper_hits_cache_and_collapses_misses(self):
+        client = self.CountingClient()
+        api = AsyncBetriebsstellen(token='x', client=client, cache=TTLCache())
+
+        async def fetch():
+            first = await asyncio.gather(*(api.betriebsstellen(
+                'AAG', is_abbreviation=True) for _ in range(5)))
+            return first, await api.betriebsstellen('AAG',
+                                                    is_abbreviation=True)
+
+        first, second = asyncio.run(fetch())
+        self.assertEqual(first, [{'abbrev': 'AAG'}] * 5)
+        self.assertEqual(second, {'abbrev': 'AAG'})
+        self.assertEqual(len(client.urls), 1)
+        self.assertEqual(api.cache.coalesced, 4)
+        self.assertEqual(api.cache.hits, 1)
+
+    def test_failed_loads_are_not_cached(self):
+        cache = TTLCache()
+
+        async def fail():
+            raise ValueError('down')
+
+        async def load():
+            return 'value'
+
+        async def run():
+            with self.assertRaises(ValueError):
+                await cache.get_or_load_async('a', 60, fail)
+            return await cache.get_or_load_async('a', 60, load)
+
+        self.assertEqual(asyncio.run(run()), 'value')
+        self.assertEqual(cache.misses, 2)
+
+    def test_unsupported_arguments_are_rejected(self):
+        self.assertRaises(TypeError, AsyncFaSta, token='x', client=object(),
+                          retry=RetryPolicy())
+        self.assertRaises(TypeError, AsyncFaSta, token='x', client=object(),
+                          http_cache=object())
+
+
+class HTTPCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'responses.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cache_keys_depend_on_url_params_and_token(self):
+        key = HTTPCache.key('https://a/spaces', {'limit': 10}, 'token')
+        self.assertEqual(key, HTTPCache.key('https://a/spaces',
+                                            {'limit': '10'}, 'token'))
+        self.assertNotEqual(key, HTTPCache.key('https://a/spaces',
+                                               {'limit': 10}, 'other'))
+        self.assertNotEqual(key, HTTPCache.key('https://a/spaces', None,
+                                               'token'))
+
+    def test_cached_responses_are_shared_between_instances(self):
+        first = BahnPark(config='config.ini', http_cache=HTTPCache(self.path))
+        second = BahnPark(config='config.ini',
+                          http_cache=HTTPCache(self.path))
+        try:
+            self.assertEqual(first.spaces(), second.spaces())
+        except HTTPError as e:
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))
+
+
+class RateLimiterTests(TestCase):
+    def test_bucket_allows_burst_then_paces_requests(self):
+        bucket = TokenBucket(rate=10, capacity=3)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+        self.assertLess(bucket.level(), 0)
+
+    def test_limiter_keeps_one_bucket_per_token(self):
+        limiter = RateLimiter(60, per=60, capacity=1)
+        self.assertEqual(limiter.reserve('a'), 0)
+        self.assertEqual(limiter.reserve('b'), 0)
+        self.assertGreater(limiter.reserve('a'), 0)
+        self.assertEqual(len(limiter.levels()), 2)
+
+    def test_default_burst_is_one_seconds_worth(self):
+        per_minute = RateLimiter(100, per=60)
+        self.assertAlmostEqual(per_minute.capacity, 100 / 60)
+        self.assertEqual(per_minute.reserve('a'), 0)
+        self.assertAlmostEqual(per_minute.reserve('a'), 0.2, places=2)
+        self.assertAlmostEqual(per_minute.reserve('a'), 0.8, places=2)
+        self.assertEqual(RateLimiter(1, per=60).capacity, 1)
+        self.assertEqual(RateLimiter(10).capacity, 10)
+
+    def test_file_buckets_share_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = RateLimiter(1, per=60, directory=directory)
+            second = RateLimiter(1, per=60, directory=directory)
+            self.assertEqual(first.reserve('token'), 0)
+            self.assertGreater(second.reserve('token'), 0)
+
+    def test_wrappers_wait_for_shared_limiter(self):
+        limiter = RateLimiter(2, per=1, capacity=1)
+        fahrplan = Fahrplan(config='config.ini', rate_limiter=limiter)
+        fasta = FaSta(config='config.ini', rate_limiter=limiter)
+        start = time.monotonic()
+        try:
+            fahrplan.location('BERLIN')
+            fasta.disrupted_elevators()
+            fahrplan.location('BONN')
+        except HTTPError as e:
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))
+        self.assertGreaterEqual(time.monotonic() - start, 0.9)
+
+
+class RetryPolicyTests(TestCase):
+    @staticmethod
+    def response(status, **headers):
+        resp = Response()
+        resp.status_code = status
+        resp.headers.update(headers)
+        return resp
+
+    def test_retry_after_header_is_respected(self):
+        policy = RetryPolicy()
+        self.assertEqual(policy.delay(0, self.response(429, **{'Retry-After': '7'})), 7)
+        self.assertEqual(policy.retry_after(self.response(503, **{
+            'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})), 0)
+        self.assertEqual(policy.delay(0, self.response(503, **{
+            'Retry-After': '86400'})), policy.max_backoff)
+
+    def test_backoff_grows_exponentially_up_to_max(self):
+        policy = RetryPolicy(backoff=1, max_backoff=5, jitter=False)
+        self.assertEqual([policy.delay(n) for n in range(4)], [1, 2, 4, 5])
+        policy.jitter = True
+        self.assertTrue(all(0 <= policy.delay(2) <= 4 for _ in range(20)))
+
+    def test_retryable_failures_are_retried_and_counted(self):
+        policy = RetryPolicy(attempts=3, backoff=0)
+        answers = [ConnectionError(), self.response(502), self.response(200)]
+
+        def send(remaining):
+            answer = answers.pop(0)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        self.assertEqual(policy.call(send).status_code, 200)
+        self.assertEqual(policy.stats()['retries'], 2)
+
+    def test_policy_gives_up_after_attempts_or_deadline(self):
+        policy = RetryPolicy(attempts=2, backoff=0)
+        self.assertEqual(policy.call(lambda _: self.response(503)).status_code, 503)
+        policy = RetryPolicy(attempts=10, backoff=1, jitter=False, deadline=0.5)
+        self.assertEqual(policy.call(lambda _: self.response(503)).status_code, 503)
+        self.assertEqual(policy.stats(), {'retries': 0, 'gave_up': 1,
+                                          'waited': 0.0, 'wasted': 0.0})
+
+        def refuse(remaining):
+            raise ConnectionError()
+
+        with self.assertRaises(ConnectionError):
+            RetryPolicy(attempts=1).call(refuse)
+
+
+class StreamTests(TestCase):
+    @staticmethod
+    def chunked(doc, size):
+        raw = json.dumps(doc, ensure_ascii=False).encode()
+        return (raw[i:i + size] for i in range(0, len(raw), size))
+
+    def test_items_are_decoded_across_chunk_boundaries(self):
+        doc = [1, -15.5e2, 'ä€"]', {'a': [1, {'b': None}]}, True, []]
+        for size in (1, 2, 5, 1024):
+            self.assertEqual(list(iter_items(self.chunked(doc, size))), doc)
+
+    def test_array_is_found_under_key_of_object(self):
+        doc = {'count': 2, 'meta': {'items': [0]}, 'name': 'items',
+               'items': [{'id': 1}, {'id': 2}], 'after': [3]}
+        for size in (1, 3, 1024):
+            self.assertEqual(list(iter_items(self.chunked(doc, size),
+                                             key='items')), doc['items'])
+
+    def test_incomplete_or_unexpected_documents_raise_value_error(self):
+        for raw, key in ((b'[1, 2', None), (b'{"a": 1}', 'items'),
+                         (b'{"items": {}}', 'items'), (b'[1x]', None)):
+            with self.assertRaises(ValueError):
+                list(iter_items([raw], key=key))
+
+    def test_stream_spaces_yields_same_items_as_spaces(self):
+        api = BahnPark(config='config.ini')
+        try:
+            spaces = api.spaces()
+            streamed = list(api.stream_spaces())
+        except HTTPError as e:
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))
+        if isinstance(spaces, dict):
+            spaces = spaces['items']
+        self.assertEqual(spaces, streamed)
+
+
+class DecoderTests(TestCase):
+    def test_every_available_backend_decodes_json(self):
+        raw = json.dumps({'items': [1, 'ä', None]}).encode()
+        for name in available():
+            expected = raw if name == 'raw' else json.loads(raw)
+            self.assertEqual(get_decoder(name)(raw), expected)
+
+    def test_unknown_backend_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            get_decoder('yaml')
+
+    def test_raw_decoder_passes_response_body_through(self):
+        api = FaSta(config='config.ini', decoder='raw')
+        try:
+            body = api.disrupted_elevators()
+        except HTTPError as e:
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))
+        self.assertIsInstance(body, bytes)
+        self.assertIsInstance(json.loads(body), (list, dict))
+
+
+class RecordTests(TestCase):
+    entry = {'name': 'ICE 1001', 'type': 'ICE', 'boardId': 8011160,
+             'stopId': 8011160, 'stopName': 'Berlin Hbf',
+             'dateTime': '2017-05-24T12:34', 'track': '7',
+             'detailsId': '123%2F456'}
+
+    def test_entries_round_trip_and_parse_times(self):
+        record = BoardEntry.from_dict(self.entry)
+        self.assertEqual(record.date_time, datetime(2017, 5, 24, 12, 34))
+        self.assertEqual(record.stop_name, 'Berlin Hbf')
+        self.assertEqual(record.as_dict(), self.entry)
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_repeated_values_are_shared_between_entries(self):
+        first, second = to_board(json.loads(json.dumps([self.entry] * 2)))
+        self.assertEqual(first, second)
+        self.assertIs(first.stop_name, second.stop_name)
+        self.assertIs(first.date_time, second.date_time)
+
+    def test_typed_departures_return_board_entries(self):
+        api = Fahrplan(config='config.ini')
+        try:
+            board = api.departures('8011160', typed=True)
+        except HTTPError as e:
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))
+        self.assertTrue(all(isinstance(e, BoardEntry) for e in board))
+
+
+class JourneyResolverTests(TestCase):
+    class CountingFahrplan:
+        def __init__(self):
+            self.calls = []
+
+        def journey_details(self, journey_id):
+            self.calls.append(journey_id)
+            return [{'stopName': 'Stop of %s' % journey_id}]
+
+    def test_each_journey_is_fetched_once(self):
+        api = self.CountingFahrplan()
+        resolver = JourneyResolver(api, workers=2)
+        first = [{'detailsId': 'a'}, {'detailsId': 'b'}]
+        second = to_board([{'detailsId': 'b'}, {'detailsId': 'c'}])
+        first, second = resolver.resolve([first, second])
+        self.assertEqual(sorted(api.calls), ['a', 'b', 'c'])
+        self.assertEqual(first[1]['stops'], second[0].stops)
+        resolver.resolve_board([{'detailsId': 'a'}])
+        self.assertEqual(len(api.calls), 3)
+        self.assertEqual(resolver.reused, 1)
+
+    def test_departures_are_enriched_with_stops(self):
+        api = Fahrplan(config='config.ini')
+        try:
+            board = JourneyResolver(api).resolve_board(api.departures('8011160'))
+        except HTTPError as e:
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))
+        self.assertTrue(all('stops' in entry for entry in board))
+
+
+class OccupancyWatcherTests(TestCase):
+    class ScriptedBahnPark:
+        def __init__(self, *snapshots):
+            self.snapshots = list(snapshots)
+
+        def occupancies(self, by_id=None, prognoses=False):
+            return self.snapshots.pop(0)
+
+    @staticmethod
+    def allocation(space_id, category):
+        return {'space': {'id': space_id},
+                'allocation': {'category': category, 'validData': True,
+                               'text': str(category),
+                               'timestamp': 'changes every poll'}}
+
+    def test_only_changed_spaces_are_reported(self):
+        api = self.ScriptedBahnPark(
+            {'allocations': [self.allocation(1, 2), self.allocation(2, 3)]},
+            {'allocations': [self.allocation(1, 2), self.allocation(2, 3)]},
+            {'allocations': [self.allocation(1, 4)]})
+        watcher = OccupancyWatcher(api, interval=60, min_interval=10,
+                                   max_interval=100)
+        self.assertEqual(len(watcher.poll()), 2)
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(watcher.interval, 45)
+        changes = {change.key: change for change in watcher.poll()}
+        self.assertEqual(changes[1].new, ((4, '4', True),))
+        self.assertIsNone(changes[2].new)
+
+    def test_watcher_polls_live_occupancies(self):
+        watcher = OccupancyWatcher(BahnPark(config='config.ini'))
+        try:
+            self.assertTrue(watcher.poll())
+        except HTTPError as e:
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))
+        self.assertTrue(watcher.snapshot)
+
+
+class FacilityFeedTests(TestCase):
+    class ScriptedFaSta:
+        def __init__(self, *snapshots):
+            self.snapshots = list(snapshots)
+
+        def facilities(self, **endpoint_kwargs):
+            return self.snapshots.pop(0)
+
+    @staticmethod
+    def facility(number, state):
+        return {'equipmentnumber': number, 'type': 'ELEVATOR', 'state': state}
+
+    def test_transitions_are_emitted_and_resumable(self):
+        api = self.ScriptedFaSta(
+            [self.facility(1, 'ACTIVE'), self.facility(2, 'ACTIVE')],
+            [self.facility(1, 'INACTIVE'), self.facility(2, 'ACTIVE')],
+            [self.facility(1, 'ACTIVE'), self.facility(3, 'UNKNOWN')])
+        feed = FacilityFeed(api, history=2)
+        self.assertEqual(feed.poll(), [])
+        down, = feed.poll()
+        self.assertEqual((down.cursor, down.equipment, down.old, down.new),
+                         (1, 1, 'ACTIVE', 'INACTIVE'))
+        self.assertEqual(len(feed.poll()), 3)
+        self.assertEqual([t.cursor for t in feed.events_since(2)], [3, 4])
+        self.assertRaises(ValueError, feed.events_since, 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'feed.json')
+            feed.save(path)
+            restored = FacilityFeed(None)
+            restored.restore(path)
+        self.assertEqual(restored.cursor, 4)
+        self.assertEqual(restored.states, feed.states)
+        self.assertEqual(restored.events_since(3), feed.events_since(3))
+
+    def test_feed_polls_live_facilities(self):
+        feed = FacilityFeed(FaSta(config='config.ini'))
+        try:
+            feed.poll()
+        except HTTPError as e:
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))
+        self.assertTrue(feed.states)
+
+
+class CargoGridTests(TestCase):
+    class CountingCargo(Cargo):
+        def __init__(self):
+            super(CargoGridTests.CountingCargo, self).__init__(token='x')
+            self.endpoints = []
+
+        def request(self, endpoint, verb=None, **req_kwargs):
+            self.endpoints.append(endpoint)
+            if endpoint.endswith('/0.0/0.0'):
+                raise ValueError("No station nearby")
+            return [endpoint]
+
+    def test_snap(self):
+        self.assertEqual(snap(52.5194, 13.4047, 0.01), (52.52, 13.4))
+        self.assertEqual(snap(52.6, 13.4, 0.25), (52.5, 13.5))
+        self.assertRaises(ValueError, snap, 52.5, 13.4, 0)
+
+    def test_bulk_delays_requests_each_cell_once(self):
+        api = self.CountingCargo()
+        coordinates = [(52.5194, 13.4047), (52.5201, 13.3962), (0.001, 0.0),
+                       (52.5194, 13.4047), (48.1374, 11.5755)]
+        results = api.bulk_delays(coordinates, grid=0.01, workers=2)
+        self.assertEqual(sorted(api.endpoints),
+                         ['delays/loc/0.0/0.0', 'delays/loc/48.14/11.58',
+                          'delays/loc/52.52/13.4'])
+        self.assertEqual([r.key for r in results], coordinates)
+        self.assertEqual(results[0].value, results[1].value)
+        self.assertIsInstance(results[2].error, ValueError)
+
+    def test_async_bulk_delays_requests_each_cell_once(self):
+        class CountingAsyncCargo(AsyncCargo):
+            cells = []
+
+            async def delays(self, by_lat_long=None, **endpoint_kwargs):
+                self.cells.append(by_lat_long)
+                await asyncio.sleep(0)
+                if by_lat_long == (0.0, 0.0):
+                    raise ValueError("No station nearby")
+                return [by_lat_long]
+
+        api = CountingAsyncCargo(token='x', client=object())
+        coordinates = [(52.5194, 13.4047), (0.001, 0.0), (48.1374, 11.5755),
+                       (52.5201, 13.3962)]
+        results = asyncio.run(api.bulk_delays(coordinates, grid=0.01,
+                                              workers=2))
+        self.assertEqual(sorted(api.cells),
+                         [(0.0, 0.0), (48.14, 11.58), (52.52, 13.4)])
+        self.assertEqual([r.key for r in results], coordinates)
+        self.assertEqual(results[0].value, [(52.52, 13.4)])
+        self.assertEqual(results[3].value, results[0].value)
+        self.assertIsInstance(results[1].error, ValueError)
+
+    def test_bulk_delays_live(self):
+        api = Cargo(config='config.ini')
+        result, = api.bulk_delays([(52.5194, 13.4047)])
+        if isinstance(result.error, HTTPError):
+            e = result.error
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))
+        self.assertIsNone(result.error)
+
+
+class BetriebsstellenIndexTests(TestCase):
+    entries = [{'abbrev': 'FF', 'name': 'Frankfurt (Main) Hbf', 'type': 'Bf'},
+               {'abbrev': 'FFS', 'name': 'Frankfurt (Main) Süd', 'type': 'Bf'},
+               {'abbrev': 'BL', 'name': 'Berlin Hbf', 'type': 'Bf'},
+               {'abbrev': 'FFLF', 'name': 'Frankfurt Flughafen Fernbf',
+                'RB': 3}]
+
+    def test_lookups(self):
+        index = BetriebsstellenIndex(self.entries)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.lookup('FFS')['name'], 'Frankfurt (Main) Süd')
+        self.assertEqual(index.lookup('bl')['name'], 'Berlin Hbf')
+        self.assertIsNone(index.lookup('XX'))
+        self.assertEqual([e['abbrev'] for e in index.prefix('frankfurt (')],
+                         ['FF', 'FFS'])
+        self.assertEqual(len(index.prefix('Frankfurt', limit=2)), 2)
+        self.assertEqual([e['abbrev'] for e in index.search('hbf')],
+                         ['BL', 'FF'])
+        self.assertEqual([e['abbrev'] for e in index.search('main) s')],
+                         ['FFS'])
+        self.assertEqual([e['abbrev'] for e in index.search('fe')], ['FFLF'])
+        self.assertEqual(index.search('hbfx'), [])
+        self.assertEqual([e['abbrev'] for e in index.find('BERLIN HBF')],
+                         ['BL'])
+        self.assertEqual(index.find('Berlin'), [])
+        self.assertEqual(index.lookup('FFLF'),
+                         {'abbrev': 'FFLF', 'name': 'Frankfurt Flughafen '
+                          'Fernbf', 'type': None, 'RB': 3})
+
+    def test_save_and_load(self):
+        index = BetriebsstellenIndex(self.entries)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'betriebsstellen.idx')
+            index.save(path)
+            loaded = BetriebsstellenIndex.load(path)
+        self.assertEqual(loaded.prefix(''), index.prefix(''))
+        self.assertEqual(loaded.lookup('FF'), index.lookup('FF'))
+
+    def test_index_backend_skips_the_api(self):
+        api = Betriebsstellen(token='invalid')
+        index = BetriebsstellenIndex(self.entries)
+        self.assertEqual(api.betriebsstellen('FF', is_abbreviation=True,
+                                             index=index)['abbrev'], 'FF')
+        self.assertEqual(len(api.betriebsstellen('Frankfurt', index=index)),
+                         3)
+
+
+class FlinksterSweepTests(TestCase):
+    class SimulatedFlinkster(Flinkster):
+        """Answers booking proposal searches from a fixed set of vehicles."""
+
+        def __init__(self, vehicles):
+            super(FlinksterSweepTests.SimulatedFlinkster, self).__init__(
+                token='x')
+            self.vehicles = vehicles
+            self.requests = 0
+
+        def request(self, endpoint, verb=None, params=None, **req_kwargs):
+            self.requests += 1
+            lat, lon = params['lat'], params['lon']
+            found = [v for v in self.vehicles if Flinkster._radius(
+                (min(lat, v[0]), min(lon, v[1]), max(lat, v[0]),
+                 max(lon, v[1]))) * 2 <= params['radius']]
+            return {'items': [{'rentalObject': {
+                'uid': str(v), 'position': {'coordinates': [v[1], v[0]]}}}
+                for v in found[:params['limit']]]}
+
+    def test_sweep_finds_every_vehicle_once(self):
+        rng = __import__('random').Random(0)
+        vehicles = [(52.5 + rng.random() * 0.1, 13.3 + rng.random() * 0.1)
+                    for _ in range(400)]
+        vehicles += [(52.55, 13.35)] * 3 + [(53.0, 13.0)]  # dupes, outside
+        api = self.SimulatedFlinkster(vehicles)
+        found = list(api.sweep_booking_proposals(
+            (52.5, 13.3, 52.6, 13.4), provider_name='flinkster', limit=20,
+            max_radius=3000, workers=4))
+        uids = [item['rentalObject']['uid'] for item in found]
+        self.assertEqual(len(uids), len(set(uids)))
+        self.assertEqual(set(uids), {str(v) for v in vehicles[:401]})
+
+    def test_sweep_validates_arguments_eagerly(self):
+        api = self.SimulatedFlinkster([])
+        self.assertRaises(ValueError, api.sweep_booking_proposals,
+                          (52.6, 13.3, 52.5, 13.4), provider_name='flinkster')
+        self.assertRaises(ValueError, api.sweep_booking_proposals,
+                          (52.5, 13.3, 52.6, 13.4))
+
+
+class LocationSearchTests(TestCase):
+    class StationFahrplan:
+        names = ['Berlin Hbf', 'Berlin Ostbahnhof', 'Bernau(b Berlin)',
+                 'Bergen auf Rügen', 'Bremen Hbf', 'Bern']
+
+        def __init__(self, max_results=50):
+            self.max_results = max_results
+            self.queries = []
+
+        def location(self, name):
+            self.queries.append(name)
+            return [{'name': n, 'id': i} for i, n in enumerate(self.names)
+                    if name.casefold() in n.casefold()][:self.max_results]
+
+    def test_longer_queries_are_filtered_locally(self):
+        api = self.StationFahrplan()
+        search = LocationSearch(api)
+        self.assertEqual(len(search.location('Ber')), 5)
+        self.assertEqual([l['name'] for l in search.location('Berl')],
+                         ['Berlin Hbf', 'Berlin Ostbahnhof',
+                          'Bernau(b Berlin)'])
+        self.assertEqual(len(search.location(' berl ')), 3)
+        self.assertEqual(api.queries, ['Ber'])
+        stats = search.stats()
+        self.assertEqual((stats['hits'], stats['derived'], stats['misses']),
+                         (1, 1, 1))
+
+    def test_incomplete_results_are_not_filtered(self):
+        api = self.StationFahrplan(max_results=2)
+        search = LocationSearch(api, max_results=2)
+        search.location('Ber')
+        self.assertEqual(len(search.location('Berl')), 2)
+        self.assertEqual(api.queries, ['Ber', 'Berl'])
+
+    def test_least_recently_used_results_are_evicted(self):
+        api = self.StationFahrplan(max_results=0)
+        search = LocationSearch(api, maxsize=2, max_results=0)
+        for query in ('Bremen', 'Bern', 'Bremen', 'Bergen'):
+            search.location(query)
+        self.assertEqual(len(search), 2)
+        self.assertEqual(search.stats()['evictions'], 1)
+        search.location('Bremen')
+        search.location('Bern')
+        self.assertEqual(api.queries[-1], 'Bern')
+        self.assertEqual(api.queries.count('Bremen'), 1)
+
+    def test_search_live_locations(self):
+        search = LocationSearch(Fahrplan(config='config.ini'))
+        try:
+            self.assertTrue(search.location('Berlin'))
+        except HTTPError as e:
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))
+
+
+class MetricsTests(TestCase):
+    class ScriptedTransport:
+        def __init__(self, *statuses):
+            self.statuses = list(statuses)
+
+        def request(self, verb, url, **req_kwargs):
+            resp = Response()
+            resp.status_code = self.statuses.pop(0)
+            resp.url = url
+            resp._content = b'{"allocations": []}'
+            return resp
+
+    def test_requests_are_recorded_per_template(self):
+        metrics = Metrics()
+        api = BahnPark(token='x', metrics=metrics, retry=RetryPolicy(backoff=0),
+                       transport=self.ScriptedTransport(503, 200, 200))
+        api.occupancies(by_id='100035')
+        api.occupancies(by_id='100036')
+        recorded = metrics.as_dict()['BahnPark']['spaces/{id}/occupancies']
+        self.assertEqual(recorded['requests_total'], {200: 2})
+        self.assertEqual(recorded['retries_total'], 1)
+        self.assertEqual(recorded['request_seconds']['count'], 2)
+        self.assertEqual(recorded['response_bytes']['sum'], 38)
+        self.assertEqual(recorded['decode_seconds']['count'], 2)
+
+    def test_revalidated_responses_count_no_bytes(self):
+        class RevalidatingTransport:
+            def request(self, verb, url, headers=None, **req_kwargs):
+                resp = Response()
+                resp.url = url
+                if 'If-None-Match' in (headers or {}):
+                    resp.status_code = 304
+                    resp._content = b''
+                else:
+                    resp.status_code = 200
+                    resp.headers['ETag'] = '"v1"'
+                    resp._content = b'{"allocations": []}'
+                return resp
+
+        metrics = Metrics()
+        with tempfile.TemporaryDirectory() as directory:
+            api = BahnPark(token='x', metrics=metrics,
+                           transport=RevalidatingTransport(),
+                           http_cache=HTTPCache(os.path.join(directory,
+                                                             'http.db')))
+            self.assertEqual(api.occupancies(by_id='100035'),
+                             api.occupancies(by_id='100035'))
+        recorded = metrics.as_dict()['BahnPark']['spaces/{id}/occupancies']
+        self.assertEqual(recorded['requests_total'], {200: 2})
+        self.assertEqual(recorded['revalidated_total'], 1)
+        self.assertEqual(recorded['response_bytes']['count'], 2)
+        self.assertEqual(recorded['response_bytes']['sum'], 19)
+
+    def test_prometheus_export(self):
+        metrics = Metrics(latency_buckets=(0.1, 1))
+        metrics.request('FaSta', 'facilities', 200, 0.5, size=2048)
+        metrics.request('FaSta', 'facilities', 'ConnectTimeout', 2)
+        text = metrics.prometheus()
+        self.assertIn('# TYPE choochoo_request_seconds histogram', text)
+        self.assertIn('choochoo_request_seconds_bucket{wrapper="FaSta",'
+                      'endpoint="facilities",le="1"} 1', text)
+        self.assertIn('choochoo_request_seconds_bucket{wrapper="FaSta",'
+                      'endpoint="facilities",le="+Inf"} 2', text)
+        self.assertIn('choochoo_requests_total{wrapper="FaSta",'
+                      'endpoint="facilities",status="ConnectTimeout"} 1', text)
+        metrics.clear()
+        self.assertEqual(metrics.prometheus(), '')
+
+    def test_unknown_endpoints_are_grouped(self):
+        api = Flinkster(token='x')
+        self.assertEqual(api.template('providernetworks/2/prices'),
+                         'providernetworks/{network}/prices')
+        self.assertEqual(api.template(api.address + 'areas/abc'), 'areas/{id}')
+        self.assertEqual(api.template('unknown/1/2'), 'other')
+
+
+class StandInServerTests(TestCase):
+    def setUp(self):
+        try:
+            from benchmarks.standin import StandInServer
+        except ImportError:
+            self.skipTest("benchmarks isn't importable")
+        self.StandInServer = StandInServer
+
+    def test_every_wrapper_is_served_offline(self):
+        with self.StandInServer(process=False) as server:
+            apis = [cls(token='offline') for cls in (
+                Fahrplan, BahnPark, Cargo, FaSta, Flinkster, Reisezentren,
+                Betriebsstellen)]
+            for api in apis:
+                server.mount(api)
+            fahrplan, bahnpark, cargo, fasta, flinkster, reisezentren, \
+                betriebsstellen = apis
+            self.assertTrue(fahrplan.departures('8011160', date='2017-05-24'))
+            self.assertTrue(fahrplan.location('Berlin'))
+            self.assertTrue(bahnpark.spaces()['items'])
+            self.assertTrue(bahnpark.occupancies(by_id='100000'))
+            self.assertTrue(cargo.delays(by_lat_long=(52.5, 13.4)))
+            self.assertTrue(fasta.get_elevators())
+            self.assertTrue(flinkster.booking_proposals(
+                provider_name='flinkster', lat=52.5, lon=13.4)['items'])
+            self.assertTrue(reisezentren.reisezentren(by_center_id='1'))
+            self.assertTrue(betriebsstellen.betriebsstellen(
+                'FF', is_abbreviation=True))
+
+    def test_errors_are_injected(self):
+        with self.StandInServer(error_rate=1, error_status=500,
+                           process=False) as server:
+            api = BahnPark(token='offline')
+            server.mount(api)
+            with self.assertRaises(HTTPError):
+                api.spaces()
+
+
+class LazyImportTests(TestCase):
+    def test_wrappers_load_dependencies_on_first_use(self):
+        code = ("import sys, choochoo; api = choochoo.FaSta(token='x'); "
+                "print(sorted(m for m in ('requests', 'json', 'asyncio', "
+                "'choochoo.fahrplan') if m in sys.modules)); api.decoder; "
+                "api.transport; print('requests' in sys.modules)")
+        output = subprocess.run([sys.executable, '-c', code],
+                                capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(
+                                    os.path.abspath(__file__))))
+        self.assertEqual(output.stdout.split('\n')[:2], ['[]', 'True'])
+
+    def test_unknown_names_and_decoders_still_fail(self):
+        import choochoo
+        with self.assertRaises(AttributeError):
+            choochoo.Fahrplann
+        self.assertIn('Reisezentren', dir(choochoo))
+        with self.assertRaises(ValueError):
+            FaSta(token='x', decoder='yaml')
+
+
+class StationRegistryTests(TestCase):
+    class RecordingAPI:
+        def __init__(self):
+            self.calls = []
+
+        def __getattr__(self, name):
+            def call(*args, **kwargs):
+                self.calls.append(name)
+                if name == 'arrivals':
+                    raise ConnectionError()
+                return {'called': name, 'args': args}
+            return call
+
+    def registry(self, **apis):
+        registry = StationRegistry(**apis)
+        registry.build(
+            betriebsstellen=[{'abbrev': 'FF', 'name': 'Frankfurt (Main) Hbf',
+                              'UIC': '80'},
+                             {'abbrev': 'BL', 'name': 'Berlin Hbf',
+                              'UIC': '80'},
+                             {'abbrev': 'KK', 'name': 'Köln Hbf',
+                              'UIC': '80'}],
+            stations={'items': [{'id': 1866, 'name': 'Frankfurt(Main)Hbf'},
+                                {'id': 1071, 'name': 'Berlin Hbf'}]},
+            centers=[{'id': 500001, 'name': 'Reisezentrum Berlin Hbf'}],
+            locations=[{'id': 8011160, 'name': 'Berlin Hbf'},
+                       {'id': 8000105, 'name': 'Frankfurt(Main)Hbf'}])
+        return registry
+
+    def test_any_id_resolves_all_ids(self):
+        registry = self.registry()
+        self.assertEqual(len(registry), 3)
+        self.assertEqual(registry.ids('KK'), {'abbrev': 'KK'})
+        expected = {'eva': '8011160', 'station_number': '1071',
+                    'abbrev': 'BL', 'center_id': '500001'}
+        self.assertEqual(registry.ids(1071), expected)
+        self.assertEqual(registry.ids('BL', kind='abbrev'), expected)
+        self.assertEqual(registry.ids('500001'), expected)
+        self.assertEqual(registry.lookup('8000105')['station_number'], '1866')
+        self.assertIsNone(registry.lookup('FF', kind='eva'))
+        self.assertRaises(KeyError, registry.ids, 'XX')
+        self.assertRaises(ValueError, registry.add, 'Bonn Hbf', uic='1')
+
+    def test_conflicting_ids_are_not_merged(self):
+        registry = self.registry()
+        self.assertRaises(ValueError, registry.add, 'Berlin Hbf',
+                          abbrev='BL', station_number='9999')
+        self.assertRaises(ValueError, registry.add, abbrev='BL', eva='8000105')
+        self.assertEqual(registry.ids('BL')['station_number'], '1071')
+        # A second station of the same name becomes a record of its own.
+        registry.add('Berlin Hbf', abbrev='BLT')
+        self.assertEqual(len(registry), 4)
+        self.assertEqual(registry.ids('BLT'), {'abbrev': 'BLT'})
+        registry.build(locations=[{'id': 8000001, 'name': 'Berlin Hbf'}])
+        self.assertEqual(len(registry), 5)
+        self.assertEqual(registry.ids('8011160')['abbrev'], 'BL')
+
+    def test_save_and_load(self):
+        registry = self.registry()
+        registry.add('Bonn Hbf', eva='8000044')
+        registry.add('Bonn Hbf', abbrev='KB')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stations.json')
+            registry.save(path)
+            loaded = StationRegistry()
+            loaded.load(path)
+        self.assertEqual(loaded.records, registry.records)
+        self.assertEqual(loaded.ids('KB'), {'eva': '8000044', 'abbrev': 'KB'})
+
+    def test_fetch_calls_only_requested_endpoints(self):
+        fahrplan, fasta = self.RecordingAPI(), self.RecordingAPI()
+        registry = self.registry(fahrplan=fahrplan, fasta=fasta)
+        registry.add('Bonn Hbf', abbrev='KB')
+        result = registry.fetch('BL', 'departures', 'facilities',
+                                date='2017-05-24')
+        self.assertEqual(result['departures']['args'],
+                         ('8011160', '2017-05-24'))
+        self.assertEqual(result['facilities']['args'], ('1071',))
+        self.assertEqual(result['errors'], {})
+        self.assertEqual(fasta.calls, ['disruptions_by_station'])
+
+        result = registry.fetch('KB', 'arrivals', 'parking')
+        self.assertIsNone(result['parking'])
+        self.assertIsInstance(result['errors']['parking'], ValueError)
+        self.assertIsInstance(result['errors']['arrivals'], KeyError)
+        result = registry.fetch(1071, 'arrivals')
+        self.assertIsInstance(result['errors']['arrivals'], ConnectionError)
+        self.assertRaises(ValueError, registry.fetch, 1071, 'weather')
+
+
+class PagingTests(TestCase):
+    class PagedFaSta(FaSta):
+        """Serves `total` facilities in pages, `delay` seconds per page."""
+
+        def __init__(self, total, delay=0.0):
+            super(PagingTests.PagedFaSta, self).__init__(token='x')
+            self.total = total
+            self.delay = delay
+            self.offsets = []
+            self.active = self.peak = 0
+            self.lock = __import__('threading').Lock()
+
+        def request(self, endpoint, verb=None, params=None, **req_kwargs):
+            with self.lock:
+                self.offsets.append(params['offset'])
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(self.delay)
+            with self.lock:
+                self.active -= 1
+            stop = min(params['offset'] + params['limit'], self.total)
+            return [{'equipmentnumber': n}
+                    for n in range(params['offset'], stop)]
+
+    def test_iter_facilities_yields_all_pages_in_order(self):
+        api = self.PagedFaSta(95)
+        items = list(api.iter_facilities(page_size=10, type='ELEVATOR'))
+        self.assertEqual([i['equipmentnumber'] for i in items],
+                         list(range(95)))
+        self.assertIn(90, api.offsets)
+
+    def test_pages_are_prefetched_concurrently(self):
+        api = self.PagedFaSta(200, delay=0.05)
+        start = time.monotonic()
+        items = list(api.iter_facilities(page_size=10, prefetch=4))
+        self.assertEqual(len(items), 200)
+        self.assertGreater(api.peak, 1)
+        self.assertLessEqual(api.peak, 5)
+        self.assertLess(time.monotonic() - start, 21 * 0.05)
+
+    def test_max_items_stops_requesting(self):
+        api = self.PagedFaSta(1000)
+        items = list(api.iter_facilities(page_size=10, prefetch=2,
+                                         max_items=25))
+        self.assertEqual(len(items), 25)
+        self.assertTrue(all(offset < 25 for offset in api.offsets))
+
+    def test_exact_multiple_ends_on_empty_page(self):
+        pages = {0: {'items': [1, 2]}, 2: {'items': [3, 4]},
+                 4: {'items': []}}
+        self.assertEqual(list(paginate(
+            lambda offset, limit: pages[offset], 2, prefetch=0)),
+            [1, 2, 3, 4])
+
+    def test_prefetch_bounds_the_pages_in_flight(self):
+        for prefetch, expected in ((0, [0]), (1, [0, 10]),
+                                   (2, [0, 10, 20])):
+            requested = []
+
+            def fetch(offset, limit):
+                requested.append(offset)
+                return list(range(offset, offset + limit))
+
+            pages = paginate(fetch, 10, prefetch=prefetch)
+            next(pages)
+            time.sleep(0.05)
+            self.assertEqual(sorted(requested), expected)
+            list(zip(range(9), pages))  # rest of the first page
+            time.sleep(0.05)
+            self.assertEqual(sorted(requested), expected)
+            next(pages)
+            time.sleep(0.05)
+            self.assertEqual(sorted(requested)[-1], expected[-1] + 10)
+            pages.close()
+
+    def test_server_capping_the_page_size(self):
+        def capped(offset, limit):
+            return list(range(offset, min(offset + min(limit, 7), 30)))
+
+        def reporting(offset, limit):
+            return {'limit': 7, 'items': capped(offset, limit)}
+
+        for fetch in (capped, reporting):
+            self.assertEqual(list(paginate(fetch, 10, prefetch=3)),
+                             list(range(30)))
+        requested = []
+
+        def short_last_page(offset, limit):
+            requested.append(offset)
+            return {'limit': limit, 'items': list(range(offset, min(
+                offset + limit, 25)))}
+
+        self.assertEqual(list(paginate(short_last_page, 10, prefetch=0)),
+                         list(range(25)))
+        self.assertEqual(requested, [0, 10, 20])
+
+    def test_proposals_validated_eagerly(self):
+        api = Flinkster(token='x')
+        self.assertRaises(ValueError, api.iter_booking_proposals, lat=52.5)
+        self.assertRaises(ValueError, paginate, None, 0)
+        self.assertRaises(ValueError, paginate, None, 10, prefetch=-1)
+
+    def test_async_pagination(self):
+        class PagedAsyncFlinkster(AsyncFlinkster):
+            async def request(self, endpoint, verb=None, params=None,
+                              **req_kwargs):
+                stop = min(params['offset'] + params['limit'], 33)
+                return {'items': list(range(params['offset'], stop))}
+
+        async def collect():
+            api = PagedAsyncFlinkster(token='x', client=object())
+            return [area async for area in api.iter_areas(
+                providernetwork=2, page_size=5)]
+
+        self.assertEqual(asyncio.run(collect()), list(range(33)))
+
+
+class OccupancyRecorderTests(TestCase):
+    @staticmethod
+    def snapshot(categories):
+        return {'allocations': [
+            {'space': {'id': space_id},
+             'allocation': {'category': category,
+                            'text': ('> 10', '> 30', '> 50', 'frei')[
+                                category - 1]}}
+            for space_id, category in categories.items()]}
+
+    def test_read_time_ranges_and_spaces_after_reopening(self):
+        with tempfile.TemporaryDirectory() as path:
+            recorder = OccupancyRecorder(path)
+            for minute in range(10):
+                recorder.record(self.snapshot(
+                    {100: 1 + minute % 4, 'P2': 2}), timestamp=60 * minute)
+            recorder.record(self.snapshot({300: 4}), timestamp=600)
+
+            recorder = OccupancyRecorder(path)
+            self.assertEqual(len(recorder), 21)
+            rows = recorder.read(start=120, end=300, spaces=[100])
+            self.assertEqual(rows.time.tolist(), [120, 180, 240])
+            self.assertEqual(rows.category.tolist(), [3, 4, 1])
+            self.assertEqual(rows.free.tolist(), [50, -1, 10])
+            self.assertEqual(rows.space.tolist(), [100, 100, 100])
+            self.assertEqual(len(recorder.read(start=600).time), 1)
+            self.assertEqual(len(recorder.read(spaces=['P2']).time), 10)
+            self.assertEqual(len(recorder.read(spaces=['unknown']).time), 0)
+
+    def test_partial_rows_are_dropped_and_order_enforced(self):
+        with tempfile.TemporaryDirectory() as path:
+            recorder = OccupancyRecorder(path)
+            recorder.record(self.snapshot({1: 1, 2: 2}), timestamp=100)
+            with open(os.path.join(path, 'time'), 'ab') as f:
+                f.write(b'\0' * 8)  # a row cut short by a crash
+            recorder = OccupancyRecorder(path)
+            self.assertEqual(len(recorder), 2)
+            self.assertRaises(ValueError, recorder.record,
+                              self.snapshot({1: 1}), timestamp=50)
+            self.assertEqual(recorder.record(self.snapshot({1: 3}),
+                                             timestamp=200), 1)
+            self.assertEqual(recorder.read().category.tolist(), [1, 2, 3])
+
+    def test_empty_store(self):
+        with tempfile.TemporaryDirectory() as path:
+            rows = OccupancyRecorder(path).read(start=0, spaces=[1])
+            self.assertEqual(len(rows.space), 0)
+
+
+class PrognosisMatrixTests(TestCase):
+    class PrognosedBahnPark(BahnPark):
+        """Gives space n prognoses from hour n on, in 15 minute segments."""
+
+        def __init__(self):
+            super(PrognosisMatrixTests.PrognosedBahnPark, self).__init__(
+                token='x')
+
+        def spaces(self, *args, **kwargs):
+            return {'items': [{'id': 1}, {'id': 2}, {'id': 3}]}
+
+        def occupancies(self, by_id=None, prognoses=False):
+            if by_id == '3':
+                raise HTTPError('404')
+            hour = int(by_id)
+            return {'space': {'id': int(by_id)}, 'prognoses': [
+                {'timeSegment': '2017-05-24T%02d:%02d:00+02:00'
+                                % (hour + i // 4, i % 4 * 15),
+                 'category': hour + i % 2} for i in range(8)]}
+
+    def test_prognoses_are_aligned_on_a_common_grid(self):
+        matrix = self.PrognosedBahnPark().bulk_prognoses(workers=3)
+        self.assertEqual(matrix.spaces.tolist(), [1, 2, 3])
+        self.assertEqual(matrix.values.shape, (3, 12))
+        self.assertEqual(str(matrix.times[0]), '2017-05-23T23:00:00')
+        self.assertEqual(str(matrix.times[-1]), '2017-05-24T01:45:00')
+        self.assertEqual(matrix.values[0, :2].tolist(), [1, 2])
+        self.assertTrue(all(v != v for v in matrix.values[0, 8:]))
+        self.assertTrue(all(v != v for v in matrix.values[1, :4]))
+        self.assertEqual(matrix.values[1, 4:6].tolist(), [2, 3])
+        self.assertEqual(list(matrix.errors), [3])
+        self.assertEqual(int(__import__('numpy').nansum(matrix.values)), 32)
+
+    def test_coarser_slots_and_chosen_spaces(self):
+        matrix = self.PrognosedBahnPark().bulk_prognoses([2, 2], slot=3600)
+        self.assertEqual(matrix.spaces.tolist(), [2])
+        self.assertEqual(matrix.values.shape, (1, 2))
+        self.assertRaises(ValueError, self.PrognosedBahnPark().bulk_prognoses,
+                          slot=0)
+
+    def test_prognoses_sharing_a_slot_are_aggregated(self):
+        results = [Result(1, {'prognoses': [
+            {'timeSegment': '2017-05-24T10:%02d:00' % minute,
+             'category': category}
+            for minute, category in zip((0, 15, 30, 45), (4, 1, 1, 1))]},
+            None)]
+        for how, expected in (('max', 4), ('min', 1), ('mean', 1.75)):
+            matrix = to_matrix(results, [1], slot=3600, how=how)
+            self.assertEqual(matrix.values.tolist(), [[expected]])
+        self.assertRaises(ValueError, to_matrix, results, [1], how='sum')
+        self.assertRaises(ValueError, self.PrognosedBahnPark().bulk_prognoses,
+                          how='sum')
+
+    def test_offsets_are_converted_to_utc(self):
+        # 02:30 occurs twice when DST ends; the offsets tell them apart.
+        results = [Result('a', {'prognoses': [
+            {'timeSegment': '2017-10-29T02:30:00+02:00', 'category': 4},
+            {'timeSegment': '2017-10-29T02:30:00+01:00', 'category': 1},
+            {'timeSegment': '2017-10-29T02:00:00Z', 'category': 2}]}, None)]
+        matrix = to_matrix(results, ['a'], slot=3600)
+        self.assertEqual([str(t) for t in matrix.times],
+                         ['2017-10-29T00:00:00', '2017-10-29T01:00:00',
+                          '2017-10-29T02:00:00'])
+        self.assertEqual(matrix.values.tolist(), [[4, 1, 2]])
+
+    def test_async_bulk_prognoses(self):
+        sync = self.PrognosedBahnPark()
+
+        class PrognosedAsyncBahnPark(AsyncBahnPark):
+            async def spaces(self, *args, **kwargs):
+                return sync.spaces()
+
+            async def occupancies(self, by_id=None, prognoses=False):
+                return sync.occupancies(by_id, prognoses)
+
+        api = PrognosedAsyncBahnPark(token='x', client=object())
+        matrix = asyncio.run(api.bulk_prognoses())
+        self.assertEqual(matrix.values.shape, (3, 12))
+        self.assertEqual(list(matrix.errors), [3])
+
+
+class CenterIndexTests(TestCase):
+    class StaticReisezentren:
+        centers = [{'id': 1, 'name': 'Berlin Hbf', 'lat': 52.525, 'lon': 13.369},
+                   {'id': 2, 'name': 'Hamburg Hbf', 'lat': 53.553, 'lon': 10.007},
+                   {'id': 3, 'name': 'München Hbf', 'lat': 48.140, 'lon': 11.558},
+                   {'id': 4, 'name': 'Köln Hbf', 'lat': 50.943, 'lon': 6.959},
+                   {'id': 5, 'name': 'No coordinates'}]
+
+        def __init__(self):
+            self.calls = 0
+
+        def request(self, endpoint):
+            self.calls += 1
+            return self.centers
+
+    def test_nearest_centers(self):
+        index = CenterIndex(self.StaticReisezentren())
+        center, km = index.nearest(52.51, 13.39)  # Berlin Potsdamer Platz
+        self.assertEqual(center['id'], 1)
+        self.assertLess(km, 3)
+        ids = [c['id'] for c, _ in index.k_nearest(51.34, 12.38, k=3)]
+        self.assertEqual(ids, [1, 2, 3])  # from Leipzig
+        self.assertEqual(len(index.centers), 4)
+
+    def test_batch_query_matches_single_queries(self):
+        index = CenterIndex(self.StaticReisezentren())
+        coords = [(52.51, 13.39), (50.11, 8.68), (53.0, 9.9), (48.0, 11.0)]
+        distances, indices = index.query(coords, k=2)
+        for (lat, lon), row, found in zip(coords, indices, distances):
+            expected = index.k_nearest(lat, lon, k=2)
+            self.assertEqual([index.centers[i]['id'] for i in row],
+                             [c['id'] for c, _ in expected])
+            self.assertAlmostEqual(found[0], expected[0][1], places=3)
+
+    def test_stale_index_refreshes_in_background(self):
+        api = self.StaticReisezentren()
+        index = CenterIndex(api, ttl=0)
+        index.nearest(50, 10)
+        index.nearest(50, 10)
+        for _ in range(100):
+            if api.calls == 2 and not index._refreshing:
+                break
+            time.sleep(0.01)
+        self.assertEqual(api.calls, 2)
+
+    def test_failed_refresh_backs_off(self):
+        api = self.StaticReisezentren()
+        index = CenterIndex(api, ttl=0, retry_after=60)
+        index.nearest(50, 10)
+        api.centers = None  # fails to build from now on
+
+        def wait_for_refresh():
+            for _ in range(100):
+                if not index._refreshing:
+                    break
+                time.sleep(0.01)
+
+        for _ in range(1000):
+            index.nearest(50, 10)
+            wait_for_refresh()
+        self.assertEqual(api.calls, 2)
+        self.assertEqual(index.failures, 1)
+        self.assertIsInstance(index.error, TypeError)
+        self.assertEqual(index.nearest(52.51, 13.39)[0]['id'], 1)
+
+        index._retry_at = time.monotonic()  # backoff elapsed
+        index.nearest(50, 10)
+        wait_for_refresh()
+        self.assertEqual(api.calls, 3)
+        self.assertEqual(index.failures, 2)
+        # doubled, but capped at max(ttl, retry_after)
+        self.assertAlmostEqual(index._retry_at - time.monotonic(), 60,
+                               delta=5)
+
+    def test_index_loads_live_centers(self):
+        index = CenterIndex(Reisezentren(config='config.ini'))
+        try:
+            self.assertIsNotNone(index.nearest(52.525, 13.369))
+        except HTTPError as e:
+            self.fail('Status Code Was %s - URL: %s!' % (e.response.status_code, e.request.url))